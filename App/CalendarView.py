@@ -2,20 +2,36 @@ import PyQt6.QtCore as qtc
 import PyQt6.QtWidgets as qtw
 import PyQt6.QtGui as qtg
 
-from DB.sqlite import CalendarDB  # uses your existing class
+from DB.sqlite import get_db
+from DB.records import Event
+from DB.changes import RESET
+from change_relay import get_relay
+from event_repository import EventRepository
+from datetime import date, timedelta
+
+ONE_DAY = timedelta(days=1)
 
 
 class CalendarView(qtw.QWidget):
-    def __init__(self, palette, user_id=None):
+    def __init__(self, palette, user_id=None, db=None, repo=None):
         super().__init__()
         self.second_color = palette[1]
         self.third_color = palette[2]
         self.fourth_color = palette[3]
 
-        self.db = CalendarDB()
+        self.db = db or get_db()
         self.user_id = user_id  # pass a user_id to only show their events
-        self.events_by_date: dict[str, list[str]] = {}
-        self._formatted_dates: list[qtc.QDate] = []
+        # Shared in-memory calendar (see event_repository.py); page flips and day
+        # lookups are served from it, never from the DB
+        self.repo = repo or EventRepository(self.db, user_id)
+        self._formatted_dates: set[date] = set()   # highlighted cells of the visible grid
+        self._grid: tuple[date, date] = (date.today(), date.today())  # set by _show_page
+
+        # Highlight format for dates that have events
+        self._event_format = qtg.QTextCharFormat()
+        self._event_format.setFontWeight(qtg.QFont.Weight.Bold)
+        self._event_format.setForeground(qtg.QBrush(qtg.QColor("#ffffff")))
+        self._event_format.setBackground(qtg.QBrush(qtg.QColor(self.second_color)))
 
         main_layout = qtw.QVBoxLayout(self)
 
@@ -73,113 +89,125 @@ class CalendarView(qtw.QWidget):
 
         # Signals
         self.calendar.selectionChanged.connect(self.update_events)
-        self.calendar.currentPageChanged.connect(lambda _y, _m: self._apply_date_formats())
+        self.calendar.currentPageChanged.connect(lambda _y, _m: self._show_page())
+        # Event writes anywhere in the app (chat, imports, ...) arrive as deltas
+        get_relay().changed.connect(self.apply_change)
 
         # Initial load
         self.refresh_from_db()
 
     def refresh_from_db(self):
-        """Reload events from DB and refresh UI."""
-        rows = self._fetch_events()
-        self._index_events_by_date(rows)
+        """Redraw the visible page (the repository reloads itself after a reset)."""
+        self._show_page()
+
+    def _show_page(self):
+        """Highlight the visible grid and refresh the day list; no DB access."""
+        self._grid = self._visible_range()
         self._apply_date_formats()
         self.update_events()
 
-    def _fetch_events(self) -> list[dict]:
-        """Get events (for a user if provided; otherwise all events)."""
+    def _visible_range(self) -> tuple[date, date]:
+        """First and last date of the 6-week grid shown for the current month page."""
+        first_of_month = date(self.calendar.yearShown(), self.calendar.monthShown(), 1)
+        # The grid starts on the first weekday column. QCalendarWidget always shows some
+        # of the previous month, so a month starting in that column starts the grid a week early.
+        offset = (first_of_month.isoweekday() - self.calendar.firstDayOfWeek().value) % 7 or 7
+        first = first_of_month - timedelta(days=offset)
+        return first, first + timedelta(days=6 * 7 - 1)
+
+    def _fetch_events(self, first: date, last: date) -> list[Event]:
+        """Events and recurring occurrences overlapping [first, last], in start order."""
         try:
-            if self.user_id is not None:
-                # Uses your existing method
-                # returns tuples, so convert to dicts if needed
-                rows = self.db.get_events(self.user_id)
-                # guess columns order from your schema
-                cols = ["id", "user_id", "title", "description", "start_date", "end_date", "start_time", "end_time"]
-                if rows and not isinstance(rows[0], dict):
-                    rows = [dict(zip(cols, r)) for r in rows]
-                return rows
-
-            # If you added get_all_events() (as I suggested earlier), prefer it:
-            if hasattr(self.db, "get_all_events"):
-                return self.db.get_all_events()
-
-            # Fallback: raw query (avoids changing your DB class)
-            import sqlite3
-            conn = sqlite3.connect("calendai.db")
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT id, user_id, title, description, start_date, end_date, start_time, end_time
-                FROM events
-                ORDER BY start_date, start_time
-            """)
-            rows = [dict(r) for r in cur.fetchall()]
-            conn.close()
-            return rows
+            return self.repo.events_between(first, last)
         except Exception as e:
             print("Failed to fetch events:", e)
             return []
 
-    def _index_events_by_date(self, rows: list[dict]):
-        """Build a dict: 'YYYY-MM-DD' -> [display strings] and include multi-day spans."""
-        self.events_by_date.clear()
-        for r in rows:
-            title = (r.get("title") or "").strip() or "(Untitled)"
-            desc = (r.get("description") or "").strip()
-            sd = (r.get("start_date") or "").strip()
-            ed = (r.get("end_date") or "").strip()
-            st = (r.get("start_time") or "").strip()
-            et = (r.get("end_time") or "").strip()
-
-            # Build a nice one-line label
-            when = f"{st}–{et}" if st and et else (st or et or "")
-            label = f"{title}" + (f"  ({when})" if when else "")
-            if desc:
-                label += f"\n    📝 {desc}"
-
-            # Parse dates and expand range
-            try:
-                qd_start = qtc.QDate.fromString(sd, "yyyy-MM-dd")
-                qd_end = qtc.QDate.fromString(ed, "yyyy-MM-dd") if ed else qd_start
-                if not qd_start.isValid():
-                    continue
-                if not qd_end.isValid():
-                    qd_end = qd_start
-            except Exception:
-                continue
-
-            days = qd_start.daysTo(qd_end)
-            for i in range(max(0, days) + 1):
-                d = qd_start.addDays(i)
-                key = d.toString("yyyy-MM-dd")
-                self.events_by_date.setdefault(key, []).append(label)
+    def events_on(self, day: date) -> list[Event]:
+        """Events and recurring occurrences covering `day`, in start date/time order."""
+        return self._fetch_events(day, day)
+
+    def apply_change(self, change):
+        """Redraw only the dates one committed DB change touched (the repository is already patched)."""
+        if change.kind == RESET:
+            if self.user_id is None or change.user_id in (None, self.user_id):
+                self.refresh_from_db()
+            return
+        if self.user_id is not None and change.user_id != self.user_id:
+            return
+
+        if any(e.is_recurring for e in change.events()):
+            # A series (or one of its exceptions) can touch any cell of the grid
+            self._apply_date_formats()
+            self.update_events()
+            return
+        touched = set()
+        for e in change.events():
+            touched.update(self._grid_days(e))
+        for day in touched:
+            self._format_date(day, bool(self.events_on(day)))
+        if self.calendar.selectedDate().toPyDate() in touched:
+            self.update_events()
+
+    def _grid_days(self, e: Event):
+        """Dates of the visible grid the event covers (long spans are clipped)."""
+        if e.start_date is None:
+            return
+        first, last = self._grid
+        day = max(e.start_date, first)
+        end = min(e.end_date, last)
+        while day <= end:
+            yield day
+            day += ONE_DAY
+
+    @staticmethod
+    def _event_label(e: Event) -> str:
+        st, et = e.start_time_text, e.end_time_text
+        # Build a nice one-line label
+        when = f"{st}–{et}" if st and et else (st or et or "")
+        label = ("↻ " if e.is_recurring else "") + e.display_title + (f"  ({when})" if when else "")
+        if e.description:
+            label += f"\n    📝 {e.description}"
+        return label
 
     def update_events(self):
         """Refresh list for the currently selected date."""
-        selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
+        selected_date = self.calendar.selectedDate().toPyDate()
         self.events_list.clear()
-        items = self.events_by_date.get(selected_date, [])
+        items = self.events_on(selected_date)
         if items:
-            for text in items:
-                self.events_list.addItem(text)
+            for e in items:
+                self.events_list.addItem(self._event_label(e))
         else:
             self.events_list.addItem("No events for this day.")
 
     def _apply_date_formats(self):
-        """Highlight all dates that have events."""
-        # Clear previous formatting
-        for d in self._formatted_dates:
-            self.calendar.setDateTextFormat(d, qtg.QTextCharFormat())
-        self._formatted_dates.clear()
-
-        # Prepare highlight format
-        fmt = qtg.QTextCharFormat()
-        fmt.setFontWeight(qtg.QFont.Weight.Bold)
-        fmt.setForeground(qtg.QBrush(qtg.QColor("#ffffff")))
-        fmt.setBackground(qtg.QBrush(qtg.QColor(self.second_color)))
-
-        # Apply to all event dates visible in the month (or all; QCalendarWidget handles off-month cells)
-        for key in self.events_by_date.keys():
-            qd = qtc.QDate.fromString(key, "yyyy-MM-dd")
-            if qd.isValid():
-                self.calendar.setDateTextFormat(qd, fmt)
-                self._formatted_dates.append(qd)
+        """Highlight the dates of the visible grid that have events (42 cells at most)."""
+        first, last = self._grid
+        cells = (last - first).days + 1
+        # Difference array over the grid: O(k + cells) for k overlapping events
+        delta = [0] * (cells + 1)
+        for e in self._fetch_events(first, last):
+            delta[(max(e.start_date, first) - first).days] += 1
+            delta[(min(max(e.end_date, e.start_date), last) - first).days + 1] -= 1
+
+        # Cells from the previous page that are no longer visible
+        for day in [d for d in self._formatted_dates if not first <= d <= last]:
+            self._format_date(day, False)
+
+        running = 0
+        for i in range(cells):
+            running += delta[i]
+            self._format_date(first + timedelta(days=i), running > 0)
+
+    def _format_date(self, day: date, has_events: bool):
+        """Highlight one date or clear it; cells already in the right state are left alone."""
+        if has_events == (day in self._formatted_dates):
+            return
+        qd = qtc.QDate(day.year, day.month, day.day)
+        if has_events:
+            self.calendar.setDateTextFormat(qd, self._event_format)
+            self._formatted_dates.add(day)
+        else:
+            self.calendar.setDateTextFormat(qd, qtg.QTextCharFormat())
+            self._formatted_dates.discard(day)
@@ -1,8 +1,27 @@
 import PyQt6.QtCore as qtc
 import PyQt6.QtWidgets as qtw
-from ai_call import function_call # Assuming you have a module `ai_call` for API integration
-from DB.sqlite import CalendarDB
-from datetime import date, timedelta, datetime
+from ai_call import function_call_stream # Assuming you have a module `ai_call` for API integration
+from DB.sqlite import get_db
+from DB.records import Message
+from workers import Worker
+from context_builder import ContextBuilder
+from response_cache import ResponseCache
+from transcript import TranscriptView
+from DB.search import MESSAGES, search_terms
+from event_repository import EventRepository
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from DB.records import parse_date, parse_time
+from utils.free_slots import describe_slots, WEEKDAYS_ONLY
+from utils.recurrence import is_valid_rrule
+
+HISTORY_LOAD_LIMIT = 200  # messages loaded into the transcript at startup
+HISTORY_PAGE_SIZE = 100   # older messages paged in when scrolling to the top
+FREE_SLOTS_MAX_DAYS = 62  # longest range the find_free_slots tool searches
+FREE_SLOTS_MAX_RESULTS = 20
+CONVERSATION_TITLE_CHARS = 40
+HISTORY_SEARCH_LIMIT = 50
+HISTORY_SEARCH_DEBOUNCE_MS = 200
 
 
 class ChatView(qtw.QWidget):
@@ -32,14 +51,15 @@ class ChatView(qtw.QWidget):
         - EXCLUDE user messages that are already handled
         """
         safe = []
-        for m in self.messages:
+        # Anything older than the startup window reaches the model via the rolling summary
+        for m in self.messages[-HISTORY_LOAD_LIMIT:]:
             # skip handled user messages
-            if m.get("role") == "user" and m.get("handled", 0) == 1:
+            if m.role == "user" and m.handled == 1:
                 continue
-            text = self._to_safe_text(m.get("content"))
+            text = self._to_safe_text(m.content)
             if text == "[no text content]":
                 continue
-            safe.append({"role": m.get("role", "user"), "content": text})
+            safe.append({"role": m.role or "user", "content": text, "id": m.id})
         return safe
 
 
@@ -49,66 +69,105 @@ class ChatView(qtw.QWidget):
         Returns a short list of upcoming events, shaped for the prompt.
         Keys: title, start_date, start_time, location (optional).
         """
-        # Get events from DB
+        today = date.today()
+        # Served from the shared repository, which stays in step with every write
         try:
-            if self.user_id is not None and hasattr(self.db, "get_events"):
-                rows = self.db.get_events(self.user_id)  # may be tuples
-                cols = ["id","user_id","title","description","start_date","end_date","start_time","end_time"]
-                if rows and not isinstance(rows[0], dict):
-                    rows = [dict(zip(cols, r)) for r in rows]
-            elif hasattr(self.db, "get_all_events"):
-                rows = self.db.get_all_events()
-            else:
-                rows = []
+            rows = self.repo.agenda(today, today + timedelta(days=days_ahead), limit=limit)
         except Exception as e:
             print("recent events load failed:", e)
             rows = []
-
-        # Filter to next N days and shape
-        today = date.today()
-        until = today + timedelta(days=days_ahead)
-
-        def parse(d):
-            try:
-                return datetime.strptime(d, "%Y-%m-%d").date()
-            except Exception:
-                return None
-
-        upcoming = []
-        for r in rows:
-            sd = parse((r.get("start_date") or "").strip())
-            if not sd:
-                continue
-            if today <= sd <= until:
-                upcoming.append({
-                    "title": (r.get("title") or "").strip() or "(Untitled)",
-                    "start_date": sd.isoformat(),
-                    "start_time": (r.get("start_time") or "").strip(),
-                    # include if your schema has it; otherwise it will be blank
-                    "location": (r.get("location") or "").strip()
-                })
-
-        # sort and cap
-        upcoming.sort(key=lambda e: (e["start_date"], e.get("start_time","") or "00:00"))
-        return upcoming[:limit]
-
-    def __init__(self, palette, userid=None):
+        return [e.to_prompt_dict() for e in rows if e.start_date]
+
+    def _find_free_slots_tool(self, start_date, end_date, duration_minutes, work_start="09:00",
+                              work_end="17:00", include_weekends=False):
+        """find_free_slots tool executor (runs on the chat worker thread)."""
+        first, last = parse_date(start_date), parse_date(end_date)
+        ws, we = parse_time(work_start) or time(9, 0), parse_time(work_end) or time(17, 0)
+        if first is None or last is None:
+            return {"error": "start_date and end_date must be YYYY-MM-DD"}
+        if last < first:
+            first, last = last, first
+        last = min(last, first + timedelta(days=FREE_SLOTS_MAX_DAYS - 1))
+        duration = timedelta(minutes=max(5, int(duration_minutes)))
+
+        # Never offer time that has already passed
+        start = max(datetime.combine(first, time()), datetime.now().replace(second=0, microsecond=0))
+        end = datetime.combine(last + timedelta(days=1), time())
+        slots = self.repo.find_free_slots(start, end, duration, working_hours=(ws, we),
+                                          weekdays=None if include_weekends else WEEKDAYS_ONLY,
+                                          limit=FREE_SLOTS_MAX_RESULTS + 1)
+        return {
+            "searched": f"{first.isoformat()}..{last.isoformat()} {ws:%H:%M}-{we:%H:%M}",
+            "slots": describe_slots(slots[:FREE_SLOTS_MAX_RESULTS]),
+            "more_available": len(slots) > FREE_SLOTS_MAX_RESULTS,
+        }
+
+    def __init__(self, palette, userid=None, db=None, repo=None, reminders=None):
         super().__init__()
         # Set up layout
         self.user_id = userid
-        self.db = CalendarDB()
-        self.messages = self.db.get_messages_for_chat(conversation_id=1)
+        self.db = db or get_db()
+        # Each conversation has its own history and rolling summary; only the open one is loaded
+        self.conversation_id = self.db.default_conversation(self.user_id)
+        self.messages = []
+        self._context_builders = {}  # conversation_id -> ContextBuilder, created on first use
+        self.response_cache = ResponseCache(self.db)
+        # Upcoming events, clash warnings and free slots come from the shared in-memory calendar
+        self.repo = repo or EventRepository(self.db, self.user_id)
+        # ReminderScheduler for "remind me ..." suggestions; None = reminders off
+        self.reminders = reminders
         self.second_color = palette[1]
         self.third_color = palette[2]
         self.fourth_color = palette[3]
-        print(self.messages)
 
         self.pending_event = None
         self.pending_ui_open = False  # optional but nice to have
 
+        # Background chat turns (see workers.py)
+        self.thread_pool = qtc.QThreadPool.globalInstance()
+        self._current_worker = None
+        self._queue = deque()
+        self._reset_stream_state()
+
+
+        outer = qtw.QHBoxLayout()
+        self.setLayout(outer)
+
+        # Conversation list
+        sidebar = qtw.QVBoxLayout()
+        # Full-text search over every chat; results replace the list while a query is typed
+        self.history_search = qtw.QLineEdit()
+        self.history_search.setPlaceholderText("Search chats…")
+        self.history_search.setFixedWidth(170)
+        self._history_search_timer = qtc.QTimer(self)
+        self._history_search_timer.setSingleShot(True)
+        self._history_search_timer.setInterval(HISTORY_SEARCH_DEBOUNCE_MS)
+        self._history_search_timer.timeout.connect(self._search_history)
+        self.history_search.textChanged.connect(self._history_search_timer.start)
+        self.search_results = qtw.QListWidget()
+        self.search_results.setFixedWidth(170)
+        self.search_results.setWordWrap(True)
+        self.search_results.setStyleSheet(f"border: 1px solid {self.second_color}; border-radius: 5px;")
+        self.search_results.itemActivated.connect(self._open_search_result)
+        self.search_results.itemClicked.connect(self._open_search_result)
+        self.search_results.setVisible(False)
+        self.conversation_list = qtw.QListWidget()
+        self.conversation_list.setFixedWidth(170)
+        self.conversation_list.setStyleSheet(f"border: 1px solid {self.second_color}; border-radius: 5px;")
+        self.conversation_list.currentItemChanged.connect(self._on_conversation_selected)
+        self.new_chat_button = qtw.QPushButton("＋ New chat")
+        self.new_chat_button.clicked.connect(self.new_conversation)
+        self.archive_button = qtw.QPushButton("Archive chat")
+        self.archive_button.clicked.connect(self.archive_current_conversation)
+        sidebar.addWidget(self.history_search)
+        sidebar.addWidget(self.search_results, 1)
+        sidebar.addWidget(self.conversation_list, 1)
+        sidebar.addWidget(self.new_chat_button)
+        sidebar.addWidget(self.archive_button)
+        outer.addLayout(sidebar)
 
         self.layout = qtw.QVBoxLayout()
-        self.setLayout(self.layout)
+        outer.addLayout(self.layout, 1)
         print(palette)
         # Add a label
         label = qtw.QLabel("Chat with AI")
@@ -116,22 +175,27 @@ class ChatView(qtw.QWidget):
         label.setStyleSheet("font-size: 24px; font-weight: bold; margin: 10px;")
         self.layout.addWidget(label)
 
-        # Add a scroll area for messages
-        self.messages_widget = qtw.QWidget()
-        self.messages_layout = qtw.QVBoxLayout()
-        self.messages_layout.setAlignment(qtc.Qt.AlignmentFlag.AlignTop)
-        self.messages_widget.setLayout(self.messages_layout)
-        self.scroll_area = qtw.QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setWidget(self.messages_widget)
-        self.scroll_area.verticalScrollBar().rangeChanged.connect(self.scrollToBottom)
-        
-        self.layout.addWidget(self.scroll_area)
-        for message in self.messages:
-            if 'content' in message and 'role' in message:
-                self.add_message(message['content'], message['role'])
-            else:
-                print(f"Malformed message data: {message}")
+        # Transcript: a model/view list that only paints visible bubbles
+        self.transcript = TranscriptView(self.second_color, self.third_color)
+        self._history_exhausted = True
+        self.transcript.nearTop.connect(self._load_older_messages)
+        self.layout.addWidget(self.transcript, 1)
+
+        # Event suggestions sit between the transcript and the input
+        self.suggestion_area = qtw.QVBoxLayout()
+        self.layout.addLayout(self.suggestion_area)
+
+        # Typing indicator + cancel, visible only while a reply is in flight
+        typing_row = qtw.QHBoxLayout()
+        self.typing_label = qtw.QLabel()
+        self.typing_label.setStyleSheet("font-style: italic; padding: 2px 5px;")
+        self.cancel_button = qtw.QPushButton("Cancel")
+        self.cancel_button.setStyleSheet("padding: 4px 10px; border-radius: 5px;")
+        self.cancel_button.clicked.connect(self.cancel_current_turn)
+        typing_row.addWidget(self.typing_label)
+        typing_row.addStretch(1)
+        typing_row.addWidget(self.cancel_button)
+        self.layout.addLayout(typing_row)
         # Add a text edit widget
         self.text_edit = qtw.QTextEdit()
         self.text_edit.setPlaceholderText("Type your message here...")
@@ -149,120 +213,335 @@ class ChatView(qtw.QWidget):
         send_button.clicked.connect(self.handle_send_message)
         self.layout.addWidget(send_button)
 
+        self._refresh_conversation_list()
+        self._load_conversation(self.conversation_id)
+        self._update_typing_indicator()
+        self.thread_pool.start(Worker(self.repo.warm))
+
     def scrollToBottom (self, minVal=None, maxVal=None):
     # Additional params 'minVal' and 'maxVal' are declared because
     # rangeChanged signal sends them, but we set it to optional
     # because we may need to call it separately (if you need).
         
-        self.scroll_area.verticalScrollBar().setValue(
-            self.scroll_area.verticalScrollBar().maximum()
-        )
+        self.transcript.scrollToBottom()
 
     def handle_send_message(self):
         text = self.text_edit.toPlainText().strip()
         if not text:
             return
 
-
         self.add_message(text, "user")
-        self.messages.append({"role": "user", "content": text})
         self.text_edit.clear()
-        msg_id = self.db.save_message(conversation_id=1, sender="user", message=text)
-        self.messages[-1]["id"] = msg_id
-        self.messages[-1]["handled"] = 0
-        print("mes: ", self.messages)
-
 
-        ai_response, event = self.get_ai_response(text)
+        # Turns run one at a time in the background; anything sent meanwhile waits its turn
+        self._queue.append(text)
+        self._dispatch_next_turn()
 
-        ai_text = self._to_safe_text(ai_response)
+    def _dispatch_next_turn(self):
+        if self._current_worker is not None or not self._queue:
+            self._update_typing_indicator()
+            return
 
+        text = self._queue.popleft()
+        # Snapshot on the UI thread; the worker must not read self.messages
+        history = self._sanitized_history()
+        worker = Worker(self._run_chat_turn, text, history, self.pending_ui_open,
+                        self.conversation_id, self._context_builder_for(self.conversation_id))
+        worker.signals.progress.connect(self._on_turn_progress)
+        worker.signals.result.connect(self._on_turn_result)
+        worker.signals.error.connect(self._on_turn_error)
+        worker.signals.cancelled.connect(self._on_turn_cancelled)
+        worker.signals.finished.connect(self._on_turn_finished)
+        self._current_worker = worker
+        self._update_typing_indicator()
+        self.thread_pool.start(worker)
+
+    def cancel_current_turn(self):
+        """Stop waiting for the in-flight reply; queued messages still get sent."""
+        if self._current_worker is not None:
+            self._current_worker.cancel()
+
+    def _run_chat_turn(self, text, history, has_pending, conversation_id, context_builder, worker):
+        """
+        One chat turn, run on a pool thread: DB writes, recent-events lookup and the model call.
+        Only touches self.db and pure helpers -- never widgets or self.messages.
+        """
+        user_msg_id = self.db.save_message(conversation_id=conversation_id, sender="user", message=text,
+                                           user_id=self.user_id)
+        worker.report({"kind": "user_saved", "user_message_id": user_msg_id, "text": text,
+                       "conversation_id": conversation_id})
+
+        ai_response, event = "", None
+        if not worker.is_cancelled:
+            # Recent turns that fit the token budget + summary of the rest
+            history = context_builder.build(history)
+            print("DEBUG context:", context_builder.last_stats)
+            recent = self._recent_events_for_prompt(days_ahead=30, limit=10)
+        if not worker.is_cancelled:
+            stream = function_call_stream(text, history, recent_events=recent, has_pending=has_pending,
+                                          cache=self.response_cache,
+                                          events_version=self.db.get_events_version(self.user_id),
+                                          user_id=self.user_id,
+                                          tool_executors={"find_free_slots": self._find_free_slots_tool})
+            try:
+                # Text deltas and the tool call reach the UI as soon as they arrive
+                for kind, payload in stream:
+                    if worker.is_cancelled:
+                        break
+                    if kind == "delta":
+                        worker.report({"kind": "delta", "text": payload})
+                    elif kind == "event":
+                        worker.report({"kind": "event", "event": payload})
+                    elif kind == "done":
+                        ai_response, event = payload
+            except Exception as e:
+                ai_response, event = f"Error: {e}", None
+            finally:
+                stream.close()  # closes the HTTP response if we stopped early
+
+        if worker.is_cancelled:
+            # Don't let a request the user gave up on resurface in later prompts. The
+            # "user_saved" report may have been dropped by the cancel, so say which one.
+            self.db.mark_message_handled(user_msg_id)
+            return {"user_message_id": user_msg_id, "text": text, "conversation_id": conversation_id}
 
-        self.add_message(ai_text, "ai")
-        aid = self.db.save_message(conversation_id=1, sender="assistant", message=ai_text)
-        self.messages.append({"role": "assistant", "content": ai_text, "id": aid})
+        ai_text = self._to_safe_text(ai_response)
 
-        metadata = None
-        if hasattr(ai_response, "model_dump"):
+        # if the model produced a tool call, mark the prompting user msg handled now
+        handled_id = None
+        if event:
             try:
-                metadata = ai_response.model_dump()
+                handled_id = self.db.mark_last_unhandled_user_message_handled(conversation_id=conversation_id)
             except Exception:
-                metadata = None
-
-        self.db.save_message(
-            conversation_id=1,
-            sender="assistant",
-            message=ai_text,
-        )
+                handled_id = None
+
+        aid = self.db.save_message(conversation_id=conversation_id, sender="assistant", message=ai_text,
+                                   user_id=self.user_id)
+        return {
+            "user_message_id": user_msg_id,
+            "assistant_message_id": aid,
+            "ai_text": ai_text,
+            "event": event,
+            "handled_id": handled_id,
+        }
+
+    def _on_turn_progress(self, info):
+        kind = info["kind"]
+        if kind == "user_saved":
+            self._remember_user_message(info)
+        elif kind == "delta":
+            # Grow the assistant bubble token by token
+            self._streamed_text += info["text"]
+            if self._streaming_label is None:
+                self._streaming_label = self.add_message(self._streamed_text, "ai")
+            else:
+                self._set_bubble_text(self._streaming_label, self._streamed_text)
+        elif kind == "event":
+            # Tool-call JSON is complete: open the suggestion without waiting for the stream to end
+            self.pending_event = info["event"]
+            self._streamed_event_shown = True
+            self.add_event_suggestion_widget(info["event"])
+
+    def _on_turn_result(self, result):
+        event = result["event"]
         if event:
+            # reflect in memory so _sanitized_history drops it immediately
+            self._mark_user_message_handled(result["handled_id"] or result["user_message_id"])
+
+        # The streamed bubble becomes the stored assistant message
+        if self._streaming_label is None:
+            item = self.add_message(result["ai_text"], "ai")
+        else:
+            item = self._streaming_label
+            self._set_bubble_text(item, result["ai_text"])
+        item.id = result["assistant_message_id"]
+        item.conversation_id = self.conversation_id
+        self.messages.append(item)
+        if event and not self._streamed_event_shown:
+            # Keep a pending event reference for the UI confirm button
+            self.pending_event = event
             self.add_event_suggestion_widget(event)
 
+    def _on_turn_error(self, error):
+        self.add_message(f"Error: {error}", "ai")
+
+    def _on_turn_cancelled(self, saved):
+        self.add_message("⏹️ Cancelled.", "ai")
+        if saved is None:
+            return   # failed before the user message was stored
+        if not any(m.id == saved["user_message_id"] for m in self.messages):
+            self._remember_user_message(saved)   # cancelled before "user_saved" was reported
+        self._mark_user_message_handled(saved["user_message_id"])
+
+    def _remember_user_message(self, info):
+        """Add the user message a turn stored to self.messages (the history source)."""
+        self.messages.append(Message(id=info["user_message_id"], conversation_id=info["conversation_id"],
+                                     user_id=self.user_id, role="user", content=info["text"], handled=0))
+        self._maybe_title_conversation(info["conversation_id"], info["text"])
+
+    def _on_turn_finished(self):
+        self._current_worker = None
+        self._reset_stream_state()
+        self._dispatch_next_turn()
+
+    def _reset_stream_state(self):
+        self._streaming_label = None
+        self._streamed_text = ""
+        self._streamed_event_shown = False
+
+    def _mark_user_message_handled(self, message_id):
+        for m in reversed(self.messages):
+            if m.id == message_id:
+                m.handled = 1
+                return
+        # fallback: mark latest unhandled user msg
+        for m in reversed(self.messages):
+            if m.role == "user" and m.handled != 1:
+                m.handled = 1
+                return
+
+    def _update_typing_indicator(self):
+        busy = self._current_worker is not None
+        queued = len(self._queue)
+        text = "Assistant is typing…"
+        if queued:
+            text += f" ({queued} queued)"
+        self.typing_label.setText(text)
+        self.typing_label.setVisible(busy)
+        self.cancel_button.setVisible(busy)
+        # Turns belong to the open conversation, so no switching while one is in flight
+        for widget in (self.conversation_list, self.search_results, self.new_chat_button, self.archive_button):
+            widget.setEnabled(not busy and not queued)
+
+    def _set_bubble_text(self, item, text):
+        """Update a bubble's text (e.g. while streaming); only that row is re-measured."""
+        item.content = self._to_safe_text(text)
+        self.transcript.refresh_message(item)
+
     def add_message(self, text, role):
-        """Add a message to the UI and the messages list."""
-        text = self._to_safe_text(text)
-        message_layout = qtw.QHBoxLayout()
-        # Create the message bubble
-        message_label = qtw.QLabel(text)
-        message_label.setWordWrap(True)
-        message_label.setStyleSheet("padding: 10px; margin: 5px; color: white;")
-        message_label.setAlignment(qtc.Qt.AlignmentFlag.AlignVCenter)
-
-        # Calculate content width with a maximum of 70% of the current window width
-        text_width = message_label.fontMetrics().boundingRect(text).width()
-        max_width = int(self.width() * 0.7)
-        content_width = min(text_width + 20, max_width)
-        message_label.setFixedWidth(content_width+20)
-        message_label.setSizePolicy(qtw.QSizePolicy.Policy.Minimum, qtw.QSizePolicy.Policy.Preferred)
-
-        if role == "user":
-            # Style user messages
-            message_label.setStyleSheet(f" background-color: {self.second_color}; {message_label.styleSheet()}")
-            message_label.setAlignment(qtc.Qt.AlignmentFlag.AlignRight)
-            message_layout.addStretch(1)  # Push to the right
-            message_layout.addWidget(message_label)
-        else:  # AI response
-            # Style AI messages
-            message_label.setStyleSheet(f"background-color: {self.third_color}; {message_label.styleSheet()}")
-            message_layout.addWidget(message_label)
-            message_layout.addStretch(1)  # Push to the left
-
-        self.messages_layout.addLayout(message_layout)
-        self.messages_widget.adjustSize()
-        self.scroll_area.verticalScrollBar().setSliderPosition(self.scroll_area.verticalScrollBar().maximum())
-
-    def get_ai_response(self, user_message):
+        """Append a bubble to the transcript and return its (display) Message."""
+        item = Message(role="user" if role == "user" else "assistant", content=self._to_safe_text(text))
+        self.transcript.transcript_model.append_message(item)
+        self.transcript.scrollToBottom()
+        return item
+
+    def _load_older_messages(self):
+        """Page the previous HISTORY_PAGE_SIZE messages in above the current ones."""
+        if self._history_exhausted:
+            return
+        oldest = self.messages[0].id if self.messages else None
+        if oldest is None:
+            self._history_exhausted = True
+            return
+        older = self.db.get_messages_before(conversation_id=self.conversation_id, before_id=oldest,
+                                            limit=HISTORY_PAGE_SIZE)
+        if len(older) < HISTORY_PAGE_SIZE:
+            self._history_exhausted = True
+        if older:
+            self.messages[:0] = older
+            self.transcript.prepend_keeping_position(older)
+
+    def _context_builder_for(self, conversation_id):
+        builder = self._context_builders.get(conversation_id)
+        if builder is None:
+            builder = ContextBuilder(self.db, conversation_id=conversation_id)
+            self._context_builders[conversation_id] = builder
+        return builder
+
+    def _refresh_conversation_list(self):
+        self.conversation_list.blockSignals(True)
+        self.conversation_list.clear()
+        for conv in self.db.list_conversations(self.user_id):
+            item = qtw.QListWidgetItem(conv.display_title)
+            item.setData(qtc.Qt.ItemDataRole.UserRole, conv.id)
+            self.conversation_list.addItem(item)
+            if conv.id == self.conversation_id:
+                self.conversation_list.setCurrentItem(item)
+        self.conversation_list.blockSignals(False)
+
+    def _load_conversation(self, conversation_id):
+        """Show one conversation: only its newest page is read, older ones load on scroll."""
+        self.conversation_id = conversation_id
+        self.messages = self.db.get_recent_messages_for_chat(conversation_id, limit=HISTORY_LOAD_LIMIT)
+        self._history_exhausted = len(self.messages) < HISTORY_LOAD_LIMIT
+        self._clear_event_suggestions()
+        self.transcript.reset_messages(self.messages)
+
+    def _on_conversation_selected(self, current, previous):
+        if current is None:
+            return
+        conversation_id = current.data(qtc.Qt.ItemDataRole.UserRole)
+        if conversation_id != self.conversation_id:
+            self._load_conversation(conversation_id)
+
+    def _search_history(self):
+        """Show ranked message hits (with highlighted snippets) for the search box."""
+        query = self.history_search.text()
+        searching = bool(search_terms(query))
+        self.search_results.setVisible(searching)
+        self.conversation_list.setVisible(not searching)
+        self.search_results.clear()
+        if not searching:
+            return
         try:
-            recent = self._recent_events_for_prompt(days_ahead=30, limit=10)
-            res, event = function_call(user_message, self._sanitized_history(), recent_events=recent, has_pending=self.pending_ui_open)
-
-            # ⬇️ NEW: if the model produced a tool call, mark the prompting user msg handled now
-            if event:
-                try:
-                    handled_id = self.db.mark_last_unhandled_user_message_handled(conversation_id=1)
-                except Exception:
-                    handled_id = None
-
-                # reflect in memory so _sanitized_history drops it immediately
-                if handled_id:
-                    for m in reversed(self.messages):
-                        if m.get("id") == handled_id:
-                            m["handled"] = 1
-                            break
-                else:
-                    # fallback: mark latest unhandled user msg
-                    for m in reversed(self.messages):
-                        if m.get("role") == "user" and m.get("handled", 0) != 1:
-                            m["handled"] = 1
-                            break
-
-                # Keep a pending event reference for the UI confirm button
-                self.pending_event = event
-
-            return res, event
+            hits = self.db.search(query, self.user_id, kind=MESSAGES, limit=HISTORY_SEARCH_LIMIT)
+            titles = {c.id: c.display_title for c in self.db.list_conversations(self.user_id, include_archived=True)}
         except Exception as e:
-            return f"Error: {e}", None
-
-
+            print("chat search failed:", e)
+            hits, titles = [], {}
+        if not hits:
+            self.search_results.addItem("No matching messages.")
+            return
+        for hit in hits:
+            msg = hit.record
+            who = "You" if msg.role == "user" else "AI"
+            title = titles.get(msg.conversation_id, f"Chat {msg.conversation_id}")
+            item = qtw.QListWidgetItem(f"{title}\n{who}: {hit.snippet}")
+            item.setData(qtc.Qt.ItemDataRole.UserRole, msg.conversation_id)
+            self.search_results.addItem(item)
+
+    def _open_search_result(self, item):
+        conversation_id = item.data(qtc.Qt.ItemDataRole.UserRole)
+        if conversation_id is None or not self.search_results.isEnabled():
+            return
+        if conversation_id != self.conversation_id:
+            self._load_conversation(conversation_id)
+            self._refresh_conversation_list()
+
+    def new_conversation(self):
+        # Reuse the open chat if nothing has been said in it yet
+        if self.messages:
+            self.conversation_id = self.db.create_conversation(self.user_id)
+        self._refresh_conversation_list()
+        self._load_conversation(self.conversation_id)
+        self.text_edit.setFocus()
+
+    def archive_current_conversation(self):
+        """Hide the open chat from the list; its messages stay in the DB."""
+        self.db.archive_conversation(self.conversation_id)
+        self._context_builders.pop(self.conversation_id, None)
+        self.conversation_id = self.db.default_conversation(self.user_id)
+        self._refresh_conversation_list()
+        self._load_conversation(self.conversation_id)
+
+    def _maybe_title_conversation(self, conversation_id, text):
+        """Name a fresh chat after its first message."""
+        conv = self.db.get_conversation(conversation_id)
+        if conv is None or conv.title != "New chat":
+            return
+        title = " ".join(text.split())
+        if len(title) > CONVERSATION_TITLE_CHARS:
+            title = title[:CONVERSATION_TITLE_CHARS - 1] + "…"
+        self.db.rename_conversation(conversation_id, title)
+        self._refresh_conversation_list()
+
+    def _clear_event_suggestions(self):
+        while self.suggestion_area.count():
+            widget = self.suggestion_area.takeAt(0).widget()
+            if widget is not None:
+                widget.setParent(None)
+        self.pending_event = None
+        self.pending_ui_open = False
 
     def add_event_suggestion_widget(self, event_suggestion):
         """Display an event suggestion UI in the chat."""
@@ -275,6 +554,10 @@ class ChatView(qtw.QWidget):
         time_label_start = qtw.QTimeEdit(qtc.QTime.fromString(event_suggestion['start_time'], "HH:mm"))
         time_label_end = qtw.QTimeEdit(qtc.QTime.fromString(event_suggestion['end_time'], "HH:mm"))
         desc_label = qtw.QLabel(f"📝 {event_suggestion['description']}")
+        repeat_label = qtw.QLabel(f"↻ Repeats: {event_suggestion['rrule']}") if event_suggestion.get("rrule") else None
+        reminder = self._reminder_minutes(event_suggestion)
+        reminder_label = qtw.QLabel(f"🔔 {self._reminder_text(reminder)}") if reminder is not None else None
+        clash_label = self._clash_label(event_suggestion)
 
         add_button = qtw.QPushButton("✅ Add Event")
         cancel_button = qtw.QPushButton("❌ Cancel")
@@ -291,22 +574,47 @@ class ChatView(qtw.QWidget):
         suggestion_layout.addWidget(time_label_start)
         suggestion_layout.addWidget(time_label_end)
         suggestion_layout.addWidget(desc_label)
+        if repeat_label is not None:
+            suggestion_layout.addWidget(repeat_label)
+        if reminder_label is not None:
+            suggestion_layout.addWidget(reminder_label)
+        if clash_label is not None:
+            suggestion_layout.addWidget(clash_label)
         suggestion_layout.addWidget(add_button)
         suggestion_layout.addWidget(cancel_button)
         suggestion_widget.setLayout(suggestion_layout)
 
-        self.messages_layout.addWidget(suggestion_widget)
+        self.suggestion_area.addWidget(suggestion_widget)
 
         self.pending_event = event_suggestion
         self.pending_ui_open = True
 
-        self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum())
+        self.transcript.scrollToBottom()
+
+    def _clash_label(self, event_suggestion):
+        """A warning listing existing events the suggestion overlaps, or None."""
+        try:
+            clashes = self.repo.conflicts_for(event_suggestion)
+        except Exception as e:
+            print("clash check failed:", e)
+            return None
+        if not clashes:
+            return None
+        lines = []
+        for e in clashes[:3]:
+            when = f"{e.start_time_text}–{e.end_time_text}" if e.start_time else "all day"
+            lines.append(f"{e.display_title} ({e.start_date.isoformat()} {when})")
+        if len(clashes) > 3:
+            lines.append(f"…and {len(clashes) - 3} more")
+        label = qtw.QLabel("⚠️ Overlaps with:\n" + "\n".join(lines))
+        label.setStyleSheet("color: #FFB347; font-weight: bold;")
+        return label
 
     def confirm_add_event(self, event_suggestion, suggestion_widget):
         user_id = self.user_id  # your real user id
 
         # Skip if exists (nice UX message)
-        if hasattr(self.db, "event_exists") and self.db.event_exists(
+        if self.db.event_exists(
             user_id=user_id,
             title=event_suggestion["title"],
             start_date=event_suggestion["start_date"],
@@ -318,8 +626,13 @@ class ChatView(qtw.QWidget):
             self.remove_event_suggestion(suggestion_widget)
             return
 
+        rrule = event_suggestion.get("rrule") or None
+        if rrule and not is_valid_rrule(rrule):
+            self.add_message(f"⚠️ Unsupported repeat rule ({rrule}) — adding a single event instead.", "ai")
+            rrule = None
+
         # Idempotent insert (will update description if same signature)
-        self.db.add_event(
+        event_id = self.db.add_event(
             user_id=user_id,
             title=event_suggestion["title"],
             description=event_suggestion.get("description"),
@@ -327,16 +640,21 @@ class ChatView(qtw.QWidget):
             end_date=event_suggestion["end_date"],
             start_time=event_suggestion.get("start_time"),
             end_time=event_suggestion.get("end_time"),
+            rrule=rrule,
+            location=event_suggestion.get("location"),
         )
-        
+        reminder = self._reminder_minutes(event_suggestion)
+        if reminder is not None and self.reminders is not None:
+            self.reminders.add(event_id, reminder)
 
-        handled_id = self.db.mark_last_unhandled_user_message_handled(conversation_id=1)
+
+        handled_id = self.db.mark_last_unhandled_user_message_handled(conversation_id=self.conversation_id)
 
         # Make history consistent in memory
         for m in reversed(self.messages):
-            if m.get("role") == "user" and m.get("handled", 0) != 1:
-                m["handled"] = 1
-                if handled_id and "id" in m and m["id"] == handled_id:
+            if m.role == "user" and m.handled != 1:
+                m.handled = 1
+                if handled_id and m.id == handled_id:
                     # (optional) you matched the exact row
                     pass
                 break
@@ -345,22 +663,24 @@ class ChatView(qtw.QWidget):
         self.add_message("✅ Event successfully added!", "ai")
         self.remove_event_suggestion(suggestion_widget)
 
-    # if you have CalendarView/TaskView instances, refresh them here
-    # self.calendar_view.refresh_from_db()
-    # self.task_view.refresh_from_db()
+    @staticmethod
+    def _reminder_minutes(event_suggestion) -> int | None:
+        """The suggestion's reminder lead time in minutes, None if it asks for no reminder."""
+        try:
+            return max(0, int(event_suggestion.get("reminder_minutes")))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _reminder_text(minutes: int) -> str:
+        if minutes == 0:
+            return "Reminder at the start"
+        if minutes % 60 == 0:
+            return f"Reminder {minutes // 60} h before"
+        return f"Reminder {minutes} min before"
+
     def remove_event_suggestion(self, widget):
         """Remove event suggestion widget."""
         widget.setParent(None)
         self.pending_event = None
         self.pending_ui_open = False
-    # def resizeEvent(self, event):
-    #     """Override resize event to adjust message widths dynamically."""
-    #     for i in range(self.messages_layout.count()):
-    #         item = self.messages_layout.itemAt(i)
-    #         if isinstance(item, qtw.QHBoxLayout):
-    #             for j in range(item.count()):
-    #                 widget = item.itemAt(j).widget()
-    #                 if isinstance(widget, qtw.QLabel):
-    #                     content_width = round(min(self.width() * 0.7, widget.fontMetrics().boundingRect(widget.text()).width() + 20))
-    #                     widget.setFixedWidth(content_width)
-    #     super().resizeEvent(event)  # Call parent resizeEvent
@@ -1,4 +1,10 @@
-from sqlite import CalendarDB
+import os
+import sys
+
+# Allow running this script directly from inside DB/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
 
 while True:
     name = input("Enter username: ")
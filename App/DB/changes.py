@@ -0,0 +1,69 @@
+"""
+In-process change notifications for the events table.
+
+CalendarDB publishes one EventChange per committed write, so views can patch
+their own indexes instead of re-querying everything. Subscribers are called on
+the thread that did the write; Qt widgets should listen through
+change_relay.ChangeRelay, which hops the delivery onto the UI thread.
+"""
+import threading
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+RESET = "reset"   # bulk change (import, user deleted, ...): reload whatever you show
+
+
+class EventChange:
+    """
+    One committed change. `event` is the row after the change (insert/update),
+    `old` the row before it (update/delete). A reset carries neither.
+    """
+    __slots__ = ("kind", "event", "old", "user_id")
+
+    def __init__(self, kind: str, event=None, old=None, user_id=None):
+        self.kind = kind
+        self.event = event
+        self.old = old
+        if user_id is None:
+            user_id = (event or old).user_id if (event or old) is not None else None
+        self.user_id = user_id
+
+    def events(self):
+        """The rows whose old and/or new state this change touches."""
+        return [e for e in (self.old, self.event) if e is not None]
+
+    def __repr__(self):
+        return f"EventChange({self.kind!r}, user_id={self.user_id!r}, event={self.event!r}, old={self.old!r})"
+
+
+class ChangeBus:
+    """A minimal thread-safe publish/subscribe list."""
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Register callback(change); returns a function that unsubscribes it."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def publish(self, change: EventChange):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                print("ChangeBus: subscriber failed:", e)
+
+
+# Shared by every CalendarDB that isn't given its own bus
+event_bus = ChangeBus()
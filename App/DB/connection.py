@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_PATH = "calendai.db"
+
+# Applied once per connection, right after it is opened.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",     # safe with WAL, far fewer fsyncs than FULL
+    "PRAGMA foreign_keys=ON;",
+    "PRAGMA cache_size=-16000;",      # ~16 MB page cache (negative = KiB)
+    "PRAGMA mmap_size=134217728;",    # 128 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY;",
+)
+
+
+def default_db_path() -> str:
+    """
+    Database file used when CalendarDB is created without an explicit path.
+    Override with the CALENDAI_DB_PATH environment variable.
+    """
+    return os.getenv("CALENDAI_DB_PATH") or DEFAULT_DB_PATH
+
+
+class ConnectionManager:
+    """
+    Keeps one long-lived sqlite connection per thread for a single database file.
+
+    - Connections are opened lazily and the PRAGMAs above run only once per connection.
+    - Connections are in autocommit mode (isolation_level=None); group writes with
+      `transaction()` to get a single BEGIN/COMMIT.
+    - sqlite3 keeps an LRU cache of prepared statements per connection keyed by the
+      SQL text, so reusing the same connection + the same SQL strings means each
+      statement is only compiled once.
+    """
+
+    def __init__(self, path: str, timeout: float = 10.0, cached_statements: int = 256):
+        self.path = path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,  # only close() touches it from another thread
+                cached_statements=self.cached_statements,
+            )
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.after_commit = []
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params) -> sqlite3.Cursor:
+        return self.connection().executemany(sql, seq_of_params)
+
+    def cursor(self, row_factory=None) -> sqlite3.Cursor:
+        """A cursor on this thread's connection, optionally with its own row factory."""
+        cur = self.connection().cursor()
+        if row_factory is not None:
+            cur.row_factory = row_factory
+        return cur
+
+    @contextmanager
+    def transaction(self, immediate: bool = True):
+        """
+        Run a block inside a single transaction and yield a cursor.
+        Nested use becomes a SAVEPOINT so helpers can be composed freely.
+        """
+        conn = self.connection()
+        depth = self._local.depth
+        pending = self._local.after_commit
+        mark = len(pending)
+        if depth == 0:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        else:
+            conn.execute(f"SAVEPOINT sp_{depth}")
+        self._local.depth = depth + 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            self._local.depth = depth
+            del pending[mark:]  # rolled-back work must not announce itself
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO sp_{depth}")
+                conn.execute(f"RELEASE sp_{depth}")
+            raise
+        else:
+            self._local.depth = depth
+            if depth == 0:
+                conn.execute("COMMIT")
+                self._run_after_commit()
+            else:
+                conn.execute(f"RELEASE sp_{depth}")
+
+    def after_commit(self, fn):
+        """
+        Call fn() once the current outermost transaction commits (dropped on rollback).
+        Outside a transaction it runs right away.
+        """
+        self.connection()
+        if self._local.depth == 0:
+            fn()
+        else:
+            self._local.after_commit.append(fn)
+
+    def _run_after_commit(self):
+        pending, self._local.after_commit = self._local.after_commit, []
+        for fn in pending:
+            try:
+                fn()
+            except Exception as e:
+                # The data is committed; a failing listener must not turn that into an error
+                print("DB: after-commit callback failed:", e)
+
+    @property
+    def in_transaction(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    def close(self):
+        """Close every connection opened by this manager (all threads)."""
+        with self._lock:
+            conns, self._connections = self._connections, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_managers: dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(path: str | None = None) -> ConnectionManager:
+    """
+    Shared ConnectionManager for a database path, so every CalendarDB pointing at
+    the same file reuses the same per-thread connections.
+    """
+    path = path or default_db_path()
+    if path == ":memory:" or path.startswith("file::memory:"):
+        # Every thread has its own connection, so each would get its own empty database
+        raise ValueError("CalendarDB needs a database file; use a temporary file instead of ':memory:'")
+    key = os.path.abspath(path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(path)
+        return manager
+
+
+def close_all():
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
@@ -0,0 +1,405 @@
+"""
+Versioned schema migrations for calendai.db.
+
+The schema version lives in `PRAGMA user_version`. Each migration runs in its own
+transaction together with the version bump, so a database is never left half
+upgraded. Existing files (created before migrations existed) report version 0 and
+are upgraded in place.
+
+To change the schema, append a new (version, description, function) entry to
+MIGRATIONS -- never edit one that has already shipped.
+"""
+import sqlite3
+
+
+def _m001_base_tables(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        start_time TEXT,
+        end_time TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id INTEGER NOT NULL,
+        user_id INTEGER,  -- nullable if system/assistant messages
+        sender TEXT NOT NULL CHECK(sender IN ('user','assistant','system')),
+        message TEXT NOT NULL,
+        metadata TEXT, -- JSON
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        handled INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """)
+
+
+def _m002_indexes_and_event_signature(cur):
+    # add_event stores missing times as '' -- older rows may hold NULL, which a
+    # UNIQUE index treats as always-distinct. Normalize before de-duplicating.
+    cur.execute("UPDATE events SET start_time='' WHERE start_time IS NULL")
+    cur.execute("UPDATE events SET end_time='' WHERE end_time IS NULL")
+
+    # Keep the oldest row of every duplicated signature so the unique index can be built
+    cur.execute("""
+        DELETE FROM events
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM events
+            GROUP BY user_id, title, start_date, start_time, end_date, end_time
+        )
+    """)
+
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_events_signature
+        ON events (user_id, title, start_date, start_time, end_date, end_time)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_user_start
+        ON events (user_id, start_date, start_time)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation
+        ON messages (conversation_id, id)
+    """)
+    # rowid (= id) is implicitly the last index column, so
+    # "... AND sender=? AND handled=0 ORDER BY id DESC LIMIT 1" is a single index seek.
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_unhandled
+        ON messages (conversation_id, sender, handled)
+    """)
+
+
+def _m003_events_end_index(cur):
+    # Range queries filter on "end_date >= window start"; for a calendar full of
+    # history that bound is what discards most rows, so it leads the index.
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_user_end
+        ON events (user_id, end_date, start_date)
+    """)
+
+
+def _m004_conversation_summaries(cur):
+    # Rolling summary of the turns that no longer fit the prompt's token budget.
+    # covered_upto_id = newest message id already folded into `summary`.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            conversation_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            covered_upto_id INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _m005_response_cache(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,      -- JSON: {"text": ..., "event": ...}
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_lru ON response_cache (last_access)")
+
+    # Per-user version stamp of the events table, bumped by triggers on every write,
+    # so cache keys (and anything else) can tell when a calendar changed.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS event_versions (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    bump = """
+        INSERT INTO event_versions (user_id, version) VALUES ({uid}, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+    """
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_events_version_insert AFTER INSERT ON events
+        BEGIN {bump.format(uid="NEW.user_id")} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_events_version_update AFTER UPDATE ON events
+        BEGIN {bump.format(uid="OLD.user_id")} {bump.format(uid="NEW.user_id")} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_events_version_delete AFTER DELETE ON events
+        BEGIN {bump.format(uid="OLD.user_id")} END
+    """)
+
+
+def _m006_messages_user_index(cur):
+    # Keyset pages over one user's messages ("user_id=? AND id<? ORDER BY id DESC")
+    # walk this index instead of scanning the whole messages table.
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_user
+        ON messages (user_id, id)
+    """)
+
+
+def _m007_conversations(cur):
+    # One row per chat; messages.conversation_id points here. user_id is NULL for
+    # chats created before this table existed -- the first user to open the chat
+    # view adopts them (CalendarDB.default_conversation).
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            title TEXT NOT NULL DEFAULT 'New chat',
+            archived INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    """)
+    # The sidebar lists a user's active chats, most recently used first
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conversations_user
+        ON conversations (user_id, archived, updated_at)
+    """)
+    # Every conversation id already used by messages gets a row
+    cur.execute("""
+        INSERT OR IGNORE INTO conversations (id, user_id, title, created_at, updated_at)
+        SELECT conversation_id,
+               (SELECT m2.user_id FROM messages m2
+                WHERE m2.conversation_id = m.conversation_id AND m2.user_id IS NOT NULL LIMIT 1),
+               'Chat ' || conversation_id,
+               MIN(timestamp), MAX(timestamp)
+        FROM messages m
+        GROUP BY conversation_id
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_messages_touch_conversation AFTER INSERT ON messages
+        BEGIN
+            UPDATE conversations SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.conversation_id;
+        END
+    """)
+
+
+def _m008_recurrence(cur):
+    # A recurring series is one events row with an RRULE (utils/recurrence.py);
+    # series_end is the last date any occurrence covers, NULL for endless series,
+    # so "series active in this window" is a range check instead of an expansion.
+    cur.execute("ALTER TABLE events ADD COLUMN rrule TEXT")
+    cur.execute("ALTER TABLE events ADD COLUMN series_end TEXT")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_series
+        ON events (user_id, series_end) WHERE rrule IS NOT NULL
+    """)
+    # Cancelled or moved/edited instances, keyed by the date the instance would have had
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS event_exceptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            original_date TEXT NOT NULL,
+            cancelled INTEGER NOT NULL DEFAULT 0,
+            start_date TEXT,
+            end_date TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            title TEXT,
+            description TEXT,
+            UNIQUE (event_id, original_date),
+            FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+        )
+    """)
+    # Exceptions change what the user's calendar shows, so they bump the same counter
+    bump = """
+        INSERT INTO event_versions (user_id, version)
+        SELECT user_id, 1 FROM events WHERE id = {eid}
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+    """
+    for op, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_event_exceptions_version_{op.lower()} AFTER {op} ON event_exceptions
+            BEGIN {bump.format(eid=ref + ".event_id")} END
+        """)
+
+
+def _m009_full_text_search(cur):
+    # Suggestions have always carried a location; now it is stored
+    cur.execute("ALTER TABLE events ADD COLUMN location TEXT NOT NULL DEFAULT ''")
+    # External-content FTS5 indexes: the text lives once, in events/messages, and
+    # the triggers below keep the index in step with every insert/update/delete.
+    try:
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+                title, description, location,
+                content='events', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5: CalendarDB.search falls back to LIKE
+        print(f"DB: full-text search unavailable ({e})")
+        return
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            message,
+            content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    for table, columns in (("events", ("title", "description", "location")), ("messages", ("message",))):
+        cols = ", ".join(columns)
+        new_vals = ", ".join(f"NEW.{c}" for c in columns)
+        old_vals = ", ".join(f"OLD.{c}" for c in columns)
+        delete = f"INSERT INTO {table}_fts ({table}_fts, rowid, {cols}) VALUES ('delete', OLD.id, {old_vals});"
+        insert = f"INSERT INTO {table}_fts (rowid, {cols}) VALUES (NEW.id, {new_vals});"
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table} BEGIN {delete} END")
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update AFTER UPDATE OF {cols} ON {table}
+            BEGIN {delete} {insert} END
+        """)
+        cur.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+def _m010_change_tracking(cur):
+    # Change log for incremental sync (sync/engine.py): one row per write, in commit
+    # order. A row's `version` is the seq of its latest log entry and `updated_at`
+    # that entry's time, so "what changed since token N" is a range scan on the log.
+    cur.execute("ALTER TABLE events ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    cur.execute("ALTER TABLE events ADD COLUMN updated_at TEXT")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS event_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            op TEXT NOT NULL,            -- 'upsert' | 'delete'
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_event_changes_user ON event_changes (user_id, seq)")
+    stamp = """
+        UPDATE events SET version = (SELECT MAX(seq) FROM event_changes),
+                          updated_at = (SELECT changed_at FROM event_changes ORDER BY seq DESC LIMIT 1)
+        WHERE id = NEW.id;
+    """
+    log = "INSERT INTO event_changes (user_id, event_id, op) VALUES ({ref}.user_id, {ref}.id, '{op}');"
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_events_changes_insert AFTER INSERT ON events
+        BEGIN {log.format(ref="NEW", op="upsert")} {stamp} END
+    """)
+    # Only content columns: the stamp above must not log itself
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_events_changes_update
+        AFTER UPDATE OF user_id, title, description, start_date, end_date, start_time, end_time,
+                        rrule, series_end, location ON events
+        BEGIN {log.format(ref="NEW", op="upsert")} {stamp} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_events_changes_delete AFTER DELETE ON events
+        BEGIN {log.format(ref="OLD", op="delete")} END
+    """)
+    # Existing rows count as changed once, so the first sync sends them
+    cur.execute("INSERT INTO event_changes (user_id, event_id, op) SELECT user_id, id, 'upsert' FROM events ORDER BY id")
+    cur.execute("""
+        UPDATE events SET version = c.seq, updated_at = c.changed_at
+        FROM event_changes c WHERE c.event_id = events.id
+    """)
+
+    # Per provider and user: how far the local log has been pushed, and the
+    # provider's opaque token for "changes after what we last pulled"
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            provider TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            local_seq INTEGER NOT NULL DEFAULT 0,
+            remote_token TEXT,
+            last_synced TEXT,
+            PRIMARY KEY (provider, user_id)
+        )
+    """)
+    # Local event <-> remote item. No FK: a deleted event still needs its remote id.
+    # synced_version is the events.version both sides last agreed on, which is how
+    # the engine tells our own writes (applied remote changes) from user edits.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sync_links (
+            provider TEXT NOT NULL,
+            event_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            remote_id TEXT NOT NULL,
+            etag TEXT,
+            synced_version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (provider, event_id),
+            UNIQUE (provider, user_id, remote_id)
+        )
+    """)
+
+
+def _m011_reminders(cur):
+    # Alerts N minutes before an event (each occurrence, for a series). fire_at is
+    # the next alert in local time ('YYYY-MM-DDTHH:MM', NULL when nothing is left
+    # to fire), precomputed by reminders.py so "what fires next" is a range scan.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            minutes_before INTEGER NOT NULL DEFAULT 15,
+            fire_at TEXT,
+            occurrence TEXT,             -- start date of the occurrence fire_at belongs to
+            UNIQUE (event_id, minutes_before),
+            FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_due
+        ON reminders (user_id, fire_at) WHERE fire_at IS NOT NULL
+    """)
+
+
+MIGRATIONS = [
+    (1, "base tables", _m001_base_tables),
+    (2, "indexes + unique event signature", _m002_indexes_and_event_signature),
+    (3, "events end_date index for range queries", _m003_events_end_index),
+    (4, "conversation summaries", _m004_conversation_summaries),
+    (5, "response cache + per-user event versions", _m005_response_cache),
+    (6, "messages (user_id, id) index for paging", _m006_messages_user_index),
+    (7, "conversations", _m007_conversations),
+    (8, "recurring events + occurrence exceptions", _m008_recurrence),
+    (9, "event location + FTS5 search indexes", _m009_full_text_search),
+    (10, "event change log + sync state", _m010_change_tracking),
+    (11, "reminders", _m011_reminders),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn_manager) -> int:
+    return conn_manager.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn_manager) -> int:
+    """Apply every pending migration and return the resulting schema version."""
+    if current_version(conn_manager) >= SCHEMA_VERSION:
+        return current_version(conn_manager)
+
+    for version, description, apply in MIGRATIONS:
+        with conn_manager.transaction() as cur:
+            # Re-check inside the write lock in case another process migrated first
+            if cur.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            apply(cur)
+            cur.execute(f"PRAGMA user_version = {int(version)}")
+            print(f"DB: applied migration {version} ({description})")
+
+    return current_version(conn_manager)
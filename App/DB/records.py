@@ -0,0 +1,196 @@
+"""
+Lightweight, slotted row records shared by the DB layer and every view.
+
+Rows are built straight from sqlite cursors via the row factories below, and
+dates/times are parsed exactly once here instead of in each view.
+"""
+import json
+from datetime import date, time
+
+# Column order every event query selects (the row factory relies on it)
+EVENT_COLUMNS = ("id", "user_id", "title", "description", "start_date", "end_date", "start_time", "end_time",
+                 "rrule", "location")
+EVENT_SELECT = "SELECT " + ", ".join(EVENT_COLUMNS)
+
+EXCEPTION_COLUMNS = ("event_id", "original_date", "cancelled", "start_date", "end_date",
+                     "start_time", "end_time", "title", "description")
+EXCEPTION_SELECT = "SELECT " + ", ".join(EXCEPTION_COLUMNS)
+
+MESSAGE_COLUMNS = ("id", "conversation_id", "user_id", "sender", "message", "metadata", "timestamp", "handled")
+MESSAGE_SELECT = "SELECT " + ", ".join(MESSAGE_COLUMNS)
+
+CONVERSATION_COLUMNS = ("id", "user_id", "title", "archived", "created_at", "updated_at")
+CONVERSATION_SELECT = "SELECT " + ", ".join(CONVERSATION_COLUMNS)
+
+
+def parse_date(value) -> date | None:
+    """'YYYY-MM-DD' -> date, anything unparsable -> None."""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat((value or "").strip())
+    except ValueError:
+        return None
+
+
+def parse_time(value) -> time | None:
+    """'HH:MM' (or 'HH:MM:SS') -> time, empty/unparsable -> None."""
+    if isinstance(value, time):
+        return value
+    value = (value or "").strip()
+    if not value:
+        return None
+    if len(value) == 4 and value[1] == ":":  # "9:00"
+        value = "0" + value
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def format_time(value: time | None) -> str:
+    return value.strftime("%H:%M") if value is not None else ""
+
+
+class Event:
+    """
+    One row of the events table with dates/times already parsed. A row with an
+    `rrule` is a recurring series; its expanded occurrences (utils/recurrence.py)
+    are Events too, with the series id and `recurrence_id` = the original date.
+    """
+    __slots__ = ("id", "user_id", "title", "description", "start_date", "end_date",
+                 "start_time", "end_time", "rrule", "location", "recurrence_id")
+
+    def __init__(self, id=None, user_id=None, title="", description="", start_date=None, end_date=None,
+                 start_time=None, end_time=None, rrule=None, location="", recurrence_id=None):
+        self.id = id
+        self.user_id = user_id
+        self.title = (title or "").strip()
+        self.description = (description or "").strip()
+        self.start_date = parse_date(start_date)
+        # Missing/invalid end date means a single-day event
+        self.end_date = parse_date(end_date) or self.start_date
+        self.start_time = parse_time(start_time)
+        self.end_time = parse_time(end_time)
+        self.rrule = rrule or None
+        self.location = (location or "").strip()
+        self.recurrence_id = recurrence_id
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory for queries that select EVENT_COLUMNS in order."""
+        return cls(*row)
+
+    @property
+    def display_title(self) -> str:
+        return self.title or "(Untitled)"
+
+    @property
+    def is_recurring(self) -> bool:
+        return self.rrule is not None
+
+    @property
+    def start_time_text(self) -> str:
+        return format_time(self.start_time)
+
+    @property
+    def end_time_text(self) -> str:
+        return format_time(self.end_time)
+
+    def to_prompt_dict(self) -> dict:
+        """Shape used by ai_call._format_recent_events."""
+        return {
+            "title": self.display_title,
+            "start_date": self.start_date.isoformat() if self.start_date else "",
+            "start_time": self.start_time_text,
+            "location": self.location,
+            "recurring": self.is_recurring,
+        }
+
+    def __repr__(self):
+        return f"Event(id={self.id!r}, title={self.title!r}, start={self.start_date} {self.start_time_text})"
+
+
+class OccurrenceException:
+    """One row of event_exceptions: a cancelled or moved/edited instance of a series."""
+    __slots__ = ("event_id", "original_date", "cancelled", "start_date", "end_date",
+                 "start_time", "end_time", "title", "description")
+
+    def __init__(self, event_id=None, original_date=None, cancelled=0, start_date=None, end_date=None,
+                 start_time=None, end_time=None, title=None, description=None):
+        self.event_id = event_id
+        self.original_date = parse_date(original_date)
+        self.cancelled = bool(cancelled)
+        self.start_date = parse_date(start_date)
+        self.end_date = parse_date(end_date) or self.start_date
+        self.start_time = parse_time(start_time)
+        self.end_time = parse_time(end_time)
+        self.title = title          # None = keep the series' value
+        self.description = description
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory for queries that select EXCEPTION_COLUMNS in order."""
+        return cls(*row)
+
+    def __repr__(self):
+        state = "cancelled" if self.cancelled else f"moved to {self.start_date}"
+        return f"OccurrenceException(event_id={self.event_id!r}, {self.original_date}: {state})"
+
+
+class Message:
+    """One row of the messages table; `role` is the sender column."""
+    __slots__ = ("id", "conversation_id", "user_id", "role", "content", "metadata", "timestamp", "handled")
+
+    def __init__(self, id=None, conversation_id=None, user_id=None, role="user", content="",
+                 metadata=None, timestamp=None, handled=0):
+        self.id = id
+        self.conversation_id = conversation_id
+        self.user_id = user_id
+        self.role = role
+        self.content = content
+        self.metadata = metadata
+        self.timestamp = timestamp
+        self.handled = handled
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory for queries that select MESSAGE_COLUMNS in order."""
+        return cls(*row)
+
+    @property
+    def metadata_dict(self) -> dict | None:
+        if not self.metadata:
+            return None
+        try:
+            return json.loads(self.metadata)
+        except ValueError:
+            return None
+
+    def __repr__(self):
+        return f"Message(id={self.id!r}, role={self.role!r}, handled={self.handled!r})"
+
+
+class Conversation:
+    """One row of the conversations table."""
+    __slots__ = ("id", "user_id", "title", "archived", "created_at", "updated_at")
+
+    def __init__(self, id=None, user_id=None, title="", archived=0, created_at=None, updated_at=None):
+        self.id = id
+        self.user_id = user_id
+        self.title = (title or "").strip()
+        self.archived = archived
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory for queries that select CONVERSATION_COLUMNS in order."""
+        return cls(*row)
+
+    @property
+    def display_title(self) -> str:
+        return self.title or "New chat"
+
+    def __repr__(self):
+        return f"Conversation(id={self.id!r}, title={self.title!r}, archived={self.archived!r})"
@@ -0,0 +1,65 @@
+"""
+Query helpers for CalendarDB.search (FTS5 over events and chat messages).
+
+User input is never passed to MATCH as-is: every word becomes a quoted prefix
+term ("stand"* "mee"*), so punctuation or FTS syntax in the text can't raise
+errors, and results update while a word is still being typed.
+"""
+import re
+
+EVENTS = "events"
+MESSAGES = "messages"
+
+HIGHLIGHT = ("«", "»")    # wraps matched terms in snippets
+SNIPPET_TOKENS = 12
+EVENT_WEIGHTS = (10.0, 2.0, 4.0)   # bm25 weights: title, description, location
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchHit:
+    """One search result: the Event or Message, a highlighted snippet and its bm25 rank (lower = better)."""
+    __slots__ = ("kind", "record", "snippet", "rank")
+
+    def __init__(self, kind, record, snippet="", rank=0.0):
+        self.kind = kind
+        self.record = record
+        self.snippet = snippet or ""
+        self.rank = rank
+
+    def __repr__(self):
+        return f"SearchHit({self.kind}, {self.record!r}, {self.snippet!r})"
+
+
+def search_terms(text: str) -> list[str]:
+    return _WORD_RE.findall(text or "")
+
+
+def fts_query(text: str) -> str | None:
+    """'stand-up mee' -> '"stand"* "up"* "mee"*' (all terms must match). None if no words."""
+    terms = search_terms(text)
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def like_patterns(text: str) -> list[str]:
+    """One escaped %term% pattern per word, for the LIKE fallback (ESCAPE '\\')."""
+    out = []
+    for t in search_terms(text):
+        out.append("%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    return out
+
+
+def like_snippet(text: str, terms: list[str], width: int = 60) -> str:
+    """Poor man's snippet for the LIKE fallback: the text around the first hit, hit highlighted."""
+    text = text or ""
+    lower = text.lower()
+    for t in terms:
+        i = lower.find(t.lower())
+        if i >= 0:
+            start = max(0, i - width // 2)
+            end = min(len(text), i + len(t) + width // 2)
+            return (("…" if start else "") + text[start:i] + HIGHLIGHT[0] + text[i:i + len(t)] + HIGHLIGHT[1]
+                    + text[i + len(t):end] + ("…" if end < len(text) else ""))
+    return text[:width] + ("…" if len(text) > width else "")
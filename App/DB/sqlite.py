@@ -1,164 +1,583 @@
+import os
 import sqlite3
 import json
+import threading
+from datetime import date, timedelta
+
+from DB.changes import EventChange, event_bus, INSERT, UPDATE, DELETE, RESET
+from DB.connection import get_manager
+from DB.migrations import migrate
+from DB.records import (Event, Message, Conversation, OccurrenceException,
+                        EVENT_COLUMNS, MESSAGE_COLUMNS,
+                        EVENT_SELECT, MESSAGE_SELECT, CONVERSATION_SELECT, EXCEPTION_SELECT, parse_date)
+from DB.search import (SearchHit, EVENTS, MESSAGES, HIGHLIGHT, SNIPPET_TOKENS, EVENT_WEIGHTS,
+                       fts_query, like_patterns, like_snippet, search_terms)
+from utils.recurrence import parse_rrule, series_end_date, expand, occurrence_sort_key
+
+# Open-ended agenda queries expand recurring series at most this far ahead
+RECURRENCE_HORIZON_DAYS = 365
 
 class CalendarDB:
-    def __init__(self):
+    def __init__(self, db_path: str | None = None, bus=None):
+        # All methods share one long-lived connection per thread (see DB/connection.py)
+        self.conn_manager = get_manager(db_path)
+        self.db_path = self.conn_manager.path
+        # Event writes are announced here after they commit (see DB/changes.py)
+        self.bus = bus or event_bus
+        self._has_fts = None   # see has_full_text_search
         self.create_tables()
 
 
-    @staticmethod
-    def create_tables():
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
-
-        # Create the tables
-
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL
-        )
-        """)
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            description TEXT,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL,
-            start_time TEXT,
-            end_time TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        """)
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            conversation_id INTEGER NOT NULL,
-            user_id INTEGER,  -- nullable if system/assistant messages
-            sender TEXT NOT NULL CHECK(sender IN ('user','assistant','system')),
-            message TEXT NOT NULL,
-            metadata TEXT, -- JSON
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            handled INTEGER NOT NULL DEFAULT 0,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-        """)
+    def create_tables(self):
+        """Create or upgrade the schema to the latest version (see DB/migrations.py)."""
+        migrate(self.conn_manager)
 
-        conn.commit()
-        conn.close()
+    def close(self):
+        """Close the pooled connections for this database (all CalendarDB instances share them)."""
+        self.conn_manager.close()
 
     def add_user(self, username, password, email):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
-
-        cur.execute("INSERT INTO users (username, password, email) VALUES (?, ?, ?)", (username, password, email))
-
-        conn.commit()
-        conn.close()
+        with self.conn_manager.transaction() as cur:
+            cur.execute("INSERT INTO users (username, password, email) VALUES (?, ?, ?)", (username, password, email))
     
     def get_user(self, username):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
+        cur = self.conn_manager.execute("SELECT * FROM users WHERE username=?", (username,))
+        return cur.fetchone()
 
-        cur.execute("SELECT * FROM users WHERE username=?", (username,))
-        user = cur.fetchone()
-
-        conn.close()
-        return user
     def get_user_id(self, username):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
-
-        cur.execute("SELECT id FROM users WHERE username=?", (username,))
+        cur = self.conn_manager.execute("SELECT id FROM users WHERE username=?", (username,))
         user = cur.fetchone()
-
-        conn.close()
         return user[0] if user else None
     
-    def add_event(self, user_id, title, description, start_date, end_date, start_time, end_time):
-        import sqlite3
-        conn = sqlite3.connect('calendai.db', timeout=10, isolation_level=None)
-        try:
-            cur = conn.cursor()
-            cur.execute("""
-            INSERT INTO events (user_id, title, description, start_date, end_date, start_time, end_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+    def add_event(self, user_id, title, description, start_date, end_date, start_time, end_time, rrule=None,
+                  location=None):
+        """
+        Insert an event (same signature = update its description). Returns the event id.
+        `rrule` (e.g. 'FREQ=WEEKLY;BYDAY=MO') stores the row as a recurring series;
+        an unsupported rule raises ValueError before anything is written.
+        """
+        signature = (user_id, title.strip(), start_date, start_time or "", end_date, end_time or "")
+        rrule, series_end = self._series_fields(rrule, start_date, end_date)
+        with self.conn_manager.transaction() as cur:
+            cur.row_factory = Event.row_factory
+            old = cur.execute(EVENT_SELECT + """
+                FROM events
+                WHERE user_id=? AND title=? AND start_date=? AND start_time=? AND end_date=? AND end_time=?
+            """, signature).fetchone()
+            cur.row_factory = None
+            event_id = cur.execute("""
+            INSERT INTO events (user_id, title, description, start_date, end_date, start_time, end_time,
+                                rrule, series_end, location)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(user_id, title, start_date, start_time, end_date, end_time)
-            DO UPDATE SET description = excluded.description
-            """, (user_id, title.strip(), description or "", start_date, end_date, start_time or "", end_time or ""))
-        finally:
-            conn.close()
+            DO UPDATE SET description = excluded.description,
+                          location = CASE WHEN excluded.location <> '' THEN excluded.location
+                                          ELSE events.location END,
+                          rrule = COALESCE(excluded.rrule, events.rrule),
+                          series_end = CASE WHEN excluded.rrule IS NULL THEN events.series_end
+                                            ELSE excluded.series_end END
+            RETURNING id
+            """, (user_id, title.strip(), description or "", start_date, end_date, start_time or "", end_time or "",
+                  rrule, series_end, (location or "").strip())).fetchone()[0]
+            new = self.get_event(event_id)
+            self._publish(EventChange(INSERT, event=new) if old is None else EventChange(UPDATE, event=new, old=old))
+        return event_id
+
+    def event_exists(self, user_id, title, start_date, end_date, start_time=None, end_time=None) -> bool:
+        """True if an event with exactly this signature exists (one ux_events_signature seek)."""
+        row = self.conn_manager.execute("""
+            SELECT 1 FROM events
+            WHERE user_id=? AND title=? AND start_date=? AND start_time=? AND end_date=? AND end_time=?
+        """, (user_id, (title or "").strip(), start_date, start_time or "", end_date, end_time or "")).fetchone()
+        return row is not None
+
+    def get_event(self, event_id):
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        cur.execute(EVENT_SELECT + " FROM events WHERE id=?", (event_id,))
+        return cur.fetchone()
 
+    @staticmethod
+    def _series_fields(rrule, start_date, end_date):
+        """(rrule, series_end) column values; validates the rule."""
+        rrule = (rrule or "").strip() or None
+        if rrule is None:
+            return None, None
+        if rrule.upper().startswith("RRULE:"):
+            rrule = rrule[6:]
+        parse_rrule(rrule)
+        start = parse_date(start_date)
+        if start is None:
+            raise ValueError("a recurring event needs a start date")
+        end = series_end_date(rrule, start, parse_date(end_date) or start)
+        return rrule, end.isoformat() if end else None
+
+    def _publish(self, change: EventChange):
+        # Listeners only hear about writes that actually committed
+        self.conn_manager.after_commit(lambda: self.bus.publish(change))
 
-    def get_events(self, user_id):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
-
-        cur.execute("SELECT * FROM events WHERE user_id=?", (user_id,))
-        events = cur.fetchall()
 
-        conn.close()
-        return events
-    
-    def update_event(self, event_id, title, description, start_date, end_date, start_time, end_time):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
+    def get_events(self, user_id):
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        cur.execute(EVENT_SELECT + " FROM events WHERE user_id=?", (user_id,))
+        return cur.fetchall()
 
-        cur.execute("UPDATE events SET title=?, description=?, start_date=?, end_date=?, start_time=?, end_time=? WHERE id=?", (title, description, start_date, end_date, start_time, end_time, event_id))
+    def get_all_events(self):
+        """All events for every user, in chronological order."""
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        cur.execute(EVENT_SELECT + " FROM events ORDER BY start_date, start_time")
+        return cur.fetchall()
 
-        conn.commit()
-        conn.close()
+    def get_events_between(self, user_id, start=None, end=None, limit: int | None = None, order: str = "asc"):
+        """
+        Events overlapping the inclusive date window [start, end] (date or 'YYYY-MM-DD').
+        Multi-day events that started before `start` but are still running are included.
+        Either bound may be None for an open-ended window; user_id=None means all users.
+        Returns Event records ordered by start date/time (order='asc' or 'desc').
+        Only single events: recurring series are expanded by get_occurrences_between,
+        and get_agenda merges both.
+        """
+        if order not in ("asc", "desc"):
+            raise ValueError(f"order must be 'asc' or 'desc', not {order!r}")
+
+        clauses, params = ["rrule IS NULL"], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if start is not None:
+            clauses.append("end_date >= ?")
+            params.append(start.isoformat() if isinstance(start, date) else start)
+        if end is not None:
+            clauses.append("start_date <= ?")
+            params.append(end.isoformat() if isinstance(end, date) else end)
+
+        # Without stats the planner prefers idx_events_user_start for the ORDER BY, which
+        # walks the user's whole history; the end_date bound is the selective one.
+        source = "events INDEXED BY idx_events_user_end" if user_id is not None and start is not None else "events"
+        sql = (
+            EVENT_SELECT + f" FROM {source}"
+            + " WHERE " + " AND ".join(clauses)
+            + f" ORDER BY start_date {order}, start_time {order}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+    def get_recurring_events(self, user_id, start=None, end=None):
+        """Series rows (events with an rrule) that can have occurrences in [start, end]."""
+        clauses, params = ["rrule IS NOT NULL"], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if start is not None:
+            clauses.append("(series_end IS NULL OR series_end >= ?)")
+            params.append(start.isoformat() if isinstance(start, date) else start)
+        if end is not None:
+            clauses.append("start_date <= ?")
+            params.append(end.isoformat() if isinstance(end, date) else end)
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        cur.execute(EVENT_SELECT + " FROM events WHERE " + " AND ".join(clauses) + " ORDER BY start_date, id", params)
+        return cur.fetchall()
+
+    def get_event_exceptions(self, event_ids) -> dict[int, dict]:
+        """{series id: {original date: OccurrenceException}} for the given series."""
+        out = {}
+        event_ids = list(event_ids)
+        cur = self.conn_manager.cursor(row_factory=OccurrenceException.row_factory)
+        for i in range(0, len(event_ids), 500):
+            chunk = event_ids[i:i + 500]
+            cur.execute(
+                EXCEPTION_SELECT + " FROM event_exceptions WHERE event_id IN (%s)" % ",".join("?" * len(chunk)),
+                chunk,
+            )
+            for ex in cur.fetchall():
+                out.setdefault(ex.event_id, {})[ex.original_date] = ex
+        return out
+
+    def get_occurrences_between(self, user_id, start, end) -> list[Event]:
+        """Expanded occurrences of the user's recurring series overlapping [start, end]."""
+        start, end = parse_date(start), parse_date(end)
+        series = self.get_recurring_events(user_id, start, end)
+        exceptions = self.get_event_exceptions([e.id for e in series])
+        out = []
+        for e in series:
+            out += expand(e, exceptions.get(e.id), start, end)
+        out.sort(key=occurrence_sort_key)
+        return out
+
+    def get_agenda(self, user_id, start, end=None, limit: int | None = None) -> list[Event]:
+        """
+        Single events and recurring occurrences overlapping [start, end], in start
+        order. An open end expands series only RECURRENCE_HORIZON_DAYS ahead.
+        """
+        start = parse_date(start)
+        end = parse_date(end) or start + timedelta(days=RECURRENCE_HORIZON_DAYS)
+        events = self.get_events_between(user_id, start, end, limit=limit)
+        events += self.get_occurrences_between(user_id, start, end)
+        events.sort(key=occurrence_sort_key)
+        return events[:limit] if limit is not None else events
+
+    def set_event_rrule(self, event_id, rrule):
+        """Turn an event into a series (or back into a single event with rrule=None)."""
+        with self.conn_manager.transaction() as cur:
+            old = self.get_event(event_id)
+            if old is None:
+                return
+            rrule, series_end = self._series_fields(rrule, old.start_date, old.end_date)
+            cur.execute("UPDATE events SET rrule=?, series_end=? WHERE id=?", (rrule, series_end, event_id))
+            self._publish(EventChange(UPDATE, event=self.get_event(event_id), old=old))
+
+    def cancel_occurrence(self, event_id, original_date):
+        """Drop one instance of a series (e.g. the standup on a bank holiday)."""
+        self._save_exception(event_id, original_date, cancelled=1)
+
+    def move_occurrence(self, event_id, original_date, start_date, end_date=None, start_time=None,
+                        end_time=None, title=None, description=None):
+        """Move/edit one instance of a series; None fields keep the series' values."""
+        self._save_exception(event_id, original_date, 0, start_date, end_date or start_date,
+                             start_time, end_time, title, description)
+
+    def restore_occurrence(self, event_id, original_date):
+        """Undo cancel_occurrence/move_occurrence for one instance."""
+        with self.conn_manager.transaction() as cur:
+            cur.execute("DELETE FROM event_exceptions WHERE event_id=? AND original_date=?",
+                        (event_id, str(parse_date(original_date))))
+            self._publish_series(event_id)
+
+    def _save_exception(self, event_id, original_date, cancelled, start_date=None, end_date=None,
+                        start_time=None, end_time=None, title=None, description=None):
+        with self.conn_manager.transaction() as cur:
+            cur.execute("""
+                INSERT INTO event_exceptions (event_id, original_date, cancelled, start_date, end_date,
+                                              start_time, end_time, title, description)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(event_id, original_date) DO UPDATE SET
+                    cancelled = excluded.cancelled, start_date = excluded.start_date,
+                    end_date = excluded.end_date, start_time = excluded.start_time,
+                    end_time = excluded.end_time, title = excluded.title, description = excluded.description
+            """, (event_id, str(parse_date(original_date)), cancelled, start_date, end_date,
+                  start_time, end_time, title, description))
+            self._publish_series(event_id)
+
+    def _publish_series(self, event_id):
+        # Exceptions don't change the series row; listeners re-read the series on UPDATE
+        series = self.get_event(event_id)
+        if series is not None:
+            self._publish(EventChange(UPDATE, event=series, old=series))
+
+    def get_events_version(self, user_id) -> int:
+        """Counter bumped (by triggers) on every insert/update/delete of this user's events."""
+        row = self.conn_manager.execute("SELECT version FROM event_versions WHERE user_id=?", (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def update_event(self, event_id, title, description, start_date, end_date, start_time, end_time, location=None):
+        with self.conn_manager.transaction() as cur:
+            old = self.get_event(event_id)
+            cur.execute("UPDATE events SET title=?, description=?, start_date=?, end_date=?, start_time=?, end_time=?, location=COALESCE(?, location) WHERE id=?", (title, description, start_date, end_date, start_time, end_time, location, event_id))
+            if old is not None and old.rrule:
+                # Moving the first occurrence moves where the series ends
+                cur.execute("UPDATE events SET series_end=? WHERE id=?",
+                            (self._series_fields(old.rrule, start_date, end_date)[1], event_id))
+            if old is not None:
+                self._publish(EventChange(UPDATE, event=self.get_event(event_id), old=old))
     
     def delete_event(self, event_id):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
-
-        cur.execute("DELETE FROM events WHERE id=?", (event_id,))
-
-        conn.commit()
-        conn.close()
+        with self.conn_manager.transaction() as cur:
+            old = self.get_event(event_id)
+            cur.execute("DELETE FROM events WHERE id=?", (event_id,))
+            if old is not None:
+                self._publish(EventChange(DELETE, old=old))
     
     def delete_user(self, user_id):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
+        """Delete a user and everything that belongs to them, in one transaction."""
+        conversations = "SELECT id FROM conversations WHERE user_id=?"
+        with self.conn_manager.transaction() as cur:
+            # Children first: events/messages reference users without ON DELETE CASCADE
+            cur.execute(f"DELETE FROM messages WHERE user_id=? OR conversation_id IN ({conversations})",
+                        (user_id, user_id))
+            cur.execute(f"DELETE FROM conversation_summaries WHERE conversation_id IN ({conversations})",
+                        (user_id,))
+            cur.execute("DELETE FROM conversations WHERE user_id=?", (user_id,))
+            # Exceptions and reminders go with their events (ON DELETE CASCADE)
+            cur.execute("DELETE FROM events WHERE user_id=?", (user_id,))
+            for table in ("reminders", "event_changes", "event_versions", "sync_state", "sync_links"):
+                cur.execute(f"DELETE FROM {table} WHERE user_id=?", (user_id,))
+            cur.execute("DELETE FROM users WHERE id=?", (user_id,))
+            self._publish(EventChange(RESET, user_id=user_id))
+    
+    def import_events(self, user_id, rows, batch_size: int = 2000) -> tuple[int, int]:
+        """
+        Bulk-insert event dicts (keys as utils.calendar_files.IMPORT_FIELDS) from any
+        iterable, e.g. a streaming file parser. Rows go in with one executemany per
+        `batch_size` rows, each batch in its own transaction; rows that match an
+        existing event signature, or have no usable start date or a bad RRULE, are
+        skipped. Listeners get a single RESET at the end instead of one change per row.
+        Returns (inserted, skipped).
+        """
+        sql = """
+            INSERT INTO events (user_id, title, description, start_date, end_date, start_time, end_time,
+                                rrule, series_end, location)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, title, start_date, start_time, end_date, end_time) DO NOTHING
+        """
+        inserted = skipped = 0
+        batch = []
+
+        def flush():
+            nonlocal inserted, skipped
+            with self.conn_manager.transaction() as cur:
+                cur.executemany(sql, batch)
+                # rowcount leaves out trigger writes (FTS, versions) and conflicting rows
+                inserted += cur.rowcount
+                skipped += len(batch) - cur.rowcount
+            batch.clear()
 
-        cur.execute("DELETE FROM users WHERE id=?", (user_id,))
+        try:
+            for row in rows:
+                start = parse_date(row.get("start_date"))
+                if start is None:
+                    skipped += 1
+                    continue
+                end = max(parse_date(row.get("end_date")) or start, start)
+                try:
+                    rrule, series_end = self._series_fields(row.get("rrule"), start, end)
+                except ValueError:
+                    skipped += 1
+                    continue
+                batch.append((user_id, (row.get("title") or "").strip(), (row.get("description") or "").strip(),
+                              start.isoformat(), end.isoformat(), row.get("start_time") or "",
+                              row.get("end_time") or "", rrule, series_end, (row.get("location") or "").strip()))
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            if inserted:
+                self._publish(EventChange(RESET, user_id=user_id))
+        return inserted, skipped
+
+    def iter_events(self, user_id, after_id: int = 0, batch_size: int = 1000):
+        """
+        Stream a user's events (series once each, with their rrule) in id order,
+        `batch_size` rows per query, so exports don't load the whole calendar.
+        """
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        while True:
+            cur.execute(EVENT_SELECT + """
+                FROM events
+                WHERE user_id=? AND id>?
+                ORDER BY id ASC
+                LIMIT ?
+            """, (user_id, after_id, batch_size))
+            batch = cur.fetchall()
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after_id = batch[-1].id
+
+    # ---- change log (see _m010_change_tracking) -----------------------------
+
+    def latest_change_seq(self, user_id) -> int:
+        row = self.conn_manager.execute(
+            "SELECT MAX(seq) FROM event_changes WHERE user_id=?", (user_id,)).fetchone()
+        return row[0] or 0
+
+    def get_changes_since(self, user_id, after_seq: int, upto_seq: int | None = None) -> list[tuple]:
+        """
+        (seq, event_id, op, changed_at) for every event changed in (after_seq, upto_seq],
+        latest entry per event only, in seq order. Cost is O(changes), not O(calendar).
+        """
+        params = [user_id, after_seq]
+        upto = ""
+        if upto_seq is not None:
+            upto = " AND seq <= ?"
+            params.append(upto_seq)
+        return self.conn_manager.execute(f"""
+            SELECT c.seq, c.event_id, c.op, c.changed_at
+            FROM event_changes c
+            JOIN (SELECT MAX(seq) AS seq FROM event_changes
+                  WHERE user_id = ? AND seq > ?{upto} GROUP BY event_id) latest ON latest.seq = c.seq
+            ORDER BY c.seq
+        """, params).fetchall()
+
+    def get_events_with_versions(self, event_ids) -> dict[int, tuple]:
+        """{event id: (Event, version, updated_at)} for the ids that still exist."""
+        out = {}
+        ids = list(event_ids)
+        n = len(EVENT_COLUMNS)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn_manager.execute(
+                EVENT_SELECT + ", version, updated_at FROM events WHERE id IN (%s)" % ",".join("?" * len(chunk)),
+                chunk)
+            for row in rows:
+                out[row[0]] = (Event(*row[:n]), row[n], row[n + 1])
+        return out
+
+    def compact_change_log(self, user_id=None) -> int:
+        """Drop log entries superseded by a later one for the same event. Returns rows removed."""
+        sql = """
+            DELETE FROM event_changes
+            WHERE seq NOT IN (SELECT MAX(seq) FROM event_changes GROUP BY event_id)
+        """
+        params = ()
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params = (user_id,)
+        with self.conn_manager.transaction() as cur:
+            cur.execute(sql, params)
+            return cur.rowcount
 
-        conn.commit()
-        conn.close()
-    
     def get_user_events(self, username):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        cur.execute(
+            "SELECT events.id, events.user_id, title, description, start_date, end_date, start_time, end_time, rrule, location "
+            "FROM events JOIN users ON events.user_id=users.id WHERE users.username=?",
+            (username,),
+        )
+        return cur.fetchall()
+    
+    # ---- search -------------------------------------------------------------
+
+    def has_full_text_search(self) -> bool:
+        """False if this SQLite build has no FTS5 (search then uses LIKE)."""
+        if self._has_fts is None:
+            row = self.conn_manager.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='events_fts'").fetchone()
+            self._has_fts = row is not None
+        return self._has_fts
+
+    def search(self, query: str, user_id=None, kind: str = EVENTS, conversation_id=None,
+               limit: int | None = 50) -> list[SearchHit]:
+        """
+        Full-text search over events (title/description/location) or chat messages.
+        Every word is a prefix term and all must match; results are ranked by bm25
+        and carry a snippet with the matches wrapped in HIGHLIGHT.
+        kind=MESSAGES searches the user's conversations (or just `conversation_id`).
+        """
+        if kind not in (EVENTS, MESSAGES):
+            raise ValueError(f"kind must be {EVENTS!r} or {MESSAGES!r}, not {kind!r}")
+        match = fts_query(query)
+        if match is None:
+            return []
+        if self.has_full_text_search():
+            try:
+                if kind == EVENTS:
+                    return self._search_events_fts(match, user_id, limit)
+                return self._search_messages_fts(match, user_id, conversation_id, limit)
+            except sqlite3.OperationalError as e:
+                print("FTS search failed, falling back to LIKE:", e)
+        if kind == EVENTS:
+            return self._search_events_like(query, user_id, limit)
+        return self._search_messages_like(query, user_id, conversation_id, limit)
+
+    def search_event_ids(self, query: str, user_id=None) -> set[int]:
+        """Ids of every event matching `query` (no ranking/snippets), e.g. to filter a table."""
+        match = fts_query(query)
+        if match is None:
+            return set()
+        if self.has_full_text_search():
+            # CROSS JOIN keeps the MATCH as the outer loop; a rowid IN (...) filter
+            # gets pushed into the FTS5 scan and runs the MATCH once per event
+            sql = "SELECT e.id FROM events_fts CROSS JOIN events e ON e.id = events_fts.rowid WHERE events_fts MATCH ?"
+            params = [match]
+            if user_id is not None:
+                sql += " AND e.user_id = ?"
+                params.append(user_id)
+            return {row[0] for row in self.conn_manager.execute(sql, params)}
+        return {hit.record.id for hit in self._search_events_like(query, user_id, None)}
 
-        cur.execute("SELECT events.* FROM events JOIN users ON events.user_id=users.id WHERE users.username=?", (username,))
-        events = cur.fetchall()
+    @staticmethod
+    def _limit_sql(limit, params) -> str:
+        if limit is None:
+            return ""
+        params.append(int(limit))
+        return " LIMIT ?"
+
+    def _search_events_fts(self, match, user_id, limit):
+        columns = ", ".join("e." + c for c in EVENT_COLUMNS)
+        weights = ", ".join(str(w) for w in EVENT_WEIGHTS)
+        sql = f"""
+            SELECT {columns}, snippet(events_fts, -1, ?, ?, '…', ?), bm25(events_fts, {weights}) AS rank
+            FROM events_fts CROSS JOIN events e ON e.id = events_fts.rowid
+            WHERE events_fts MATCH ?
+        """
+        params = [*HIGHLIGHT, SNIPPET_TOKENS, match]
+        if user_id is not None:
+            sql += " AND e.user_id = ?"
+            params.append(user_id)
+        sql += " ORDER BY rank" + self._limit_sql(limit, params)
+        n = len(EVENT_COLUMNS)
+        return [SearchHit(EVENTS, Event(*row[:n]), row[n], row[n + 1])
+                for row in self.conn_manager.execute(sql, params)]
+
+    def _search_messages_fts(self, match, user_id, conversation_id, limit):
+        columns = ", ".join("m." + c for c in MESSAGE_COLUMNS)
+        sql = f"""
+            SELECT {columns}, snippet(messages_fts, 0, ?, ?, '…', ?), bm25(messages_fts) AS rank
+            FROM messages_fts CROSS JOIN messages m ON m.id = messages_fts.rowid
+            LEFT JOIN conversations c ON c.id = m.conversation_id
+            WHERE messages_fts MATCH ?
+        """
+        params = [*HIGHLIGHT, SNIPPET_TOKENS, match]
+        sql += self._message_scope_sql(user_id, conversation_id, params)
+        sql += " ORDER BY rank" + self._limit_sql(limit, params)
+        n = len(MESSAGE_COLUMNS)
+        return [SearchHit(MESSAGES, Message(*row[:n]), row[n], row[n + 1])
+                for row in self.conn_manager.execute(sql, params)]
+
+    @staticmethod
+    def _message_scope_sql(user_id, conversation_id, params) -> str:
+        sql = ""
+        if user_id is not None:
+            sql += " AND c.user_id = ?"
+            params.append(user_id)
+        if conversation_id is not None:
+            sql += " AND m.conversation_id = ?"
+            params.append(conversation_id)
+        return sql
+
+    def _search_events_like(self, query, user_id, limit):
+        clauses, params = [], []
+        for pattern in like_patterns(query):
+            clauses.append("(title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\' OR location LIKE ? ESCAPE '\\')")
+            params += [pattern] * 3
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        sql = EVENT_SELECT + " FROM events WHERE " + " AND ".join(clauses) + " ORDER BY start_date DESC"
+        sql += self._limit_sql(limit, params)
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        terms = search_terms(query)
+        return [SearchHit(EVENTS, e, like_snippet(f"{e.title} {e.description} {e.location}", terms))
+                for e in cur.execute(sql, params).fetchall()]
+
+    def _search_messages_like(self, query, user_id, conversation_id, limit):
+        columns = ", ".join("m." + c for c in MESSAGE_COLUMNS)
+        clauses, params = [], []
+        for pattern in like_patterns(query):
+            clauses.append("m.message LIKE ? ESCAPE '\\'")
+            params.append(pattern)
+        sql = (f"SELECT {columns} FROM messages m LEFT JOIN conversations c ON c.id = m.conversation_id"
+               " WHERE " + " AND ".join(clauses))
+        sql += self._message_scope_sql(user_id, conversation_id, params)
+        sql += " ORDER BY m.id DESC" + self._limit_sql(limit, params)
+        cur = self.conn_manager.cursor(row_factory=Message.row_factory)
+        terms = search_terms(query)
+        return [SearchHit(MESSAGES, m, like_snippet(m.content, terms))
+                for m in cur.execute(sql, params).fetchall()]
 
-        conn.close()
-        return events
-    
     def save_message(self, conversation_id, sender, message, user_id=None, metadata=None):
-        conn = sqlite3.connect('calendai.db', timeout=10, isolation_level=None)
-        try:
-            conn.execute("PRAGMA journal_mode=WAL;")
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cur = conn.cursor()
+        with self.conn_manager.transaction() as cur:
             cur.execute("""
                 INSERT INTO messages (conversation_id, user_id, sender, message, metadata)
                 VALUES (?, ?, ?, ?, ?)
             """, (conversation_id, user_id, sender, message, json.dumps(metadata) if metadata is not None else None))
-            message_id = cur.lastrowid
-            conn.commit()
-            return message_id
-        finally:
-            conn.close()
+            return cur.lastrowid
+
     @staticmethod
     def _normalize_message_for_storage(message):
         # Accept None, dicts, objects, etc., return a safe string
@@ -178,76 +597,216 @@ class CalendarDB:
             return str(message)
 
     def get_messages(self, conversation_id):
-        conn = sqlite3.connect('calendai.db')
-        
-        # Enable named access to columns
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-
-        # Execute the query
-        cur.execute("SELECT * FROM messages WHERE conversation_id=?", (conversation_id,))
-        rows = cur.fetchall()
-
-        # Convert rows to a list of dictionaries
-        messages = [dict(row) for row in rows]
-        formatted_messages = [{"role": message["sender"], "content": message["message"]} for message in messages]
+        """Whole conversation as role/content dicts. Prefer iter_messages for long chats."""
+        return [{"role": m.role, "content": m.content} for m in self.iter_messages(conversation_id)]
 
-        conn.close()
-        return formatted_messages
-    
-    def get_user_messages(self, username):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
-
-        cur.execute("SELECT messages.* FROM messages JOIN users ON messages.user_id=users.id WHERE users.username=?", (username,))
-        messages = cur.fetchall()
+    def get_user_messages(self, username, before_id: int | None = None, limit: int | None = None):
+        """
+        A user's messages (all conversations), oldest first. With `limit` this is one
+        keyset page: the newest `limit` messages with id < before_id (None = newest).
+        """
+        user_id = self.get_user_id(username)
+        if user_id is None:
+            return []
+        if limit is None:
+            return list(self.iter_user_messages(user_id))
+        cur = self.conn_manager.cursor(row_factory=Message.row_factory)
+        if before_id is None:
+            cur.execute(MESSAGE_SELECT + """
+                FROM messages
+                WHERE user_id=?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (user_id, limit))
+        else:
+            cur.execute(MESSAGE_SELECT + """
+                FROM messages
+                WHERE user_id=? AND id<?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (user_id, before_id, limit))
+        rows = cur.fetchall()
+        rows.reverse()
+        return rows
 
-        conn.close()
-        return messages
+    def iter_messages(self, conversation_id: int, after_id: int = 0, batch_size: int = 500):
+        """
+        Stream a conversation oldest first, `batch_size` rows per query (keyset on id
+        over idx_messages_conversation), so memory stays flat however long the chat is.
+        """
+        while True:
+            batch = self.get_messages_after(conversation_id, after_id, limit=batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after_id = batch[-1].id
+
+    def iter_user_messages(self, user_id: int, after_id: int = 0, batch_size: int = 500):
+        """Like iter_messages, but across all of a user's conversations (idx_messages_user)."""
+        cur = self.conn_manager.cursor(row_factory=Message.row_factory)
+        while True:
+            cur.execute(MESSAGE_SELECT + """
+                FROM messages
+                WHERE user_id=? AND id>?
+                ORDER BY id ASC
+                LIMIT ?
+            """, (user_id, after_id, batch_size))
+            batch = cur.fetchall()
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after_id = batch[-1].id
 
     def check_user(self, username, password):
-        conn = sqlite3.connect('calendai.db')
-        cur = conn.cursor()
-
-        cur.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-        user = cur.fetchone()
-
-        conn.close()
-        return user is not None
+        cur = self.conn_manager.execute("SELECT 1 FROM users WHERE username=? AND password=?", (username, password))
+        return cur.fetchone() is not None
 
     def get_messages_for_chat(self, conversation_id: int):
         """
-        Return messages with id + handled so ChatView can filter for tool calls.
-        Shape: [{'id': int, 'role': 'user'|'assistant'|'system', 'content': str, 'handled': int, 'timestamp': str}]
+        Return Message records (with id + handled so ChatView can filter for tool calls), oldest first.
+        Loads the whole conversation; use get_recent_messages_for_chat/get_messages_before to page.
         """
-        conn = sqlite3.connect("calendai.db")
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, sender AS role, message AS content, handled, timestamp
+        return list(self.iter_messages(conversation_id))
+
+    def get_recent_messages_for_chat(self, conversation_id: int, limit: int):
+        """The newest `limit` messages of a conversation, returned oldest first."""
+        cur = self.conn_manager.cursor(row_factory=Message.row_factory)
+        cur.execute(MESSAGE_SELECT + """
             FROM messages
             WHERE conversation_id=?
-            ORDER BY id ASC
-        """, (conversation_id,))
-        rows = [dict(r) for r in cur.fetchall()]
-        conn.close()
+            ORDER BY id DESC
+            LIMIT ?
+        """, (conversation_id, limit))
+        rows = cur.fetchall()
+        rows.reverse()
         return rows
 
+    def get_messages_before(self, conversation_id: int, before_id: int, limit: int):
+        """Up to `limit` messages older than before_id (keyset page), returned oldest first."""
+        cur = self.conn_manager.cursor(row_factory=Message.row_factory)
+        cur.execute(MESSAGE_SELECT + """
+            FROM messages
+            WHERE conversation_id=? AND id<?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (conversation_id, before_id, limit))
+        rows = cur.fetchall()
+        rows.reverse()
+        return rows
+
+    def get_messages_after(self, conversation_id: int, after_id: int, before_id: int | None = None, limit: int = 500):
+        """Up to `limit` messages with after_id < id (< before_id), oldest first."""
+        cur = self.conn_manager.cursor(row_factory=Message.row_factory)
+        if before_id is None:
+            cur.execute(MESSAGE_SELECT + """
+                FROM messages
+                WHERE conversation_id=? AND id>?
+                ORDER BY id ASC
+                LIMIT ?
+            """, (conversation_id, after_id, limit))
+        else:
+            cur.execute(MESSAGE_SELECT + """
+                FROM messages
+                WHERE conversation_id=? AND id>? AND id<?
+                ORDER BY id ASC
+                LIMIT ?
+            """, (conversation_id, after_id, before_id, limit))
+        return cur.fetchall()
+
+    def get_summary(self, conversation_id: int) -> tuple[str, int]:
+        """(summary, covered_upto_id) for a conversation; ('', 0) if nothing summarized yet."""
+        row = self.conn_manager.execute(
+            "SELECT summary, covered_upto_id FROM conversation_summaries WHERE conversation_id=?",
+            (conversation_id,),
+        ).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def save_summary(self, conversation_id: int, summary: str, covered_upto_id: int):
+        with self.conn_manager.transaction() as cur:
+            cur.execute("""
+                INSERT INTO conversation_summaries (conversation_id, summary, covered_upto_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(conversation_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    covered_upto_id = excluded.covered_upto_id,
+                    updated_at = excluded.updated_at
+            """, (conversation_id, summary, covered_upto_id))
+
+    def create_conversation(self, user_id, title: str = "New chat") -> int:
+        with self.conn_manager.transaction() as cur:
+            cur.execute("INSERT INTO conversations (user_id, title) VALUES (?, ?)", (user_id, title))
+            return cur.lastrowid
+
+    def list_conversations(self, user_id, include_archived: bool = False):
+        """A user's conversations, most recently active first (idx_conversations_user).
+        user_id None lists the ownerless ones."""
+        cur = self.conn_manager.cursor(row_factory=Conversation.row_factory)
+        if include_archived:
+            cur.execute(CONVERSATION_SELECT + """
+                FROM conversations
+                WHERE user_id IS ?
+                ORDER BY updated_at DESC, id DESC
+            """, (user_id,))
+        else:
+            cur.execute(CONVERSATION_SELECT + """
+                FROM conversations
+                WHERE user_id IS ? AND archived=0
+                ORDER BY updated_at DESC, id DESC
+            """, (user_id,))
+        return cur.fetchall()
+
+    def get_conversation(self, conversation_id: int, user_id=None):
+        """The conversation, or None if it doesn't exist (or isn't user_id's when given)."""
+        cur = self.conn_manager.cursor(row_factory=Conversation.row_factory)
+        if user_id is None:
+            cur.execute(CONVERSATION_SELECT + " FROM conversations WHERE id=?", (conversation_id,))
+        else:
+            cur.execute(CONVERSATION_SELECT + " FROM conversations WHERE id=? AND user_id=?",
+                        (conversation_id, user_id))
+        return cur.fetchone()
+
+    def rename_conversation(self, conversation_id: int, title: str):
+        with self.conn_manager.transaction() as cur:
+            cur.execute("UPDATE conversations SET title=? WHERE id=?", (title, conversation_id))
+
+    def archive_conversation(self, conversation_id: int, archived: bool = True):
+        """Archived chats drop out of list_conversations but keep their messages."""
+        with self.conn_manager.transaction() as cur:
+            cur.execute("UPDATE conversations SET archived=? WHERE id=?", (1 if archived else 0, conversation_id))
+
+    def default_conversation(self, user_id) -> int:
+        """
+        The user's most recent active conversation. A user without one first adopts
+        any ownerless chats from before conversations existed, else gets a new one.
+        """
+        with self.conn_manager.transaction() as cur:
+            row = cur.execute("""
+                SELECT id FROM conversations
+                WHERE user_id IS ? AND archived=0
+                ORDER BY updated_at DESC, id DESC LIMIT 1
+            """, (user_id,)).fetchone()
+            if row is None and user_id is not None:
+                cur.execute("UPDATE conversations SET user_id=? WHERE user_id IS NULL", (user_id,))
+                row = cur.execute("""
+                    SELECT id FROM conversations
+                    WHERE user_id IS ? AND archived=0
+                    ORDER BY updated_at DESC, id DESC LIMIT 1
+                """, (user_id,)).fetchone()
+            if row is not None:
+                return row[0]
+            cur.execute("INSERT INTO conversations (user_id, title) VALUES (?, 'New chat')", (user_id,))
+            return cur.lastrowid
+
     def mark_message_handled(self, message_id: int):
-        conn = sqlite3.connect("calendai.db", timeout=10, isolation_level=None)
-        try:
-            conn.execute("UPDATE messages SET handled=1 WHERE id=?", (message_id,))
-        finally:
-            conn.close()
+        with self.conn_manager.transaction() as cur:
+            cur.execute("UPDATE messages SET handled=1 WHERE id=?", (message_id,))
 
     def mark_last_unhandled_user_message_handled(self, conversation_id: int):
         """
         Mark the most recent *user* message in this conversation as handled.
         Useful when you just created an event based on the latest instruction.
         """
-        conn = sqlite3.connect("calendai.db", timeout=10, isolation_level=None)
-        try:
-            cur = conn.cursor()
+        with self.conn_manager.transaction() as cur:
             cur.execute("""
                 SELECT id FROM messages
                 WHERE conversation_id=? AND sender='user' AND handled=0
@@ -258,5 +817,20 @@ class CalendarDB:
                 cur.execute("UPDATE messages SET handled=1 WHERE id=?", (row[0],))
                 return row[0]
             return None
-        finally:
-            conn.close()
\ No newline at end of file
+
+
+_shared_lock = threading.Lock()
+_shared: dict[str, CalendarDB] = {}
+
+
+def get_db(db_path: str | None = None) -> CalendarDB:
+    """
+    The app-wide CalendarDB for a database path. Views share it so the schema
+    check in create_tables runs once per process instead of once per view.
+    """
+    key = os.path.abspath(get_manager(db_path).path)
+    with _shared_lock:
+        db = _shared.get(key)
+        if db is None:
+            db = _shared[key] = CalendarDB(db_path)
+        return db
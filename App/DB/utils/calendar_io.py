@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from DB.sqlite import CalendarDB
+from utils.calendar_files import import_file, export_file
+
+# usage: calendar_io.py import|export <username> <file.ics|file.csv>
+if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+    sys.exit("usage: calendar_io.py import|export <username> <file.ics|file.csv>")
+action, username, path = sys.argv[1:]
+
+db = CalendarDB()
+user_id = db.get_user_id(username)
+if user_id is None:
+    sys.exit(f"no such user: {username}")
+if action == "import":
+    inserted, skipped = import_file(db, user_id, path)
+    print(f"imported {inserted} events ({skipped} duplicates or unreadable rows skipped)")
+else:
+    print(f"exported {export_file(db, user_id, path)} events to {path}")
+db.close()
@@ -1,7 +1,21 @@
-import sqlite3
+import os
+import sys
 
-conn = sqlite3.connect("calendai.db")
-cur = conn.cursor()
-cur.execute("DELETE FROM messages")  # or add WHERE conversation_id = 1
-conn.commit()
-conn.close()
\ No newline at end of file
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from DB.sqlite import CalendarDB
+
+# usage: clear_chat.py [conversation_id]   (no id = every conversation)
+conversation_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+db = CalendarDB()
+with db.conn_manager.transaction() as cur:
+    if conversation_id is None:
+        cur.execute("DELETE FROM messages")
+        cur.execute("DELETE FROM conversation_summaries")
+        cur.execute("DELETE FROM conversations")
+    else:
+        cur.execute("DELETE FROM messages WHERE conversation_id=?", (conversation_id,))
+        cur.execute("DELETE FROM conversation_summaries WHERE conversation_id=?", (conversation_id,))
+        cur.execute("DELETE FROM conversations WHERE id=?", (conversation_id,))
+db.close()
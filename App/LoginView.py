@@ -1,7 +1,7 @@
 import sys
 import PyQt6.QtWidgets as qtw
 import PyQt6.QtCore as qtc
-from DB.sqlite import CalendarDB
+from DB.sqlite import get_db
 from MainWindow import MainWindow
 import configparser
 from LoginToken import generate_token, validate_token, save_token_to_file, load_token_from_file
@@ -9,11 +9,12 @@ from LoginToken import generate_token, validate_token, save_token_to_file, load_
 class LoginView(qtw.QWidget):
     def __init__(self):
         super().__init__()
-        self.db = CalendarDB()
+        self.db = get_db()
         self.hide()
-        if not self.auto_login():
-            self.show()
-        
+        # A valid saved token goes straight to the main window; the login form is never built
+        if self.auto_login():
+            return
+
         # Set up layout
         self.setWindowTitle("CalendAI - Login")
         self.setFixedSize(qtc.QSize(400, 400))
@@ -49,12 +50,7 @@ class LoginView(qtw.QWidget):
         self.error_label = qtw.QLabel("")
         self.error_label.setStyleSheet("color: red;")
         layout.addWidget(self.error_label)
-
-        # First, check if the user has a valid session/token
-        if not self.auto_login():
-            self.show()  # Only show the login window if auto-login fail
-
-        
+        self.show()
 
     def handle_login(self):
         username = self.username_input.text()
@@ -90,7 +86,7 @@ class LoginView(qtw.QWidget):
         return False
     def accept_login(self, username=None):
         self.close()
-        self.main_window = MainWindow(userid=self.db.get_user_id(username) if username else None)
+        self.main_window = MainWindow(userid=self.db.get_user_id(username) if username else None, db=self.db)
         self.main_window.show()
 
     def save_credentials(self, username):
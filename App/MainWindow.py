@@ -1,12 +1,18 @@
 import PyQt6.QtWidgets as qtw
 import PyQt6.QtCore as qtc
 import sys
-from CalendarView import CalendarView
-from ChatView import ChatView
-from TaskView import TaskView
+from DB.sqlite import get_db
+from event_repository import EventRepository
+from reminder_notifier import ReminderNotifier
 
 class MainWindow(qtw.QMainWindow):
-    def __init__(self, userid=None):
+    """
+    Views are built (and their modules imported) the first time they are shown,
+    so startup only pays for the chat view. All of them share one CalendarDB and
+    one EventRepository (the user's events, cached in memory). Reminders fire
+    from a ReminderNotifier and are shown as tray messages.
+    """
+    def __init__(self, userid=None, db=None):
         super().__init__()
         main_color = "#352F44"
         second_color = "#5C5470"
@@ -19,6 +25,12 @@ class MainWindow(qtw.QMainWindow):
         main_widget = qtw.QWidget(self)
         self.setCentralWidget(main_widget)
         self.userID = userid  # Set this when user logs in
+        self.palette_colors = palette
+        self.db = db or get_db()
+        self.events = EventRepository(self.db, userid)
+        self.reminders = ReminderNotifier(self.db, userid, parent=self)
+        self.reminders.due.connect(self.show_reminders)
+        self._tray = None
 
         splitter = qtw.QSplitter(qtc.Qt.Orientation.Horizontal)
         nav_panel = qtw.QWidget()
@@ -35,31 +47,17 @@ class MainWindow(qtw.QMainWindow):
             nav_layout.addWidget(button)
 
         nav_layout.addStretch()
-        main_content = qtw.QStackedWidget()
-
-        self.home_view = ChatView(palette, userid=self.userID)
-        self.calendar_view = CalendarView(palette, user_id=self.userID)
-        self.tasks_view = TaskView(palette, user_id=self.userID)
-        self.settings_view = qtw.QLabel("Settings View")
-
-
-        views = [
-            self.home_view,
-            self.calendar_view,
-            self.tasks_view,
-            self.settings_view
-        ]
-        for label in [self.settings_view]:
-            label.setAlignment(qtc.Qt.AlignmentFlag.AlignCenter)
-            label.setStyleSheet("font-size: 20px; text-align: center;")
-        for view in views:
-            main_content.addWidget(view)
+        self.main_content = qtw.QStackedWidget()
+        self.home_view = self.calendar_view = self.tasks_view = self.settings_view = None
+        self._view_builders = [self._build_home, self._build_calendar, self._build_tasks, self._build_settings]
+        self._views = [None] * len(self._view_builders)
+        self.show_view(0)
 
         for i, button in enumerate(nav_buttons):
-            button.clicked.connect(lambda checked, i=i: main_content.setCurrentWidget(views[i]))
+            button.clicked.connect(lambda checked, i=i: self.show_view(i))
 
         splitter.addWidget(nav_panel)
-        splitter.addWidget(main_content)
+        splitter.addWidget(self.main_content)
         splitter.setSizes([200, 700])
 
         # Add buttons to the layout
@@ -67,3 +65,52 @@ class MainWindow(qtw.QMainWindow):
         main_layout = qtw.QHBoxLayout()
         main_layout.addWidget(splitter)
         main_widget.setLayout(main_layout)
+
+    def show_view(self, index):
+        """Switch to a view, building it on first use."""
+        view = self._views[index]
+        if view is None:
+            view = self._views[index] = self._view_builders[index]()
+            self.main_content.addWidget(view)
+        self.main_content.setCurrentWidget(view)
+
+    def _build_home(self):
+        from ChatView import ChatView
+        self.home_view = ChatView(self.palette_colors, userid=self.userID, db=self.db, repo=self.events,
+                                  reminders=self.reminders.scheduler)
+        return self.home_view
+
+    def _build_calendar(self):
+        from CalendarView import CalendarView
+        self.calendar_view = CalendarView(self.palette_colors, user_id=self.userID, db=self.db, repo=self.events)
+        return self.calendar_view
+
+    def _build_tasks(self):
+        from TaskView import TaskView
+        self.tasks_view = TaskView(self.palette_colors, user_id=self.userID, db=self.db, repo=self.events)
+        return self.tasks_view
+
+    def _build_settings(self):
+        self.settings_view = qtw.QLabel("Settings View")
+        self.settings_view.setAlignment(qtc.Qt.AlignmentFlag.AlignCenter)
+        self.settings_view.setStyleSheet("font-size: 20px; text-align: center;")
+        return self.settings_view
+
+    def show_reminders(self, reminders):
+        """Show fired reminders as a tray message, or a non-blocking dialog without a tray."""
+        lines = [r.text() for r in reminders[:5]]
+        if len(reminders) > 5:
+            lines.append(f"…and {len(reminders) - 5} more")
+        text = "\n".join(lines)
+        if qtw.QSystemTrayIcon.isSystemTrayAvailable():
+            if self._tray is None:
+                icon = self.style().standardIcon(qtw.QStyle.StandardPixmap.SP_MessageBoxInformation)
+                self._tray = qtw.QSystemTrayIcon(icon, self)
+                self._tray.show()
+            self._tray.showMessage("Reminder", text)
+        else:
+            box = qtw.QMessageBox(qtw.QMessageBox.Icon.Information, "Reminder", text, parent=self)
+            box.setModal(False)
+            box.setAttribute(qtc.Qt.WidgetAttribute.WA_DeleteOnClose)
+            box.show()
+        qtw.QApplication.alert(self)
@@ -2,8 +2,17 @@ import PyQt6.QtCore as qtc
 import PyQt6.QtWidgets as qtw
 import PyQt6.QtGui as qtg
 
-from DB.sqlite import CalendarDB
-from datetime import datetime, date, timedelta
+from DB.sqlite import get_db
+from DB.records import Event
+from DB.changes import RESET
+from DB.search import search_terms
+from change_relay import get_relay
+from event_repository import EventRepository
+from task_model import TaskTableModel, TaskFilterProxy
+from datetime import date, timedelta
+
+SEARCH_DEBOUNCE_MS = 150   # filter once typing pauses, not on every keystroke
+ROW_HEIGHT = 30
 
 
 class TaskView(qtw.QWidget):
@@ -12,17 +21,22 @@ class TaskView(qtw.QWidget):
     - Sorted by start (YYYY-MM-DD HH:MM).
     - Works with or without user_id.
     - Times are optional; missing times sort as 00:00.
+    - Rows live in a TaskTableModel behind a TaskFilterProxy (task_model.py), so
+      only visible rows are drawn and searching never rebuilds the table.
+    - Search goes through the FTS index (prefix terms, all must match).
     """
-    def __init__(self, palette, user_id=None):
+    def __init__(self, palette, user_id=None, db=None, repo=None):
         super().__init__()
         self.second_color = palette[1]
         self.third_color  = palette[2]
         self.fourth_color = palette[3]
 
-        self.db = CalendarDB()
+        self.db = db or get_db()
         self.user_id = user_id
-        self._rows_raw = []     # raw events from DB (list[dict])
-        self._rows_view = []    # filtered/sorted rows currently rendered
+        self.repo = repo or EventRepository(self.db, user_id)   # shared in-memory calendar
+        self.model = TaskTableModel(self)
+        self.proxy = TaskFilterProxy(self)
+        self.proxy.setSourceModel(self.model)
 
         main = qtw.QVBoxLayout(self)
 
@@ -35,14 +49,18 @@ class TaskView(qtw.QWidget):
         controls = qtw.QHBoxLayout()
         self.search = qtw.QLineEdit()
         self.search.setPlaceholderText("Search title, description, location...")
-        self.search.textChanged.connect(self._render)
+        self._search_timer = qtc.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._apply_search)
+        self.search.textChanged.connect(self._search_timer.start)
 
         self.filter = qtw.QComboBox()
         self.filter.addItems(["All", "Upcoming", "Today", "This Week", "Past"])
-        self.filter.currentIndexChanged.connect(self._render)
+        self.filter.currentIndexChanged.connect(self.refresh_from_db)
 
         self.refresh_btn = qtw.QPushButton("↻ Refresh")
-        self.refresh_btn.clicked.connect(self.refresh_from_db)
+        self.refresh_btn.clicked.connect(self.reload)
 
         for w in (self.search, self.filter, self.refresh_btn):
             w.setStyleSheet(f"background-color: {self.second_color}; color: white; padding: 6px; border-radius: 6px;")
@@ -52,151 +70,98 @@ class TaskView(qtw.QWidget):
         main.addLayout(controls)
 
         # Table
-        self.table = qtw.QTableWidget(0, 6)
-        self.table.setHorizontalHeaderLabels(["When", "End", "Title", "Time", "Location", "Description"])
+        self.table = qtw.QTableView()
+        self.table.setModel(self.proxy)
         self.table.setEditTriggers(qtw.QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setSelectionBehavior(qtw.QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setAlternatingRowColors(True)
-        self.table.setSortingEnabled(False)  # we sort manually for full control
         self.table.verticalHeader().setVisible(False)
-        self.table.horizontalHeader().setStretchLastSection(True)
+        # Fixed row heights and column widths: nothing is measured per row
+        self.table.verticalHeader().setSectionResizeMode(qtw.QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(qtw.QHeaderView.ResizeMode.Interactive)
+        header.setStretchLastSection(True)
+        for column, width in enumerate((100, 100, 220, 110, 140)):
+            header.resizeSection(column, width)
+        # Header clicks sort the model on its precomputed keys (chronological by default)
+        header.setSortIndicator(0, qtc.Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
         self.table.setStyleSheet(
-            f"QTableWidget {{ background-color: {self.third_color}; color: white; border-radius: 6px; }}"
+            f"QTableView {{ background-color: {self.third_color}; color: white; border-radius: 6px; }}"
             f"QHeaderView::section {{ background-color: {self.fourth_color}; padding: 6px; border: none; }}"
-            f"QTableWidget::item {{ padding: 6px; }}"
+            f"QTableView::item {{ padding: 6px; }}"
         )
         main.addWidget(self.table)
 
+        # Event writes anywhere in the app arrive as deltas
+        get_relay().changed.connect(self.apply_change)
+
         # Initial load
         self.refresh_from_db()
 
 
     def refresh_from_db(self):
-        """Reload events from DB and redraw."""
-        self._rows_raw = self._fetch_events()
-        self._render()
-
-    def _fetch_events(self) -> list[dict]:
-        """
-        Get events (for a user if provided; else all).
-        Returns unified dict rows.
-        """
+        """Reload events for the active filter from the repository and redraw."""
+        self.model.set_events(self._fetch_events())
+
+    def reload(self):
+        """Drop the shared cache and re-read everything from the DB."""
+        self.repo.invalidate()
+        self.refresh_from_db()
+
+    def _apply_search(self):
+        text = self.search.text()
+        if not search_terms(text):
+            self.proxy.set_matches(None)
+            return
         try:
-            if self.user_id is not None:
-                rows = self.db.get_events(self.user_id)  # likely tuples
-                cols = ["id", "user_id", "title", "description", "start_date", "end_date", "start_time", "end_time"]
-                if rows and not isinstance(rows[0], dict):
-                    rows = [dict(zip(cols, r)) for r in rows]
-                return rows
-
-            if hasattr(self.db, "get_all_events"):
-                return self.db.get_all_events()
-
-            import sqlite3
-            conn = sqlite3.connect("calendai.db")
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT id, user_id, title, description, start_date, end_date, start_time, end_time, NULL as location
-                FROM events
-                ORDER BY start_date, start_time
-            """)
-            rows = [dict(r) for r in cur.fetchall()]
-            conn.close()
-            return rows
+            self.proxy.set_matches(self.repo.search_ids(text))
+        except Exception as e:
+            print("TaskView: search failed:", e)
+
+    def apply_change(self, change):
+        """Patch the loaded rows with one committed DB change instead of re-querying."""
+        if change.kind == RESET:
+            if self.user_id is None or change.user_id in (None, self.user_id):
+                self.refresh_from_db()
+            return
+        if self.user_id is not None and change.user_id != self.user_id:
+            return
+        if any(e.is_recurring for e in change.events()):
+            self.refresh_from_db()   # re-expand the series for the current window
+            return
+
+        if change.old is not None:
+            self.model.remove_event(change.old.id)
+        e = change.event
+        if e is not None and e.start_date is not None:
+            start, end = self._window_for_filter(self.filter.currentText())
+            if (start is None or e.end_date >= start) and (end is None or e.start_date <= end):
+                self.model.add_event(e)
+        if self.search.text().strip():
+            self._apply_search()   # the changed event may now (not) match
+
+    def _window_for_filter(self, mode: str) -> tuple[date | None, date | None]:
+        """Date window to fetch for a quick filter (None = open-ended)."""
+        today = date.today()
+        if mode == "Today":
+            return today, today
+        if mode == "This Week":
+            start_of_week = today - timedelta(days=today.weekday())
+            return start_of_week, start_of_week + timedelta(days=6)
+        if mode == "Upcoming":
+            return today, None
+        if mode == "Past":
+            return None, today
+        return None, None
+
+    def _fetch_events(self) -> list[Event]:
+        """Get events for the active quick filter (for a user if provided; else all)."""
+        start, end = self._window_for_filter(self.filter.currentText())
+        try:
+            # Series are expanded for a bounded window only; open filters look a year either way
+            return self.repo.events_between(start, end)
         except Exception as e:
             print("TaskView: failed to fetch events:", e)
             return []
-
-    def _render(self):
-        """Apply filters + search, sort chronologically, and fill the table."""
-        q = (self.search.text() or "").strip().lower()
-        mode = self.filter.currentText()
-
-        today = date.today()
-        start_of_week = today - timedelta(days=today.weekday())
-        end_of_week   = start_of_week + timedelta(days=6)
-
-        def norm_time(t: str | None) -> str:
-            t = (t or "").strip()
-            return t if t else "00:00"
-
-        def parse_date(d: str | None) -> date | None:
-            try:
-                return datetime.strptime((d or "").strip(), "%Y-%m-%d").date()
-            except Exception:
-                return None
-
-        # Filter + normalize
-        filtered = []
-        for r in self._rows_raw:
-            title = (r.get("title") or "").strip()
-            desc  = (r.get("description") or "").strip()
-            loc   = (r.get("location") or "").strip()
-
-            sd = parse_date(r.get("start_date"))
-            ed = parse_date(r.get("end_date")) or sd
-            st = norm_time(r.get("start_time"))
-            et = norm_time(r.get("end_time"))
-
-            if sd is None:
-                continue  # ignore invalid dates
-
-            # Quick filters
-            if mode == "Upcoming" and ed < today:
-                continue
-            if mode == "Past" and sd > today:
-                continue
-            if mode == "Today" and not (sd <= today <= ed):
-                continue
-            if mode == "This Week":
-
-                if ed < start_of_week or sd > end_of_week:
-                    continue
-
-            # Search
-            hay = " ".join([title.lower(), desc.lower(), loc.lower()])
-            if q and q not in hay:
-                continue
-
-            start_iso = f"{sd.isoformat()} {st}"
-            end_iso   = f"{(ed or sd).isoformat()} {et}"
-            when_txt  = sd.strftime("%Y-%m-%d")
-            end_txt   = ed.strftime("%Y-%m-%d") if ed and ed != sd else ""
-
-            time_txt  = f"{st}–{et}" if (st or et) and (st != "00:00" or et != "00:00") else ""
-            filtered.append({
-                "when_sort": start_iso,
-                "when": when_txt,
-                "end": end_txt,
-                "title": title or "(Untitled)",
-                "time": time_txt,
-                "location": loc,
-                "desc": desc
-            })
-
-
-        filtered.sort(key=lambda r: r["when_sort"])
-        self._rows_view = filtered
-
-        self.table.setRowCount(len(filtered))
-        for row, r in enumerate(filtered):
-            self._set_row(row, r)
-        self.table.resizeColumnsToContents()
-        self.table.horizontalHeader().setStretchLastSection(True)
-
-    def _set_row(self, row: int, r: dict):
-        def make_item(text: str, bold=False, sort_key: str | None = None):
-            it = qtw.QTableWidgetItem(text)
-            if bold:
-                f = it.font(); f.setBold(True); it.setFont(f)
-            if sort_key:
-                it.setData(qtc.Qt.ItemDataRole.UserRole, sort_key)
-            return it
-
-        self.table.setItem(row, 0, make_item(r["when"], bold=True, sort_key=r["when_sort"]))  # When
-        self.table.setItem(row, 1, make_item(r["end"]))                                       # End
-        self.table.setItem(row, 2, make_item(r["title"]))                                     # Title
-        self.table.setItem(row, 3, make_item(r["time"]))                                      # Time
-        self.table.setItem(row, 4, make_item(r["location"]))                                  # Location
-        self.table.setItem(row, 5, make_item(r["desc"]))                                      # Description
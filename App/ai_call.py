@@ -1,18 +1,17 @@
 # ai_call.py
-from openai import OpenAI
-import os, json
+import json
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from dotenv import load_dotenv
 
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
+from llm_client import get_client, call_with_retry
+from utils.fastpath import try_fast_path, describe_event
 
 
 def _format_recent_events(events: list[dict]) -> str:
     """
     Turn a short list of events into concise bullet lines for a system note.
-    Expected keys: title, start_date, start_time (optional), location (optional).
+    Expected keys: title, start_date, start_time (optional), location (optional),
+    recurring (optional).
     """
     lines = []
     for e in (events or [])[:10]:
@@ -21,6 +20,8 @@ def _format_recent_events(events: list[dict]) -> str:
         st    = (e.get("start_time") or "").strip()
         loc   = (e.get("location") or "").strip()
         line = f"- {title} on {sd}" + (f" at {st}" if st else "") + (f" ({loc})" if loc else "")
+        if e.get("recurring"):
+            line += " (recurring)"
         lines.append(line)
     return "\n".join(lines)
 
@@ -57,6 +58,10 @@ def build_messages(user_history: list[dict], recent_events: list[dict] | None =
 
 
 # ---- tool call ----
+CREATE_EVENT_TOOL = "create_calendar_event"   # ends the turn with a suggestion for the UI
+FIND_FREE_SLOTS_TOOL = "find_free_slots"       # answered locally, then the model continues
+MAX_TOOL_ROUNDS = 3
+
 TOOLS = [{
     "type": "function",
     "function": {
@@ -71,12 +76,40 @@ TOOLS = [{
                 "end_date":    {"type": "string"},
                 "start_time":  {"type": "string"},
                 "end_time":    {"type": "string"},
-                "location":    {"type": "string"} # optional
+                "location":    {"type": "string"}, # optional
+                "rrule":       {"type": "string",   # optional
+                                "description": "Only for repeating events: an RFC 5545 RRULE such as "
+                                               "'FREQ=WEEKLY;BYDAY=MO,WE' or 'FREQ=MONTHLY;COUNT=6'. "
+                                               "Supported: FREQ (DAILY/WEEKLY/MONTHLY/YEARLY), INTERVAL, "
+                                               "COUNT, UNTIL, BYDAY (weekly only)."},
+                "reminder_minutes": {"type": "integer",   # optional
+                                     "description": "Only when the user asks to be reminded: how many minutes "
+                                                    "before the start to alert (0 = at the start time)."}
             },
             "required": ["title","description","start_date","end_date","start_time","end_time"],
             "additionalProperties": False
         }
     }
+}, {
+    "type": "function",
+    "function": {
+        "name": "find_free_slots",
+        "description": "Find free time in the user's calendar, e.g. for 'when am I free this week?' "
+                       "or before proposing a time. Returns free gaps within working hours.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "start_date":       {"type": "string", "description": "First day to search, YYYY-MM-DD"},
+                "end_date":         {"type": "string", "description": "Last day to search (inclusive), YYYY-MM-DD"},
+                "duration_minutes": {"type": "integer", "description": "Minimum length of a free slot"},
+                "work_start":       {"type": "string", "description": "Earliest time of day, HH:MM (default 09:00)"},
+                "work_end":         {"type": "string", "description": "Latest time of day, HH:MM (default 17:00)"},
+                "include_weekends": {"type": "boolean"}
+            },
+            "required": ["start_date", "end_date", "duration_minutes"],
+            "additionalProperties": False
+        }
+    }
 }]
 
 
@@ -92,19 +125,37 @@ TIME_HINT_RE = re.compile(
     r"next|this|on \d{1,2}(st|nd|rd|th)?|at \d{1,2}(:\d{2})?\s?(am|pm)?|"
     r"\d{4}-\d{2}-\d{2})\b", re.I)
 
+# "when am I free", "do I have time for ..." -- must not force create_calendar_event.
+# Question forms only: "book time for a haircut" is a request, not a question.
+AVAILABILITY_RE = re.compile(
+    r"\b(when (am i|are we|i'?m|we'?re) (free|available)|(am i|are we|is \w+) (free|available)|"
+    r"(do|would) (i|we) have (any |the )?(free )?time|any (free )?(time|slots?|gaps?)|"
+    r"free (time|slots?)|open slots?|availability|(can|could) (i|we) (fit|squeeze)|where can i fit)\b", re.I)
+
+# An imperative create ("book ...", "please add ...") wins over any availability wording
+CREATE_VERB_RE = re.compile(
+    r"^\s*(?:(?:please|pls|hey|ok|okay)[,\s]+)*(?:please\s+)?"
+    r"(add|schedule|create|set up|book|put|plan|block|reserve|remind me)\b", re.I)
+
 def _has_schedule_intent(text: str) -> bool:
     t = text.strip().lower()
     return bool(INTENT_RE.search(t) or TIME_HINT_RE.search(t))
 
-def function_call(user_text: str,
-                  history_sanitized: list[dict],
-                  recent_events: list[dict] | None = None,
-                  *,
-                  has_pending: bool = False):
-    if not api_key:
-        raise ValueError("API key is not set.")
-    client = OpenAI(api_key=api_key)
+def _previous_reply(history: list[dict]) -> str | None:
+    """The assistant turn right before the new user message, if the history ends with one."""
+    if history and history[-1].get("role") == "assistant":
+        return history[-1].get("content") or ""
+    return None
 
+def _has_availability_question(text: str) -> bool:
+    return bool(AVAILABILITY_RE.search(text))
+
+def _build_request(user_text: str,
+                   history_sanitized: list[dict],
+                   recent_events: list[dict] | None,
+                   has_pending: bool,
+                   tool_executors: dict | None = None) -> dict:
+    """Messages + tool settings shared by the blocking and streaming calls."""
     core = [{
         "role": "system",
         "content": (
@@ -113,45 +164,245 @@ def function_call(user_text: str,
             "If there is a pending event awaiting user confirmation, do NOT call tools again—ask for confirmation or adjustments. "
             "When the latest user message requests or implies scheduling (natural language like "
             "'I want to ... on Sunday at 14' counts), you MUST call the create_calendar_event tool. "
-            "Do not say you'll create an event unless you actually call the tool."
+            "Do not say you'll create an event unless you actually call the tool. "
+            "For questions about free time or availability, call find_free_slots (when available) "
+            "instead of guessing from the event list."
         )
     }]
 
     messages = build_messages(core + history_sanitized + [{"role": "user", "content": user_text}],
                               recent_events=recent_events)
 
+    # Local tools are only offered when the caller can run them
+    executors = tool_executors or {}
+    tools = [t for t in TOOLS if t["function"]["name"] == CREATE_EVENT_TOOL or t["function"]["name"] in executors]
+
     # 🎯 Key change: allow tools by default; if intent is clear, REQUIRE the specific tool
     if has_pending:
         tool_choice = "none"
+    elif CREATE_VERB_RE.search(user_text):
+        tool_choice = {"type": "function", "function": {"name": CREATE_EVENT_TOOL}}  # force
+    elif _has_availability_question(user_text):
+        tool_choice = ({"type": "function", "function": {"name": FIND_FREE_SLOTS_TOOL}}
+                       if FIND_FREE_SLOTS_TOOL in executors else "auto")
     elif _has_schedule_intent(user_text):
-        tool_choice = {"type": "function", "function": {"name": "create_calendar_event"}}  # force
+        tool_choice = {"type": "function", "function": {"name": CREATE_EVENT_TOOL}}  # force
     else:
         tool_choice = "auto"
 
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-        tools=TOOLS,
-        tool_choice=tool_choice
-    )
+    return {"model": "gpt-4o", "messages": messages, "tools": tools, "tool_choice": tool_choice}
 
-    msg = completion.choices[0].message
-    ai_text = msg.content or ""
 
-    # Debug (super useful)
-    if getattr(msg, "tool_calls", None):
-        print("DEBUG tool_calls:", [tc.function.name for tc in msg.tool_calls])
-        print("DEBUG tool_args:", msg.tool_calls[0].function.arguments)
-    else:
-        print("DEBUG no tool call; ai_text:", repr(ai_text))
+def _run_tool(name: str, arguments: str, tool_executors: dict) -> str:
+    """Execute a local tool; errors go back to the model as data, not exceptions."""
+    try:
+        args = json.loads(arguments or "{}")
+        result = tool_executors[name](**args)
+    except Exception as e:
+        print(f"DEBUG tool {name} failed:", e)
+        result = {"error": str(e)}
+    print(f"DEBUG tool {name}({arguments}) ->", str(result)[:200])
+    return json.dumps(result, ensure_ascii=False, default=str)
+
+
+def _tool_round_messages(text: str, calls: list[tuple[str, str, str]], tool_executors: dict) -> list[dict]:
+    """
+    The assistant turn that asked for tools + one tool result per call, to append
+    before asking the model again. calls: (id, name, arguments).
+    """
+    assistant = {
+        "role": "assistant",
+        "content": text or None,
+        "tool_calls": [{"id": cid, "type": "function", "function": {"name": name, "arguments": args}}
+                       for cid, name, args in calls],
+    }
+    results = [{"role": "tool", "tool_call_id": cid, "content": _run_tool(name, args, tool_executors)}
+               for cid, name, args in calls]
+    return [assistant] + results
+
 
+class ToolCallAssembler:
+    """
+    Collects streamed tool-call fragments (keyed by tool-call index) and notices
+    the moment a call's JSON arguments are complete, by tracking brace depth as
+    fragments arrive instead of re-parsing the whole buffer every chunk.
+    """
+
+    def __init__(self):
+        self.calls: dict[int, dict] = {}
+
+    def feed(self, tool_call_delta) -> tuple[int, dict] | None:
+        """Add one fragment; returns (index, parsed_args) when that call's JSON just closed."""
+        idx = tool_call_delta.index or 0
+        call = self.calls.setdefault(idx, {
+            "id": "", "name": "", "arguments": [], "depth": 0, "in_string": False,
+            "escape": False, "started": False, "complete": False,
+        })
+        if getattr(tool_call_delta, "id", None):
+            call["id"] = tool_call_delta.id
+        fn = tool_call_delta.function
+        if fn is None:
+            return None
+        if fn.name:
+            call["name"] += fn.name
+        fragment = fn.arguments or ""
+        if not fragment or call["complete"]:
+            return None
+        call["arguments"].append(fragment)
+
+        for ch in fragment:
+            if call["in_string"]:
+                if call["escape"]:
+                    call["escape"] = False
+                elif ch == "\\":
+                    call["escape"] = True
+                elif ch == '"':
+                    call["in_string"] = False
+            elif ch == '"':
+                call["in_string"] = True
+            elif ch == "{":
+                call["depth"] += 1
+                call["started"] = True
+            elif ch == "}":
+                call["depth"] -= 1
+                if call["started"] and call["depth"] == 0:
+                    call["complete"] = True
+                    break
+
+        if call["complete"]:
+            try:
+                return idx, json.loads("".join(call["arguments"]))
+            except ValueError as e:
+                print("DEBUG: failed to parse streamed tool args:", e)
+        return None
+
+    def arguments(self, idx: int = 0) -> str:
+        call = self.calls.get(idx)
+        return "".join(call["arguments"]) if call else ""
+
+    def name(self, idx: int = 0) -> str:
+        call = self.calls.get(idx)
+        return call["name"] if call else ""
+
+
+def function_call_stream(user_text: str,
+                         history_sanitized: list[dict],
+                         recent_events: list[dict] | None = None,
+                         *,
+                         has_pending: bool = False,
+                         cache=None,
+                         events_version: int = 0,
+                         user_id=None,
+                         tool_executors: dict | None = None):
+    """
+    Streaming model call. Yields:
+      ("delta", str)         -- assistant text as it arrives
+      ("event", dict)        -- create_calendar_event arguments, as soon as its JSON is complete
+      ("done", (text, event)) -- once, at the end (same shape function_call returns)
+    Closing the generator early (e.g. on cancel) closes the HTTP response.
+    With a ResponseCache, repeated questions against an unchanged calendar are
+    answered from the cache (events_version is CalendarDB.get_events_version).
+    tool_executors maps local tool names (find_free_slots) to callables taking the
+    tool's arguments; their results are fed back and the model is asked again.
+    """
+    # Unambiguous "dentist tomorrow at 14:00" requests never need the network
+    fast = None if has_pending else try_fast_path(user_text, previous_reply=_previous_reply(history_sanitized))
+    if fast is not None:
+        print("DEBUG fast-path event:", fast)
+        text = describe_event(fast)
+        yield "delta", text
+        yield "event", fast
+        yield "done", (text, fast)
+        return
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(user_text, history_sanitized, events_version,
+                                   user_id=user_id, has_pending=has_pending)
+        hit = cache.get(cache_key)
+        if hit is not None:
+            print("DEBUG response cache hit:", cache.stats())
+            text, event = hit
+            if text:
+                yield "delta", text
+            if event is not None:
+                yield "event", event
+            yield "done", hit
+            return
+
+    # Shared client: keeps the TLS session + keep-alive pool between turns
+    client = get_client()
+    request = _build_request(user_text, history_sanitized, recent_events, has_pending, tool_executors)
+    executors = tool_executors or {}
+
+    text_parts = []
     event = None
-    if msg.tool_calls:
+    used_tools = False
+    for round_no in range(MAX_TOOL_ROUNDS + 1):
+        stream = call_with_retry(client.chat.completions.create, stream=True, **request)
+        round_text = []
+        tools = ToolCallAssembler()
         try:
-            tool_call = msg.tool_calls[0]
-            event = json.loads(tool_call.function.arguments)
-        except Exception as e:
-            print("DEBUG: failed to parse tool args:", e)
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    round_text.append(delta.content)
+                    yield "delta", delta.content
+                for tc in delta.tool_calls or []:
+                    done = tools.feed(tc)
+                    if done is not None and event is None and tools.name(done[0]) == CREATE_EVENT_TOOL:
+                        event = done[1]
+                        print("DEBUG streamed tool_call:", tools.name(done[0]), tools.arguments(done[0]))
+                        yield "event", event
+        finally:
+            stream.close()
+        text_parts += round_text
+
+        if event is None:
+            for idx in sorted(tools.calls):
+                if tools.name(idx) != CREATE_EVENT_TOOL:
+                    continue
+                # Stream ended without the brace tracker closing -- last-ditch parse
+                try:
+                    event = json.loads(tools.arguments(idx))
+                except ValueError as e:
+                    print("DEBUG: failed to parse tool args:", e)
+                break
+
+        local = [(tools.calls[idx]["id"], tools.name(idx), tools.arguments(idx))
+                 for idx in sorted(tools.calls) if tools.name(idx) in executors]
+        if not local or event is not None or round_no == MAX_TOOL_ROUNDS:
+            break
+        request["messages"] = request["messages"] + _tool_round_messages("".join(round_text), local, executors)
+        request["tool_choice"] = "auto"
+        used_tools = True
+
+    ai_text = "".join(text_parts)
+    # Only reached when the stream ran to completion (not closed early)
+    if cache_key is not None and not used_tools:
+        cache.put(cache_key, ai_text, event)
+    yield "done", (ai_text, event)
 
-    return ai_text, event
 
+def function_call(user_text: str,
+                  history_sanitized: list[dict],
+                  recent_events: list[dict] | None = None,
+                  *,
+                  has_pending: bool = False,
+                  cache=None,
+                  events_version: int = 0,
+                  user_id=None,
+                  tool_executors: dict | None = None):
+    """
+    Blocking model call. Returns (ai_text, event_payload | None).
+    Drains function_call_stream, so the fast path, response cache and tool rounds
+    are the same code either way.
+    """
+    stream = function_call_stream(user_text, history_sanitized, recent_events, has_pending=has_pending,
+                                  cache=cache, events_version=events_version, user_id=user_id,
+                                  tool_executors=tool_executors)
+    for kind, value in stream:
+        if kind == "done":
+            return value
@@ -0,0 +1,59 @@
+# bench/bench_client_reuse.py
+"""
+Per-turn latency: a new OpenAI client per message (old behaviour) vs the shared
+client from llm_client, both against a local mock endpoint.
+
+    python bench/bench_client_reuse.py [turns]
+
+Plain-HTTP localhost understates the win: against api.openai.com every new
+client also pays DNS + TCP + TLS handshakes.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_openai import MockOpenAIServer
+import llm_client
+from llm_client import ClientConfig
+
+
+def _turn(client):
+    client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+
+
+def run(turns: int = 200):
+    server = MockOpenAIServer().start()
+    config = ClientConfig(base_url=server.base_url)
+    try:
+        fresh = []
+        for _ in range(turns):
+            t0 = time.perf_counter()
+            client = llm_client.build_client(config)
+            _turn(client)
+            fresh.append(time.perf_counter() - t0)
+            client.close()
+
+        llm_client.configure(config)
+        _turn(llm_client.get_client())  # warm the pool, as the first real turn would
+        shared = []
+        for _ in range(turns):
+            t0 = time.perf_counter()
+            _turn(llm_client.get_client())
+            shared.append(time.perf_counter() - t0)
+    finally:
+        llm_client.set_client(None)
+        server.stop()
+
+    for name, samples in (("new client per turn", fresh), ("shared client", shared)):
+        samples.sort()
+        print(f"{name:<22} median {statistics.median(samples) * 1000:7.2f} ms   "
+              f"p95 {samples[int(len(samples) * 0.95) - 1] * 1000:7.2f} ms")
+    saved = statistics.median(fresh) - statistics.median(shared)
+    print(f"saved per turn (median): {saved * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
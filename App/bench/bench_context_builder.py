@@ -0,0 +1,70 @@
+# bench/bench_context_builder.py
+"""
+Prompt size and build time of the token-budgeted history vs sending everything.
+
+    python bench/bench_context_builder.py
+
+For each conversation size it reports:
+  - tokens of the old "send every unhandled message" history
+  - first build (folds the whole backlog into the summary once)
+  - steady state: one new turn, incremental summary update
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from context_builder import ContextBuilder, message_tokens
+
+SIZES = (10, 1_000, 100_000)
+LOAD_LIMIT = 200  # same as ChatView.HISTORY_LOAD_LIMIT
+
+
+def _fill(db, n):
+    rows = []
+    for i in range(n):
+        if i % 2 == 0:
+            rows.append((1, None, "user", f"Can you move my meeting number {i} with the design team to Friday afternoon?", 0))
+        else:
+            rows.append((1, None, "assistant", f"Sure, meeting {i - 1} is now on Friday at 14:00. Anything else you need help with today?", 0))
+    with db.conn_manager.transaction() as cur:
+        cur.executemany(
+            "INSERT INTO messages (conversation_id, user_id, sender, message, handled) VALUES (?, ?, ?, ?, ?)", rows
+        )
+
+
+def _history(messages):
+    return [{"role": m.role, "content": m.content, "id": m.id} for m in messages]
+
+
+def run():
+    print(f"{'messages':>9} {'naive tok':>10} {'prompt tok':>10} {'first build':>12} {'next turn':>10}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CalendarDB(os.path.join(tmp, "bench.db"))
+            _fill(db, n)
+
+            naive = sum(message_tokens(m) for m in _history(db.get_messages_for_chat(1)))
+
+            builder = ContextBuilder(db, conversation_id=1)
+            t0 = time.perf_counter()
+            history = _history(db.get_recent_messages_for_chat(1, LOAD_LIMIT))
+            builder.build(history)
+            first = time.perf_counter() - t0
+
+            mid = db.save_message(1, "user", "What do I have on Friday?")
+            history.append({"role": "user", "content": "What do I have on Friday?", "id": mid})
+            t0 = time.perf_counter()
+            builder.build(history)
+            steady = time.perf_counter() - t0
+
+            print(f"{n:>9} {naive:>10} {builder.last_stats['prompt_tokens']:>10} "
+                  f"{first * 1000:>10.1f}ms {steady * 1000:>8.2f}ms")
+            db.close()
+
+
+if __name__ == "__main__":
+    run()
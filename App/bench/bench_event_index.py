@@ -0,0 +1,126 @@
+# bench/bench_event_index.py
+"""
+Conflict checks against a 100k-event calendar: the path ChatView's clash
+warnings take (EventRepository.conflicts) vs alternatives.
+
+    python bench/bench_event_index.py
+
+Reports
+  - repository load (DB read + O(n) tree build)
+  - per-query latency for "does 1h at a random time clash?" via
+      * EventRepository.conflicts on random days (window cache mostly missing)
+      * the same, asked again for the same day (window cache hit)
+      * SQL overlap query (get_events_between on the day, filtered by time)
+      * a linear scan over every event in memory
+  - cost of keeping the repository in sync on add_event (bus delta)
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from event_index import event_interval
+from event_repository import EventRepository
+
+N_EVENTS = 100_000
+N_QUERIES = 2_000
+FIRST_DAY = date(2021, 1, 1)
+DAYS = 5 * 365
+
+
+def _fill(db, user_id, n, rng):
+    rows = []
+    for i in range(n):
+        day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+        if rng.random() < 0.05:   # all-day / multi-day
+            end = day + timedelta(days=rng.choice((0, 0, 1, 3, 7)))
+            rows.append((user_id, f"Trip {i}", "", day.isoformat(), end.isoformat(), "", ""))
+        else:
+            h, m = rng.randrange(7, 21), rng.choice((0, 15, 30, 45))   # ends by 22:45 at the latest
+            length = rng.choice((15, 30, 60, 90, 120))
+            end_min = h * 60 + m + length
+            rows.append((user_id, f"Meeting {i}", "", day.isoformat(), day.isoformat(),
+                         f"{h:02d}:{m:02d}", f"{end_min // 60:02d}:{end_min % 60:02d}"))
+    with db.conn_manager.transaction() as cur:
+        cur.executemany("""
+            INSERT INTO events (user_id, title, description, start_date, end_date, start_time, end_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+        """, rows)
+
+
+def _queries(rng, n):
+    out = []
+    for _ in range(n):
+        day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+        h = rng.randrange(7, 21)
+        out.append((day.isoformat(), day.isoformat(), f"{h:02d}:00", f"{h + 1:02d}:00"))
+    return out
+
+
+def _sql_conflicts(db, user_id, q):
+    start, end = event_interval(*q)
+    return [e for e in db.get_events_between(user_id, q[0], q[1])
+            if (span := event_interval(e.start_date, e.end_date, e.start_time, e.end_time))
+            and span[0] < end and span[1] > start]
+
+
+def _scan_conflicts(spans, q):
+    start, end = event_interval(*q)
+    return [e for e, (s, t) in spans if s < end and t > start]
+
+
+def _time_per_query(fn, queries):
+    t0 = time.perf_counter()
+    hits = sum(len(fn(q)) for q in queries)
+    return (time.perf_counter() - t0) / len(queries) * 1e6, hits
+
+
+def run():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CalendarDB(os.path.join(tmp, "bench.db"))
+        db.add_user("bench", "x", "bench@example.com")
+        user_id = db.get_user_id("bench")
+        _fill(db, user_id, N_EVENTS, rng)
+
+        repo = EventRepository(db, user_id)
+        t0 = time.perf_counter()
+        repo.warm()
+        build = time.perf_counter() - t0
+        print(f"events: {len(repo)}   repository load (incl. DB read): {build * 1000:.0f} ms")
+
+        queries = _queries(rng, N_QUERIES)
+        idx_us, idx_hits = _time_per_query(lambda q: repo.conflicts(*q), queries)
+        warm_us, _ = _time_per_query(lambda q: repo.conflicts(*q), queries[-200:])
+        sql_us, sql_hits = _time_per_query(lambda q: _sql_conflicts(db, user_id, q), queries)
+        all_events = db.get_events_between(user_id)
+        spans = [(e, event_interval(e.start_date, e.end_date, e.start_time, e.end_time)) for e in all_events]
+        scan_us, scan_hits = _time_per_query(lambda q: _scan_conflicts(spans, q), queries[:200])
+        assert idx_hits == sql_hits, (idx_hits, sql_hits)
+
+        print(f"{'method':<22} {'per query':>12}")
+        print(f"{'repository':<22} {idx_us:>10.1f}us")
+        print(f"{'repository (cached)':<22} {warm_us:>10.1f}us   (last 200 queries again)")
+        print(f"{'SQL day window':<22} {sql_us:>10.1f}us")
+        print(f"{'linear scan':<22} {scan_us:>10.1f}us   (first 200 queries, {scan_hits} hits)")
+
+        # Sync cost: add_event publishes a delta the repository applies in O(log n)
+        t0 = time.perf_counter()
+        for i in range(200):
+            db.add_event(user_id, f"Added {i}", "", "2030-01-01", "2030-01-01", "09:00", "10:00")
+        per_write = (time.perf_counter() - t0) / 200 * 1000
+        assert len(repo.conflicts("2030-01-01", "2030-01-01", "09:30", "09:45")) == 200
+        print(f"add_event incl. repository update: {per_write:.2f} ms/write")
+
+        repo.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,66 @@
+# bench/bench_event_repository.py
+"""
+Day and month lookups on a 100k-event calendar: shared EventRepository vs the DB.
+
+    python bench/bench_event_repository.py
+
+Reports
+  - repository load (one read for all views, previously one per view)
+  - per-query latency for a random day and a random 6-week grid via
+      * CalendarDB.get_agenda (what each view used to run)
+      * EventRepository, first lookup of a window (tree query)
+      * EventRepository, repeated lookup of the last 200 windows (cached)
+  - the repository's cache stats afterwards
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from event_repository import EventRepository
+from bench.bench_event_index import _fill, FIRST_DAY, DAYS
+
+N_EVENTS = 100_000
+N_QUERIES = 1_000
+
+
+def _time_per_query(fn, windows):
+    t0 = time.perf_counter()
+    for first, last in windows:
+        fn(first, last)
+    return (time.perf_counter() - t0) / len(windows) * 1e6
+
+
+def run():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CalendarDB(os.path.join(tmp, "bench.db"))
+        db.add_user("bench", "x", "bench@example.com")
+        user_id = db.get_user_id("bench")
+        _fill(db, user_id, N_EVENTS, rng)
+
+        repo = EventRepository(db, user_id)
+        t0 = time.perf_counter()
+        repo.warm()
+        print(f"events: {len(repo)}   repository load: {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+        days = [FIRST_DAY + timedelta(days=rng.randrange(DAYS)) for _ in range(N_QUERIES)]
+        for name, windows in (("day", [(d, d) for d in days]),
+                              ("6-week grid", [(d, d + timedelta(days=41)) for d in days])):
+            sql = _time_per_query(lambda a, b: db.get_agenda(user_id, a, b), windows)
+            cold = _time_per_query(repo.events_between, windows)
+            warm = _time_per_query(repo.events_between, windows[-200:])
+            print(f"{name:<12} get_agenda {sql:8.1f}us   repository {cold:8.1f}us   cached {warm:8.1f}us")
+
+        print(repo.stats())
+        repo.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
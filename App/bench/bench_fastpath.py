@@ -0,0 +1,70 @@
+# bench/bench_fastpath.py
+"""
+Accuracy and latency of the local scheduling fast path (utils/fastpath.py)
+on the labeled corpus in bench/fastpath_corpus.jsonl.
+
+    python bench/bench_fastpath.py [-v]
+
+Each corpus line is {"text": ..., "expect": payload | null} plus an optional
+"previous" (the assistant turn before the message). null means the request
+must fall back to the model. All dates are relative to CORPUS_NOW.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.fastpath import parse_schedule_request, try_fast_path
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fastpath_corpus.jsonl")
+CORPUS_NOW = datetime(2025, 10, 15, 9, 0)  # a Wednesday
+FIELDS = ("title", "start_date", "end_date", "start_time", "end_time")
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(verbose=False, repeat=200):
+    corpus = load_corpus()
+    correct = handled = wrong_fire = missed = 0
+    positives = sum(1 for c in corpus if c["expect"] is not None)
+
+    for case in corpus:
+        payload = try_fast_path(case["text"], now=CORPUS_NOW, previous_reply=case.get("previous"))
+        fired = payload is not None
+        expect = case["expect"]
+        if fired:
+            handled += 1
+            ok = expect is not None and all(payload[k] == expect[k] for k in FIELDS)
+            wrong_fire += not ok
+        else:
+            ok = expect is None
+            missed += expect is not None
+        correct += ok
+        if verbose and not ok:
+            confidence = parse_schedule_request(case["text"], now=CORPUS_NOW)[1]
+            print(f"MISS {case['text']!r}: got {payload} ({confidence}), expected {expect}")
+
+    timings = []
+    for _ in range(repeat):
+        for case in corpus:
+            t0 = time.perf_counter()
+            parse_schedule_request(case["text"], now=CORPUS_NOW)
+            timings.append(time.perf_counter() - t0)
+    timings.sort()
+
+    print(f"corpus: {len(corpus)} inputs ({positives} fast-path candidates, {len(corpus) - positives} must fall back)")
+    print(f"accuracy: {correct}/{len(corpus)} = {correct / len(corpus):.1%}")
+    print(f"fast path taken: {handled}  wrong payloads: {wrong_fire}  fell back unnecessarily: {missed}")
+    print(f"latency: median {statistics.median(timings) * 1e6:.1f} µs, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1] * 1e6:.1f} µs (vs. a model round-trip of ~1-3 s)")
+
+
+if __name__ == "__main__":
+    run(verbose="-v" in sys.argv)
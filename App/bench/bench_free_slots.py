@@ -0,0 +1,73 @@
+# bench/bench_free_slots.py
+"""
+find_free_slots latency on a dense multi-year calendar.
+
+    python bench/bench_free_slots.py
+
+Same 100k-event / 5-year calendar as bench_event_index. For each query shape it
+reports the per-call time of EventRepository.find_free_slots (what ChatView's
+tool runs: cached window query + sweep) next to the old way of getting the data: a SQL range query for the window.
+The model may call the tool every turn, so it needs to stay well under a frame.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from event_repository import EventRepository
+from utils.free_slots import WEEKDAYS_ONLY
+from bench.bench_event_index import _fill, FIRST_DAY, DAYS, N_EVENTS
+
+REPEATS = 500
+SHAPES = (
+    ("1 day, 30 min", 1, 30),
+    ("1 week, 60 min", 7, 60),
+    ("1 month, 120 min", 30, 120),
+    ("1 year, 60 min", 365, 60),
+)
+
+
+def _per_call_ms(fn, args):
+    t0 = time.perf_counter()
+    total = 0
+    for a in args:
+        total += len(fn(*a))
+    return (time.perf_counter() - t0) / len(args) * 1000, total / len(args)
+
+
+def run():
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CalendarDB(os.path.join(tmp, "bench.db"))
+        db.add_user("bench", "x", "bench@example.com")
+        user_id = db.get_user_id("bench")
+        _fill(db, user_id, N_EVENTS, rng)
+
+        repo = EventRepository(db, user_id)
+        repo.warm()
+
+        print(f"{'query':<18} {'free_slots':>11} {'slots':>7} {'SQL fetch':>11}")
+        for label, days, minutes in SHAPES:
+            args = []
+            for _ in range(REPEATS if days < 365 else 50):
+                start = datetime.combine(FIRST_DAY + timedelta(days=rng.randrange(DAYS - days)), datetime.min.time())
+                args.append((start, start + timedelta(days=days)))
+
+            slots_ms, avg_slots = _per_call_ms(
+                lambda s, e: repo.find_free_slots(s, e, timedelta(minutes=minutes), weekdays=WEEKDAYS_ONLY), args)
+            # Just fetching the window's rows the way the views used to
+            sql_ms, _ = _per_call_ms(
+                lambda s, e: db.get_events_between(user_id, s.date(), (e - timedelta(days=1)).date()), args)
+            print(f"{label:<18} {slots_ms:>9.3f}ms {avg_slots:>7.1f} {sql_ms:>9.3f}ms")
+
+        repo.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
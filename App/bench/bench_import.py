@@ -0,0 +1,104 @@
+# bench/bench_import.py
+"""
+Importing a 100k-event calendar file: streamed, batched import vs one add_event per event.
+
+    python bench/bench_import.py [events]
+
+Writes a synthetic .ics (and .csv) with `events` events, then reports
+  - import_file (streaming parse + executemany batches) for .ics and .csv
+  - re-importing the same file (every row is a duplicate, dedupe on the signature)
+  - add_event per event (the old write path) on a 5k sample, extrapolated
+  - export_file back to .ics (streamed from iter_events)
+and the peak Python memory of streaming the .ics parse (tracemalloc, separate pass).
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from utils.calendar_files import import_file, export_file, iter_ics
+
+N_EVENTS = 100_000
+ADD_EVENT_SAMPLE = 5_000
+FIRST_DAY = date(2021, 1, 1)
+DAYS = 5 * 365
+
+
+def _write_files(path_ics, path_csv, n, rng):
+    with open(path_ics, "w", encoding="utf-8") as ics, open(path_csv, "w", encoding="utf-8") as csv:
+        ics.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//bench//EN\r\n")
+        csv.write("title,description,location,start_date,end_date,start_time,end_time,rrule\n")
+        for i in range(n):
+            day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+            h = rng.randrange(7, 21)
+            ics.write(f"BEGIN:VEVENT\r\nUID:{i}@bench\r\nDTSTART:{day:%Y%m%d}T{h:02d}0000\r\n"
+                      f"DTEND:{day:%Y%m%d}T{h + 1:02d}0000\r\nSUMMARY:Meeting {i}\r\n"
+                      f"DESCRIPTION:Agenda item {i}\\, notes\r\nLOCATION:Room {i % 40}\r\nEND:VEVENT\r\n")
+            csv.write(f"Meeting {i},Agenda item {i},Room {i % 40},{day},{day},{h:02d}:00,{h + 1:02d}:00,\n")
+        ics.write("END:VCALENDAR\r\n")
+
+
+def _fresh_db(tmp, name):
+    db = CalendarDB(os.path.join(tmp, name))
+    db.add_user("bench", "x", "bench@example.com")
+    return db, db.get_user_id("bench")
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def run(n_events: int = N_EVENTS):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path_ics, path_csv = os.path.join(tmp, "cal.ics"), os.path.join(tmp, "cal.csv")
+        _write_files(path_ics, path_csv, n_events, rng)
+        print(f"events: {n_events}   .ics {os.path.getsize(path_ics) / 1e6:.1f} MB")
+
+        tracemalloc.start()
+        with open(path_ics, encoding="utf-8") as fh:
+            parsed = sum(1 for _ in iter_ics(fh))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{'parse .ics (streaming)':<28} {parsed} events, peak {peak / 1e6:.1f} MB")
+
+        db, user_id = _fresh_db(tmp, "ics.db")
+        secs, (inserted, skipped) = _timed(lambda: import_file(db, user_id, path_ics))
+        print(f"{'import .ics':<28} {secs:7.2f}s  {inserted / secs:>9.0f} events/s")
+        secs, (inserted, skipped) = _timed(lambda: import_file(db, user_id, path_ics))
+        print(f"{'re-import .ics (all dupes)':<28} {secs:7.2f}s  inserted {inserted}, skipped {skipped}")
+        path_out = os.path.join(tmp, "out.ics")
+        secs, written = _timed(lambda: export_file(db, user_id, path_out))
+        print(f"{'export .ics':<28} {secs:7.2f}s  {written / secs:>9.0f} events/s")
+        db.close()
+
+        db, user_id = _fresh_db(tmp, "csv.db")
+        secs, (inserted, _) = _timed(lambda: import_file(db, user_id, path_csv))
+        print(f"{'import .csv':<28} {secs:7.2f}s  {inserted / secs:>9.0f} events/s")
+        db.close()
+
+        db, user_id = _fresh_db(tmp, "add_event.db")
+        with open(path_ics, encoding="utf-8") as fh:
+            sample = [e for _, e in zip(range(ADD_EVENT_SAMPLE), iter_ics(fh))]
+
+        def add_each():
+            for e in sample:
+                db.add_event(user_id, e["title"], e["description"], e["start_date"], e["end_date"],
+                             e["start_time"], e["end_time"], location=e["location"])
+        secs, _ = _timed(add_each)
+        rate = len(sample) / secs
+        print(f"{'add_event per event':<28} {secs:7.2f}s  {rate:>9.0f} events/s  "
+              f"(~{n_events / rate:.0f}s for {n_events})")
+        db.close()
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:2]])
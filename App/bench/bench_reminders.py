@@ -0,0 +1,115 @@
+# bench/bench_reminders.py
+"""
+Reminder scheduling with 50k pending reminders.
+
+    python bench/bench_reminders.py
+
+Reports
+  - finding the next deadline: ReminderScheduler (first page, then the heap) vs
+    a poll that asks the table for the earliest reminder every time
+  - re-arming after an event edit (one event's reminders recomputed)
+  - firing: pop_due for a minute's worth of reminders
+  - a bulk change (RESET) that recomputes every reminder
+  - memory held by the scheduler (one page, not the whole table)
+Idle cost is one timer wake-up per deadline (or per MAX_SLEEP_MS), where a
+once-a-second poll wakes 3600 times an hour and runs the query above each time.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.changes import ChangeBus, EventChange, RESET
+from DB.sqlite import CalendarDB
+from reminders import ReminderScheduler, next_alert, _stamp
+
+N_REMINDERS = 50_000
+N_QUERIES = 1_000
+
+
+def _fill(db, user_id, n, rng):
+    """n timed events over the next year, each with a reminder 0-60 minutes before."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for i in range(n):
+        start = today + timedelta(days=rng.randrange(1, 366), hours=rng.randrange(7, 21),
+                                  minutes=rng.choice((0, 15, 30, 45)))
+        rows.append((user_id, f"Meeting {i}", "", start.date().isoformat(), start.date().isoformat(),
+                     start.strftime("%H:%M"), ""))
+    with db.conn_manager.transaction() as cur:
+        cur.executemany("""
+            INSERT INTO events (user_id, title, description, start_date, end_date, start_time, end_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING
+        """, rows)
+        events = db.get_events(user_id)
+        now = datetime.now()
+        reminders = []
+        for e in events:
+            minutes = rng.choice((0, 5, 10, 15, 30, 60))
+            at, day = next_alert(e, None, minutes, now)
+            reminders.append((e.id, user_id, minutes, _stamp(at), day.isoformat()))
+        cur.executemany("""
+            INSERT INTO reminders (event_id, user_id, minutes_before, fire_at, occurrence)
+            VALUES (?, ?, ?, ?, ?)
+        """, reminders)
+    return events
+
+
+def _per_call_us(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def run():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = ChangeBus()
+        db = CalendarDB(os.path.join(tmp, "bench.db"), bus=bus)
+        db.add_user("bench", "x", "bench@example.com")
+        user_id = db.get_user_id("bench")
+        events = _fill(db, user_id, N_REMINDERS, rng)
+        scheduler = ReminderScheduler(db, user_id, bus=bus)
+        print(f"pending reminders: {len(scheduler)}")
+
+        t0 = time.perf_counter()
+        scheduler.next_deadline()
+        first = (time.perf_counter() - t0) * 1e6
+        heap = _per_call_us(lambda i: scheduler.next_deadline(), N_QUERIES)
+        poll = _per_call_us(lambda i: db.conn_manager.execute(
+            "SELECT MIN(fire_at) FROM reminders WHERE user_id=? AND fire_at IS NOT NULL", (user_id,)).fetchone(),
+            N_QUERIES)
+        print(f"next deadline   first page {first:8.1f}us   heap {heap:6.2f}us   table poll {poll:6.1f}us")
+
+        picks = rng.sample(events, 200)
+
+        def edit(i):
+            e = picks[i]
+            moved = e.start_date + timedelta(days=rng.choice((-3, -1, 1, 3)))
+            db.update_event(e.id, e.title, "moved", moved.isoformat(), moved.isoformat(),
+                            e.start_time_text, e.end_time_text)
+            scheduler.next_deadline()
+        print(f"edit + re-arm   {_per_call_us(edit, len(picks)) / 1000:8.2f}ms per edit "
+              f"(update_event included)")
+
+        deadline = scheduler.next_deadline()
+        t0 = time.perf_counter()
+        fired = scheduler.pop_due(deadline + timedelta(minutes=59))
+        print(f"pop_due         {len(fired)} reminders in {(time.perf_counter() - t0) * 1000:.2f}ms")
+
+        t0 = time.perf_counter()
+        bus.publish(EventChange(RESET, user_id=user_id))
+        scheduler.next_deadline()
+        print(f"bulk reset      {(time.perf_counter() - t0) * 1000:8.0f}ms to recompute {len(scheduler)} reminders")
+        print(scheduler.stats())
+        scheduler.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,65 @@
+# bench/bench_search.py
+"""
+Event search over a 100k-event calendar: FTS5 index vs LIKE vs Python substring scan.
+
+    python bench/bench_search.py
+
+Reports per-query latency for
+  - CalendarDB.search (FTS5 MATCH, bm25 ranking, snippets, top 50)
+  - CalendarDB.search_event_ids (FTS5, every match, what TaskView uses)
+  - the LIKE fallback
+  - the old in-Python `q in title + description + location` scan
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from bench.bench_event_index import _fill
+
+N_EVENTS = 100_000
+QUERIES = ["meet", "meeting 12", "trip", "trip 99", "9999", "nothing-here"]
+
+
+def _time_per_query(fn, repeat=20):
+    t0 = time.perf_counter()
+    hits = 0
+    for _ in range(repeat):
+        for q in QUERIES:
+            hits = len(fn(q))
+    return (time.perf_counter() - t0) / (repeat * len(QUERIES)) * 1000, hits
+
+
+def run():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CalendarDB(os.path.join(tmp, "bench.db"))
+        db.add_user("bench", "x", "bench@example.com")
+        user_id = db.get_user_id("bench")
+        _fill(db, user_id, N_EVENTS, rng)
+        events = db.get_events_between(user_id)
+        print(f"events: {len(events)}   FTS5 available: {db.has_full_text_search()}")
+
+        def scan(q):
+            q = q.lower()
+            return [e for e in events if q in f"{e.title.lower()} {e.description.lower()} {e.location.lower()}"]
+
+        rows = [
+            ("FTS5 search (top 50)", lambda q: db.search(q, user_id)),
+            ("FTS5 ids (all hits)", lambda q: db.search_event_ids(q, user_id)),
+            ("LIKE fallback", lambda q: db._search_events_like(q, user_id, 50)),
+            ("Python scan", scan),
+        ]
+        print(f"{'method':<24} {'per query':>12}")
+        for name, fn in rows:
+            ms, _ = _time_per_query(fn, repeat=3 if name == "Python scan" else 20)
+            print(f"{name:<24} {ms:>10.2f}ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
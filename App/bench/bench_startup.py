@@ -0,0 +1,93 @@
+# bench/bench_startup.py
+"""
+Startup cost: module import time and time to the first painted main window.
+
+    python bench/bench_startup.py [events] [runs]
+
+Every measurement runs in a fresh interpreter (imports are cached per process).
+Reports
+  - cold import time of ai_call, llm_client, MainWindow, and of the openai SDK on
+    its own (what ai_call used to pay at import time)
+  - time to first window: QApplication + MainWindow shown and painted, against a
+    database holding `events` events, with the views built lazily (current) and
+    with every view built up front (the old MainWindow behaviour)
+
+The window timings need PyQt6 and run with QT_QPA_PLATFORM=offscreen.
+"""
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from DB.sqlite import CalendarDB
+from bench.bench_event_index import _fill
+
+IMPORTS = ["llm_client", "ai_call", "MainWindow", "openai"]
+
+_IMPORT_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+import {module}
+print((time.perf_counter() - t0) * 1000)
+"""
+
+_WINDOW_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+import PyQt6.QtWidgets as qtw
+from DB.sqlite import get_db
+from MainWindow import MainWindow
+app = qtw.QApplication(sys.argv)
+db = get_db()
+user_id = db.get_user_id("bench")
+window = MainWindow(userid=user_id, db=db)
+if {eager}:
+    for i in range(len(window._views)):
+        window.show_view(i)
+    window.show_view(0)
+window.show()
+app.processEvents()
+window.grab()   # force a full paint
+print((time.perf_counter() - t0) * 1000)
+"""
+
+
+def _run(snippet, env=None, runs=5):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", snippet], cwd=APP_DIR, env=env,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            return None, out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed"
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(times), None
+
+
+def run(n_events: int = 20_000, runs: int = 5):
+    print(f"{'import':<24} {'median':>10}")
+    for module in IMPORTS:
+        ms, err = _run(_IMPORT_SNIPPET.format(module=module), runs=runs)
+        print(f"{module:<24} " + (f"{ms:>8.1f}ms" if err is None else f"  skipped ({err})"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = CalendarDB(path)
+        db.add_user("bench", "x", "bench@example.com")
+        _fill(db, db.get_user_id("bench"), n_events, random.Random(7))
+        db.close()
+
+        env = dict(os.environ, CALENDAI_DB_PATH=path, QT_QPA_PLATFORM="offscreen")
+        print(f"\ntime to first window ({n_events} events)")
+        for name, eager in (("lazy views", False), ("all views up front", True)):
+            ms, err = _run(_WINDOW_SNIPPET.format(eager=eager), env=env, runs=runs)
+            print(f"{name:<24} " + (f"{ms:>8.1f}ms" if err is None else f"  skipped ({err})"))
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
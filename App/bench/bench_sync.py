@@ -0,0 +1,82 @@
+# bench/bench_sync.py
+"""
+Incremental sync cost vs calendar size: it should track the number of changes,
+not the number of events.
+
+    python bench/bench_sync.py [--http]
+
+For calendars of 1k, 10k and 100k events, reports
+  - the initial sync (everything is new: O(calendar), paid once)
+  - a no-op sync right after it
+  - an incremental sync after 50 local edits, 50 remote edits and 10 edits made
+    on both sides (conflicts, resolved in one batch)
+against the in-process stand-in provider, or the HTTP stand-in with --http.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from bench.bench_event_index import _fill
+from sync.engine import SyncEngine
+from sync.standin import LocalCalendarStore, MemoryProvider, StandInServer, HttpProvider
+
+SIZES = (1_000, 10_000, 100_000)
+LOCAL_EDITS, REMOTE_EDITS, BOTH_EDITS = 50, 50, 10
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def _edit_both_sides(db, user_id, store, rng):
+    rows = db.conn_manager.execute(
+        "SELECT event_id, remote_id FROM sync_links WHERE user_id=?", (user_id,)).fetchall()
+    picks = rng.sample(rows, LOCAL_EDITS + REMOTE_EDITS + BOTH_EDITS)
+    local = picks[:LOCAL_EDITS] + picks[LOCAL_EDITS + REMOTE_EDITS:]
+    remote = picks[LOCAL_EDITS:]
+    for event_id, _ in local:
+        e = db.get_event(event_id)
+        db.update_event(event_id, e.title, "edited here", e.start_date.isoformat(), e.end_date.isoformat(),
+                        e.start_time_text, e.end_time_text)
+    for _, remote_id in remote:
+        store.update(remote_id, description="edited remotely")
+
+
+def run(use_http: bool = False):
+    rng = random.Random(7)
+    print(f"{'events':>8} {'initial':>10} {'no-op':>9} {'incremental':>12}   report")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CalendarDB(os.path.join(tmp, "bench.db"))
+            db.add_user("bench", "x", "bench@example.com")
+            user_id = db.get_user_id("bench")
+            _fill(db, user_id, size, rng)
+
+            store = LocalCalendarStore()
+            server = StandInServer(store).start() if use_http else None
+            provider = HttpProvider(server.base_url) if use_http else MemoryProvider(store)
+            engine = SyncEngine(db, provider, user_id)
+
+            initial, _ = _timed(engine.sync)
+            engine.sync()   # drains the echoes of the initial push
+            noop, _ = _timed(engine.sync)
+            _edit_both_sides(db, user_id, store, rng)
+            incremental, report = _timed(engine.sync)
+            print(f"{len(store):>8} {initial:>8.0f}ms {noop:>7.1f}ms {incremental:>10.1f}ms   "
+                  f"pushed={report.pushed} applied={report.applied} conflicts={report.conflicts}")
+
+            provider.close()
+            if server is not None:
+                server.stop()
+            db.close()
+
+
+if __name__ == "__main__":
+    run(use_http="--http" in sys.argv[1:])
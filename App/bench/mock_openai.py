@@ -0,0 +1,83 @@
+# bench/mock_openai.py
+"""
+Minimal local stand-in for the OpenAI chat completions endpoint.
+
+    server = MockOpenAIServer(); server.start()
+    set_client(None, ClientConfig(base_url=server.base_url))
+    ...
+    server.stop()
+
+Speaks HTTP/1.1 with keep-alive, so connection reuse is measurable.
+`latency` adds a fixed server-side delay per request.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def completion_payload(content="Sure!", tool_call=None) -> dict:
+    message = {"role": "assistant", "content": content}
+    if tool_call is not None:
+        message["content"] = None
+        message["tool_calls"] = [{
+            "id": "call_1",
+            "type": "function",
+            "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["arguments"])},
+        }]
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps(self.server.payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockOpenAIServer:
+    def __init__(self, payload: dict | None = None, latency: float = 0.0, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.payload = payload or completion_payload()
+        self.httpd.latency = latency
+        self.httpd.requests = 0
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
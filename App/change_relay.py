@@ -0,0 +1,29 @@
+import PyQt6.QtCore as qtc
+
+from DB.changes import event_bus
+
+
+class ChangeRelay(qtc.QObject):
+    """
+    Re-emits DB.changes notifications as a Qt signal. Writes can happen on worker
+    threads; connected widget slots still run on the UI thread (queued connection).
+    """
+    changed = qtc.pyqtSignal(object)   # EventChange
+
+    def __init__(self, bus=event_bus, parent=None):
+        super().__init__(parent)
+        self._unsubscribe = bus.subscribe(self.changed.emit)
+
+    def detach(self):
+        self._unsubscribe()
+
+
+_relay = None
+
+
+def get_relay() -> ChangeRelay:
+    """The shared relay for the default bus; create it on the UI thread."""
+    global _relay
+    if _relay is None:
+        _relay = ChangeRelay()
+    return _relay
@@ -0,0 +1,159 @@
+# context_builder.py
+"""
+Token-budgeted history for the model prompt.
+
+Only the most recent turns that fit the budget are sent verbatim; everything
+older is folded into a rolling summary stored in `conversation_summaries`.
+The summary is updated incrementally: each build only folds the messages
+between the last summarized id and the oldest turn still sent verbatim.
+"""
+import os
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency: fall back to a ~4 chars/token estimate
+    tiktoken = None
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CALENDAI_CONTEXT_TOKENS", 3000))
+DEFAULT_SUMMARY_TOKENS = int(os.getenv("CALENDAI_SUMMARY_TOKENS", 400))
+MESSAGE_OVERHEAD_TOKENS = 4  # role + separators per chat message
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is None:
+        return max(1, len(text) // 4)
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o
+        except ValueError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def _include_in_summary(m) -> bool:
+    # Same rules as ChatView._sanitized_history: handled requests and empty turns are dropped
+    if m.role == "user" and m.handled == 1:
+        return False
+    text = (m.content or "").strip()
+    return bool(text) and text != "[no text content]"
+
+
+def summarize_turns(previous: str, messages: list, max_tokens: int) -> str:
+    """
+    Default summarizer: one short line per turn, keeping the newest lines that fit
+    `max_tokens`. Local and instant; swap in an LLM-backed callable with the same
+    signature for abstractive summaries.
+    """
+    new_lines = []
+    for m in messages:
+        if not _include_in_summary(m):
+            continue
+        text = " ".join(m.content.split())
+        if len(text) > 160:
+            text = text[:157] + "..."
+        who = "User" if m.role == "user" else "Assistant"
+        new_lines.append(f"- {who}: {text}")
+
+    # Walk newest -> oldest and stop as soon as the budget is full
+    kept, used = [], 0
+    previous_lines = previous.splitlines() if previous else []
+    for line in _reversed_chain(new_lines, previous_lines):
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return "\n".join(kept)
+
+
+def _reversed_chain(newer: list, older: list):
+    yield from reversed(newer)
+    yield from reversed(older)
+
+
+class ContextBuilder:
+    """Builds the history part of the prompt for one conversation."""
+
+    def __init__(self, db, conversation_id: int, budget_tokens: int = DEFAULT_TOKEN_BUDGET,
+                 summary_tokens: int = DEFAULT_SUMMARY_TOKENS, summarizer=summarize_turns, batch_size: int = 500):
+        self.db = db
+        self.conversation_id = conversation_id
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.batch_size = batch_size
+        self._summary = None   # loaded lazily from the DB
+        self._covered_upto_id = 0
+        self.last_stats: dict = {}
+
+    def build(self, history: list[dict]) -> list[dict]:
+        """
+        history: sanitized turns, oldest first, as {"role", "content", "id"} dicts
+        (id may be None for turns not saved yet). Returns API-ready messages.
+        """
+        self._load_summary()
+
+        # Newest turns that fit whatever the summary doesn't use; the latest turn is always kept
+        budget = self.budget_tokens - self.summary_tokens
+        kept, used = [], 0
+        for m in reversed(history):
+            if m.get("id") is not None and m["id"] <= self._covered_upto_id:
+                break  # already folded into the summary
+            cost = message_tokens(m)
+            if kept and used + cost > budget:
+                break
+            kept.append(m)
+            used += cost
+        kept.reverse()
+
+        first_kept_id = next((m["id"] for m in kept if m.get("id") is not None), None)
+        folded = self._fold_until(first_kept_id)
+
+        messages = []
+        if self._summary:
+            messages.append({
+                "role": "system",
+                "content": "Summary of the earlier conversation (context only, do not act on it):\n" + self._summary,
+            })
+        messages += [{"role": m["role"], "content": m["content"]} for m in kept]
+
+        self.last_stats = {
+            "prompt_tokens": sum(message_tokens(m) for m in messages),
+            "verbatim_turns": len(kept),
+            "folded_now": folded,
+            "summary_tokens": count_tokens(self._summary),
+        }
+        return messages
+
+    def _load_summary(self):
+        if self._summary is None:
+            self._summary, self._covered_upto_id = self.db.get_summary(self.conversation_id)
+
+    def _fold_until(self, before_id: int | None) -> int:
+        """Fold every stored message with covered_upto_id < id < before_id into the summary."""
+        if before_id is None:
+            return 0
+        folded = 0
+        while True:
+            batch = self.db.get_messages_after(self.conversation_id, self._covered_upto_id,
+                                               before_id, limit=self.batch_size)
+            if not batch:
+                break
+            self._summary = self.summarizer(self._summary, batch, self.summary_tokens)
+            self._covered_upto_id = batch[-1].id
+            folded += len(batch)
+            if len(batch) < self.batch_size:
+                break
+        if folded:
+            self.db.save_summary(self.conversation_id, self._summary, self._covered_upto_id)
+        return folded
@@ -0,0 +1,39 @@
+# event_index.py
+"""
+[start, end) datetime spans for events, for overlap and free-time queries.
+
+EventRepository answers clash warnings and the find_free_slots tool from its
+cached date windows; event_interval() narrows each event in such a window to the
+datetimes it actually blocks (all-day events cover whole days, a start without
+an end lasts DEFAULT_DURATION, an end at or before the start runs past midnight).
+"""
+from datetime import datetime, time, timedelta
+
+from DB.records import parse_date, parse_time
+
+DEFAULT_DURATION = timedelta(hours=1)   # start time without an end time
+
+
+def event_interval(start_date, end_date=None, start_time=None, end_time=None) -> tuple[datetime, datetime] | None:
+    """
+    [start, end) datetimes for an event (or a suggestion payload's fields).
+    No start time = all day; an end time at/before the start on the same day runs
+    past midnight. Returns None if the start date is unusable.
+    """
+    sd = parse_date(start_date)
+    if sd is None:
+        return None
+    ed = parse_date(end_date) or sd
+    if ed < sd:
+        ed = sd
+    st, et = parse_time(start_time), parse_time(end_time)
+
+    if st is None:
+        return datetime.combine(sd, time()), datetime.combine(ed + timedelta(days=1), time())
+    start = datetime.combine(sd, st)
+    if et is None:
+        return start, max(start + DEFAULT_DURATION, datetime.combine(ed, time()))
+    end = datetime.combine(ed, et)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
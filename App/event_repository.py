@@ -0,0 +1,283 @@
+# event_repository.py
+"""
+One in-memory copy of a user's calendar, shared by every view.
+
+MainWindow owns a single EventRepository and hands it to ChatView, CalendarView
+and TaskView, so the events are read from SQLite once per session instead of
+once per view. Single events live in an IntervalTree keyed on their
+[start_date, end_date + 1) date span; recurring series stay in a RecurrenceSet
+and are expanded only for the window asked for.
+
+Range/day results and search hits are memoized. The repository listens to the
+change bus (DB/changes.py) directly, so it is patched on the writing thread
+before the Qt relay delivers the same change to the views; each change drops
+only the cached windows its old/new dates fall in (a series change drops all of
+them, since occurrences can land anywhere). stats() reports what is cached and
+how often the caches hit.
+
+Clash warnings and the find_free_slots tool are answered from the same tree:
+the events in the covering days are narrowed to [start, end) datetimes with
+event_index.event_interval (memoized per event until it changes), so no second
+copy of the calendar is kept.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from DB.changes import RESET
+from DB.records import Event
+from DB.sqlite import RECURRENCE_HORIZON_DAYS
+from DB.search import search_terms
+from event_index import event_interval
+from utils.free_slots import find_free_slots, DEFAULT_WORKING_HOURS
+from utils.intervals import IntervalTree
+from utils.recurrence import RecurrenceSet, occurrence_sort_key
+
+ONE_DAY = timedelta(days=1)
+WINDOW_CACHE_SIZE = 256   # range/day results kept
+SEARCH_CACHE_SIZE = 64    # search queries kept
+
+
+def _span(e: Event) -> tuple[date, date]:
+    """Half-open [start, end) for the tree; end dates are inclusive in the DB."""
+    return e.start_date, max(e.end_date, e.start_date) + ONE_DAY
+
+
+class _LRU:
+    """A small OrderedDict LRU that counts its hits and misses."""
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EventRepository:
+    """
+    Cached event queries for one user (user_id None = all users).
+    Safe to query from any thread; changes may arrive on whichever thread wrote them.
+    """
+
+    def __init__(self, db, user_id=None, bus=None):
+        self.db = db
+        self.user_id = user_id
+        self._tree = None            # single events; loaded on first query
+        self._recurring = RecurrenceSet(db, user_id)
+        self._windows = _LRU(WINDOW_CACHE_SIZE)   # (start, end, occurrences, day) -> [Event]
+        self._searches = _LRU(SEARCH_CACHE_SIZE)  # normalized query -> {event id}
+        self._intervals = {}         # single event id -> [start, end) datetimes, filled by _spans
+        self._search_generation = 0   # bumped whenever cached searches are dropped
+        self._lock = threading.RLock()
+        self._unsubscribe = (bus or db.bus).subscribe(self._on_change)
+
+    def close(self):
+        self._unsubscribe()
+
+    def warm(self, worker=None):
+        """Load now (e.g. on a pool thread) instead of on the first query."""
+        self._ensure_loaded()
+
+    def _ensure_loaded(self) -> IntervalTree:
+        with self._lock:
+            if self._tree is None:
+                rows = self.db.get_events_between(self.user_id)
+                items = sorted((_span(e) + (e.id, e) for e in rows if e.start_date is not None),
+                               key=lambda t: (t[0], t[2]))
+                self._recurring.load()
+                self._tree = IntervalTree.build(items)
+            return self._tree
+
+    # ---- queries -------------------------------------------------------------
+
+    def events_between(self, start: date | None = None, end: date | None = None,
+                       occurrences: bool = True) -> list[Event]:
+        """
+        Single events (and, unless occurrences=False, recurring occurrences)
+        overlapping [start, end], in start order. None = open-ended; series are
+        then expanded at most RECURRENCE_HORIZON_DAYS either side of today.
+        """
+        # Open windows expand series around today, so they are only valid for today
+        key = (start, end, occurrences, date.today() if start is None or end is None else None)
+        with self._lock:
+            cached = self._windows.get(key)
+            if cached is not None:
+                return list(cached)
+            tree = self._ensure_loaded()
+            events = tree.overlap(start or date.min, end + ONE_DAY if end else date.max)
+            if occurrences and len(self._recurring):
+                today = date.today()
+                horizon = timedelta(days=RECURRENCE_HORIZON_DAYS)
+                events += self._recurring.occurrences(start or today - horizon, end or today + horizon)
+            events.sort(key=occurrence_sort_key)   # the tree orders by date and id only
+            self._windows.put(key, events)
+            return list(events)
+
+    def events_on(self, day: date) -> list[Event]:
+        """Events and occurrences covering `day`, in start date/time order."""
+        return self.events_between(day, day)
+
+    def agenda(self, start: date, end: date | None = None, limit: int | None = None) -> list[Event]:
+        """Like CalendarDB.get_agenda, served from memory."""
+        end = end or start + timedelta(days=RECURRENCE_HORIZON_DAYS)
+        events = self.events_between(start, end)
+        return events[:limit] if limit is not None else events
+
+    # ---- time-of-day queries --------------------------------------------------
+
+    def _spans(self, start: datetime, end: datetime) -> list[tuple[datetime, datetime, Event]]:
+        """(start, end, event) for events and occurrences overlapping [start, end), by start."""
+        # An event from the day before can run past midnight into the window
+        first, last = start.date() - ONE_DAY, (end - timedelta(microseconds=1)).date()
+        spans = []
+        with self._lock:
+            intervals = self._intervals
+            for e in self._ensure_loaded().overlap(first, last + ONE_DAY):
+                span = intervals.get(e.id)
+                if span is None:
+                    span = intervals[e.id] = event_interval(e.start_date, e.end_date, e.start_time, e.end_time)
+                if span is not None and span[0] < end and span[1] > start:
+                    spans.append((span[0], span[1], e))
+            occurrences = self._recurring.occurrences(first, last) if len(self._recurring) else ()
+        for e in occurrences:
+            span = event_interval(e.start_date, e.end_date, e.start_time, e.end_time)
+            if span is not None and span[0] < end and span[1] > start:
+                spans.append((span[0], span[1], e))
+        spans.sort(key=lambda t: t[0])
+        return spans
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Event]:
+        """Events overlapping [start, end), ordered by start."""
+        return [e for _s, _t, e in self._spans(start, end)]
+
+    def conflicts(self, start_date, end_date=None, start_time=None, end_time=None,
+                  ignore_id=None, include_all_day: bool = True) -> list[Event]:
+        """
+        Existing events that clash with a proposed event. `ignore_id` skips the
+        event being edited; all-day events can be left out since they rarely block time.
+        """
+        span = event_interval(start_date, end_date, start_time, end_time)
+        if span is None:
+            return []
+        return [e for e in self.overlapping(*span)
+                if e.id != ignore_id and (include_all_day or e.start_time is not None)]
+
+    def conflicts_for(self, payload: dict, **kwargs) -> list[Event]:
+        """conflicts() for a create_calendar_event payload."""
+        return self.conflicts(payload.get("start_date"), payload.get("end_date"),
+                              payload.get("start_time"), payload.get("end_time"), **kwargs)
+
+    def find_free_slots(self, start: datetime, end: datetime, duration: timedelta,
+                        working_hours=DEFAULT_WORKING_HOURS, weekdays=None, limit: int | None = None,
+                        include_all_day: bool = False, align_minutes: int | None = 15):
+        """
+        Free gaps of at least `duration` within working hours of [start, end), earliest
+        first. All-day events (birthdays, reminders) don't block time unless asked to.
+        """
+        busy = [(s, t) for s, t, e in self._spans(start, end) if include_all_day or e.start_time is not None]
+        return find_free_slots(busy, start, end, duration, working_hours=working_hours,
+                               weekdays=weekdays, limit=limit, align_minutes=align_minutes)
+
+    def search_ids(self, query: str) -> set[int]:
+        """Ids of the events matching `query` (CalendarDB.search_event_ids), cached per query."""
+        key = " ".join(search_terms(query)).casefold()
+        if not key:
+            return set()
+        with self._lock:
+            cached = self._searches.get(key)
+            if cached is not None:
+                return cached
+            generation = self._search_generation
+        ids = self.db.search_event_ids(query, self.user_id)
+        with self._lock:
+            # Don't keep a result a concurrent write has already made stale
+            if generation == self._search_generation:
+                self._searches.put(key, ids)
+        return ids
+
+    def __len__(self):
+        """Single events plus recurring series (each series counts once)."""
+        with self._lock:
+            return len(self._ensure_loaded()) + len(self._recurring)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._tree is not None,
+                "events": len(self._tree) if self._tree is not None else 0,
+                "series": len(self._recurring),
+                "cached_windows": len(self._windows.items),
+                "cached_searches": len(self._searches.items),
+                "window_hit_rate": self._windows.hit_rate(),
+                "search_hit_rate": self._searches.hit_rate(),
+                "window_hits": self._windows.hits,
+                "window_misses": self._windows.misses,
+                "search_hits": self._searches.hits,
+                "search_misses": self._searches.misses,
+            }
+
+    # ---- invalidation --------------------------------------------------------
+
+    def invalidate(self):
+        """Forget everything; the next query reloads from the DB."""
+        with self._lock:
+            self._tree = None
+            self._intervals.clear()
+            self._windows.items.clear()
+            self._drop_searches()
+
+    def _on_change(self, change):
+        if change.kind != RESET and self.user_id is not None and change.user_id != self.user_id:
+            return
+        with self._lock:
+            if change.kind == RESET:
+                self.invalidate()
+                return
+            # Text may have changed either way; searches are cheap to redo
+            self._drop_searches()
+            if self._tree is None:
+                return   # nothing loaded yet; the first query reads the current table
+            if self._recurring.apply_change(change):
+                self._windows.items.clear()
+            touched = []
+            if change.old is not None:
+                self._tree.remove(change.old.id)
+                self._intervals.pop(change.old.id, None)
+                touched.append(change.old)
+            e = change.event
+            if e is not None and e.start_date is not None and not e.is_recurring:
+                self._tree.insert(*_span(e), e.id, e)
+                touched.append(e)
+            for t in touched:
+                if t.start_date is not None:
+                    self._drop_windows(t.start_date, max(t.end_date, t.start_date))
+
+    def _drop_searches(self):
+        self._searches.items.clear()
+        self._search_generation += 1
+
+    def _drop_windows(self, first: date, last: date):
+        """Drop cached windows that overlap [first, last]."""
+        stale = [key for key in self._windows.items
+                 if (key[0] is None or key[0] <= last) and (key[1] is None or key[1] >= first)]
+        for key in stale:
+            del self._windows.items[key]
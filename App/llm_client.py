@@ -0,0 +1,162 @@
+# llm_client.py
+"""
+One shared OpenAI client (and therefore one HTTP keep-alive pool) for the whole app.
+
+Building OpenAI(...) per chat turn throws away the TLS session and pooled
+connections every time; get_client() builds it once and reuses it.
+
+Configuration (environment / .env):
+    OPENAI_API_KEY       required unless OPENAI_BASE_URL points at a local stand-in
+    OPENAI_BASE_URL      override the API endpoint (e.g. a local mock server in tests)
+    OPENAI_TIMEOUT       total request timeout in seconds (default 60)
+    OPENAI_CONNECT_TIMEOUT  connect timeout in seconds (default 5)
+    OPENAI_POOL_SIZE     max pooled connections (default 10)
+    OPENAI_MAX_RETRIES   retries on transient errors (default 3)
+    OPENAI_BACKOFF_BASE  first retry delay in seconds, doubled each attempt (default 0.5)
+    OPENAI_BACKOFF_MAX   cap for a single retry delay in seconds (default 8)
+
+The openai SDK (and httpx) are imported on first use, not at import time: they
+are the slowest imports in the app and nothing needs them before the first turn.
+"""
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+load_dotenv()
+
+_retryable_errors: tuple | None = None
+
+
+def retryable_errors() -> tuple:
+    """Transient API errors worth retrying (imports the SDK on first call)."""
+    global _retryable_errors
+    if _retryable_errors is None:
+        from openai import APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+        _retryable_errors = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+    return _retryable_errors
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class ClientConfig:
+    """Connection, timeout and retry settings for the shared client."""
+
+    def __init__(self, api_key=None, base_url=None, timeout=60.0, connect_timeout=5.0,
+                 pool_size=10, keepalive_expiry=60.0, max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self.keepalive_expiry = keepalive_expiry
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_env(cls) -> "ClientConfig":
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=_env_float("OPENAI_TIMEOUT", 60.0),
+            connect_timeout=_env_float("OPENAI_CONNECT_TIMEOUT", 5.0),
+            pool_size=int(_env_float("OPENAI_POOL_SIZE", 10)),
+            max_retries=int(_env_float("OPENAI_MAX_RETRIES", 3)),
+            backoff_base=_env_float("OPENAI_BACKOFF_BASE", 0.5),
+            backoff_max=_env_float("OPENAI_BACKOFF_MAX", 8.0),
+        )
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def build_client(config: ClientConfig) -> "OpenAI":
+    import httpx
+    from openai import OpenAI
+
+    api_key = config.api_key
+    if not api_key:
+        if not config.base_url:
+            raise ValueError("API key is not set.")
+        api_key = "local-test-key"  # local stand-in servers don't check it
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.pool_size,
+            max_keepalive_connections=config.pool_size,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout),
+    )
+    # Retries are handled by call_with_retry so the policy is ours, not the SDK's
+    return OpenAI(api_key=api_key, base_url=config.base_url, http_client=http_client, max_retries=0)
+
+
+_lock = threading.Lock()
+_config: ClientConfig | None = None
+_client: "OpenAI | None" = None
+
+
+def get_config() -> ClientConfig:
+    global _config
+    with _lock:
+        if _config is None:
+            _config = ClientConfig.from_env()
+        return _config
+
+
+def get_client() -> "OpenAI":
+    """The process-wide client, built on first use."""
+    global _client
+    config = get_config()
+    with _lock:
+        if _client is None:
+            _client = build_client(config)
+        return _client
+
+
+def set_client(client: "OpenAI | None", config: ClientConfig | None = None):
+    """Inject a client (e.g. pointed at a mock server), or pass None to rebuild lazily."""
+    global _client, _config
+    with _lock:
+        old = _client
+        _client = client
+        if config is not None:
+            _config = config
+    if old is not None and old is not client:
+        old.close()
+
+
+def configure(config: ClientConfig):
+    """Replace the settings; the next get_client() builds a fresh client with them."""
+    set_client(None, config)
+
+
+def call_with_retry(fn, *args, **kwargs):
+    """Call fn, retrying transient API errors with exponential backoff + jitter."""
+    config = get_config()
+    errors = retryable_errors()
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except errors as e:
+            if attempt >= config.max_retries:
+                raise
+            delay = config.backoff_delay(attempt)
+            print(f"DEBUG: {type(e).__name__}, retrying in {delay:.2f}s ({attempt + 1}/{config.max_retries})")
+            time.sleep(delay)
+            attempt += 1
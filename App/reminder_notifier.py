@@ -0,0 +1,47 @@
+import PyQt6.QtCore as qtc
+from datetime import datetime
+
+from reminders import ReminderScheduler
+
+# Sleep at most this long, so a changed system clock or a suspend is noticed
+MAX_SLEEP_MS = 15 * 60 * 1000
+
+
+class ReminderNotifier(qtc.QObject):
+    """
+    Fires reminders on time without polling. One single-shot QTimer is armed
+    for the scheduler's next deadline. Its `due` signal carries the reminders
+    that fired, as a list of reminders.Reminder. Event changes re-arm the timer
+    through a queued signal, because they can arrive on any thread.
+    """
+    due = qtc.pyqtSignal(list)
+    _rearm = qtc.pyqtSignal()
+
+    def __init__(self, db, user_id, bus=None, parent=None):
+        super().__init__(parent)
+        self._timer = qtc.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(qtc.Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._fire)
+        self._rearm.connect(self.arm, qtc.Qt.ConnectionType.QueuedConnection)
+        self.scheduler = ReminderScheduler(db, user_id, bus=bus, on_reschedule=self._rearm.emit)
+        self.arm()
+
+    def arm(self):
+        """(Re)start the timer for the earliest pending reminder."""
+        deadline = self.scheduler.next_deadline()
+        if deadline is None:
+            self._timer.stop()
+            return
+        ms = (deadline - datetime.now()).total_seconds() * 1000
+        self._timer.start(int(min(max(ms, 0), MAX_SLEEP_MS)))
+
+    def _fire(self):
+        reminders = self.scheduler.pop_due()
+        if reminders:
+            self.due.emit(reminders)
+        self.arm()
+
+    def close(self):
+        self._timer.stop()
+        self.scheduler.close()
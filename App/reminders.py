@@ -0,0 +1,380 @@
+# reminders.py
+"""
+Reminders: an alert some minutes before an event (before every occurrence, for
+a recurring series).
+
+Each row of the `reminders` table keeps its next alert time in `fire_at`, so
+"what fires next" is a range scan on idx_reminders_due rather than a walk over
+the calendar. ReminderScheduler holds only the front of that range in a
+min-heap: it reads PAGE_SIZE rows at a time in (fire_at, id) order and reads the
+next page only when the heap runs dry, so tens of thousands of pending
+reminders cost one page of memory.
+
+Event writes arrive on the change bus (DB/changes.py). Only the reminders of
+the changed event are recomputed and their heap entries replaced; superseded
+entries are skipped when they surface. Nothing polls. The owner asks for
+next_deadline(), sleeps until then and calls pop_due().
+reminder_notifier.ReminderNotifier does this with one QTimer.
+"""
+import heapq
+import threading
+from datetime import date, datetime, time, timedelta
+
+from DB.changes import RESET, DELETE
+from DB.records import Event, EVENT_SELECT, parse_date
+from utils.recurrence import expand, last_occurrence
+
+DEFAULT_MINUTES_BEFORE = 15
+PAGE_SIZE = 256                      # reminders read into the heap at a time
+ALL_DAY_ALERT_TIME = time(9, 0)      # all-day events alert relative to this time of day
+LATE_GRACE = timedelta(minutes=60)   # alerts missed by more than this (app closed) are skipped
+MAX_LOOKAHEAD_DAYS = 4 * 366 + 1     # a yearly Feb 29 series fires once in four years
+
+REMINDER_COLUMNS = ("id", "event_id", "user_id", "minutes_before", "fire_at", "occurrence")
+REMINDER_SELECT = "SELECT " + ", ".join(REMINDER_COLUMNS)
+
+
+def _stamp(at: datetime) -> str:
+    return at.isoformat(timespec="minutes")
+
+
+class Reminder:
+    """One row of the reminders table. `event` is set on reminders returned by pop_due()."""
+    __slots__ = REMINDER_COLUMNS + ("event",)
+
+    def __init__(self, id=None, event_id=None, user_id=None, minutes_before=DEFAULT_MINUTES_BEFORE,
+                 fire_at=None, occurrence=None, event=None):
+        self.id = id
+        self.event_id = event_id
+        self.user_id = user_id
+        self.minutes_before = minutes_before
+        self.fire_at = datetime.fromisoformat(fire_at) if isinstance(fire_at, str) else fire_at
+        self.occurrence = parse_date(occurrence)
+        self.event = event
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        return cls(*row)
+
+    @property
+    def starts_at(self) -> datetime | None:
+        """Start of the occurrence this reminder is for (all-day: ALL_DAY_ALERT_TIME)."""
+        if self.fire_at is None:
+            return None
+        return self.fire_at + timedelta(minutes=self.minutes_before)
+
+    def text(self) -> str:
+        """'Dentist at 14:00' / 'Dentist tomorrow at 09:30' / 'Birthday today'."""
+        title = self.event.display_title if self.event is not None else f"Event {self.event_id}"
+        day = self.occurrence
+        if day is None:
+            return title
+        delta = (day - self.fire_at.date()).days if self.fire_at else 0
+        when = {0: "today", 1: "tomorrow"}.get(delta, day.strftime("%a %d %b"))
+        if self.event is not None and self.event.start_time is None:
+            return f"{title} {when}"
+        start = self.starts_at.strftime("%H:%M")
+        return f"{title} at {start}" if delta == 0 else f"{title} {when} at {start}"
+
+    def __repr__(self):
+        return f"Reminder(id={self.id!r}, event_id={self.event_id!r}, fire_at={self.fire_at}, " \
+               f"minutes_before={self.minutes_before!r})"
+
+
+def _alert_at(occurrence: Event, lead: timedelta) -> datetime:
+    return datetime.combine(occurrence.start_date, occurrence.start_time or ALL_DAY_ALERT_TIME) - lead
+
+
+def next_alert(event: Event, exceptions: dict | None, minutes_before: int,
+               after: datetime) -> tuple[datetime, date] | None:
+    """
+    (alert time, occurrence start date) of the first alert strictly after `after`,
+    or None if the event has no such alert left. Series are expanded in growing
+    windows, so a daily rule looks at a week and a yearly one at a few years.
+    """
+    if event is None or event.start_date is None:
+        return None
+    lead = timedelta(minutes=minutes_before)
+    if not event.is_recurring:
+        at = _alert_at(event, lead)
+        return (at, event.start_date) if at > after else None
+
+    # An occurrence starting before this day alerts before `after`
+    first = (after + lead).date()
+    try:
+        last = last_occurrence(event.rrule, event.start_date)
+    except ValueError:
+        return None
+    moved = [ex.start_date for ex in (exceptions or {}).values() if not ex.cancelled and ex.start_date]
+    if last is not None:
+        last = max([last] + moved)
+    limit = first + timedelta(days=MAX_LOOKAHEAD_DAYS) if last is None else min(
+        last, first + timedelta(days=MAX_LOOKAHEAD_DAYS))
+    start, span = first, 7
+    while start <= limit:
+        end = min(start + timedelta(days=span), limit)
+        alerts = [(_alert_at(o, lead), o.start_date) for o in expand(event, exceptions, start, end)
+                  if o.start_date >= first]
+        alerts = [a for a in alerts if a[0] > after]
+        if alerts:
+            return min(alerts)
+        start, span = end + timedelta(days=1), span * 2
+    return None
+
+
+class ReminderScheduler:
+    """
+    Pending reminders for one user (user_id None = all users), earliest first.
+    Safe to use from any thread; `on_reschedule()` is called, from whichever thread
+    made the change, whenever the next deadline may have moved.
+    """
+
+    def __init__(self, db, user_id=None, bus=None, on_reschedule=None, page_size: int = PAGE_SIZE):
+        self.db = db
+        self.conn_manager = db.conn_manager
+        self.user_id = user_id
+        self.page_size = page_size
+        self.on_reschedule = on_reschedule
+        self._heap = []           # (fire_at, reminder id); entries not in _pending are stale
+        self._pending = {}        # reminder id -> (fire_at, event id) for reminders in the heap
+        self._loaded_upto = None  # (fire_at, id) of the last row read from the table
+        self._exhausted = False   # every pending row has been read
+        self._lock = threading.RLock()
+        self._unsubscribe = (bus or db.bus).subscribe(self._on_change)
+
+    def close(self):
+        self._unsubscribe()
+
+    # ---- reminders -----------------------------------------------------------
+
+    def add(self, event_id, minutes_before: int = DEFAULT_MINUTES_BEFORE) -> int | None:
+        """Remind about an event `minutes_before` its start (0 = at the start). Returns the reminder id."""
+        minutes_before = max(0, int(minutes_before))
+        event = self.db.get_event(event_id)
+        if event is None:
+            return None
+        exceptions = self.db.get_event_exceptions([event_id]).get(event_id) if event.is_recurring else None
+        fire_at, occurrence = self._next(event, exceptions, minutes_before, datetime.now())
+        with self._lock:
+            with self.conn_manager.transaction() as cur:
+                reminder_id = cur.execute("""
+                    INSERT INTO reminders (event_id, user_id, minutes_before, fire_at, occurrence)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(event_id, minutes_before) DO UPDATE SET
+                        fire_at = excluded.fire_at, occurrence = excluded.occurrence
+                    RETURNING id
+                """, (event_id, event.user_id, minutes_before, fire_at, occurrence)).fetchone()[0]
+            self._track(reminder_id, fire_at, event_id)
+        self._notify()
+        return reminder_id
+
+    def remove(self, reminder_id):
+        with self._lock:
+            with self.conn_manager.transaction() as cur:
+                cur.execute("DELETE FROM reminders WHERE id=?", (reminder_id,))
+            self._pending.pop(reminder_id, None)
+        self._notify()
+
+    def reminders_for(self, event_id) -> list[Reminder]:
+        cur = self.conn_manager.cursor(row_factory=Reminder.row_factory)
+        cur.execute(REMINDER_SELECT + " FROM reminders WHERE event_id=? ORDER BY minutes_before", (event_id,))
+        return cur.fetchall()
+
+    def __len__(self):
+        """Pending reminders (one indexed count)."""
+        sql, params = "SELECT COUNT(*) FROM reminders WHERE fire_at IS NOT NULL", []
+        if self.user_id is not None:
+            sql += " AND user_id=?"
+            params.append(self.user_id)
+        return self.conn_manager.execute(sql, params).fetchone()[0]
+
+    # ---- the heap ------------------------------------------------------------
+
+    def next_deadline(self) -> datetime | None:
+        """When the earliest pending reminder fires, or None if nothing is pending."""
+        with self._lock:
+            top = self._peek()
+            return None if top is None else datetime.fromisoformat(top[0])
+
+    def pop_due(self, now: datetime | None = None) -> list[Reminder]:
+        """
+        Take every reminder due by `now` and move each to its next alert (the next
+        occurrence of a series, none for a single event). Returns the ones to show;
+        alerts missed by more than LATE_GRACE are advanced without being returned.
+        """
+        now = now or datetime.now()
+        due_key = _stamp(now)
+        with self._lock:
+            due = []
+            while (top := self._peek()) is not None and top[0] <= due_key:
+                heapq.heappop(self._heap)
+                del self._pending[top[1]]
+                due.append(top[1])
+            if not due:
+                return []
+            return self._advance(due, now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_heap": len(self._pending),
+                "heap_entries": len(self._heap),
+                "loaded_upto": self._loaded_upto,
+                "exhausted": self._exhausted,
+            }
+
+    def _peek(self):
+        """The earliest live heap entry, reading the next page when the heap runs dry."""
+        heap = self._heap
+        while True:
+            while heap and self._pending.get(heap[0][1], (None,))[0] != heap[0][0]:
+                heapq.heappop(heap)   # superseded by a later edit
+            if heap or self._exhausted:
+                return heap[0] if heap else None
+            self._load_page()
+
+    def _load_page(self):
+        sql, params = "SELECT fire_at, id, event_id FROM reminders WHERE fire_at IS NOT NULL", []
+        if self.user_id is not None:
+            sql += " AND user_id=?"
+            params.append(self.user_id)
+        if self._loaded_upto is not None:
+            sql += " AND (fire_at, id) > (?, ?)"
+            params += self._loaded_upto
+        rows = self.conn_manager.execute(sql + " ORDER BY fire_at, id LIMIT ?",
+                                         params + [self.page_size]).fetchall()
+        for fire_at, reminder_id, event_id in rows:
+            self._pending[reminder_id] = (fire_at, event_id)
+            heapq.heappush(self._heap, (fire_at, reminder_id))
+        if rows:
+            self._loaded_upto = tuple(rows[-1][:2])
+        self._exhausted = len(rows) < self.page_size
+
+    def _track(self, reminder_id, fire_at, event_id):
+        """Put a reminder's new alert in the heap if it falls in the part already read."""
+        if fire_at is not None and (self._exhausted or (
+                self._loaded_upto is not None and (fire_at, reminder_id) <= self._loaded_upto)):
+            self._pending[reminder_id] = (fire_at, event_id)
+            heapq.heappush(self._heap, (fire_at, reminder_id))
+        else:
+            # Later than anything read so far: the page that reaches it picks it up
+            self._pending.pop(reminder_id, None)
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._heap = [(fire_at, rid) for rid, (fire_at, _) in self._pending.items()]
+            heapq.heapify(self._heap)
+
+    def _reset(self):
+        self._heap, self._pending = [], {}
+        self._loaded_upto, self._exhausted = None, False
+
+    # ---- recomputing alerts ----------------------------------------------------
+
+    @staticmethod
+    def _next(event, exceptions, minutes_before, after) -> tuple[str | None, str | None]:
+        found = next_alert(event, exceptions, minutes_before, after)
+        if found is None:
+            return None, None
+        return _stamp(found[0]), found[1].isoformat()
+
+    def _events(self, event_ids) -> tuple[dict, dict]:
+        """({id: Event}, {series id: exceptions}) for the given event ids."""
+        events, event_ids = {}, list(event_ids)
+        cur = self.conn_manager.cursor(row_factory=Event.row_factory)
+        for i in range(0, len(event_ids), 500):
+            chunk = event_ids[i:i + 500]
+            cur.execute(EVENT_SELECT + " FROM events WHERE id IN (%s)" % ",".join("?" * len(chunk)), chunk)
+            events.update((e.id, e) for e in cur.fetchall())
+        series = [e.id for e in events.values() if e.is_recurring]
+        return events, self.db.get_event_exceptions(series) if series else {}
+
+    def _reschedule_rows(self, rows: list[Reminder], after: datetime) -> list[tuple]:
+        """Recompute each row's next alert after `after`; write and track the ones that moved."""
+        events, exceptions = self._events({r.event_id for r in rows})
+        updates = []
+        for r in rows:
+            fire_at, occurrence = self._next(events.get(r.event_id), exceptions.get(r.event_id),
+                                             r.minutes_before, after)
+            old = _stamp(r.fire_at) if r.fire_at is not None else None
+            if (fire_at, occurrence) != (old, r.occurrence.isoformat() if r.occurrence else None):
+                updates.append((fire_at, occurrence, r.id))
+            self._track(r.id, fire_at, r.event_id)
+        if updates:
+            with self.conn_manager.transaction() as cur:
+                cur.executemany("UPDATE reminders SET fire_at=?, occurrence=? WHERE id=?", updates)
+        self._compact()
+        return updates
+
+    def _advance(self, reminder_ids: list[int], now: datetime) -> list[Reminder]:
+        cur = self.conn_manager.cursor(row_factory=Reminder.row_factory)
+        rows = []
+        for i in range(0, len(reminder_ids), 500):
+            chunk = reminder_ids[i:i + 500]
+            cur.execute(REMINDER_SELECT + " FROM reminders WHERE id IN (%s)" % ",".join("?" * len(chunk)), chunk)
+            rows += cur.fetchall()
+        rows = [r for r in rows if r.fire_at is not None]
+        events, exceptions = self._events({r.event_id for r in rows})
+        cutoff = now - LATE_GRACE
+        shown, updates = [], []
+        for r in sorted(rows, key=lambda r: (r.fire_at, r.id)):
+            event = events.get(r.event_id)
+            if event is None:
+                continue   # deleted together with its event
+            if r.fire_at > now:
+                self._track(r.id, _stamp(r.fire_at), r.event_id)   # moved since it was read
+                continue
+            if r.fire_at >= cutoff:
+                r.event = event
+                shown.append(r)
+            # Missed alerts older than the grace period are skipped, not replayed one by one
+            fire_at, occurrence = self._next(event, exceptions.get(r.event_id), r.minutes_before,
+                                             max(r.fire_at, cutoff))
+            updates.append((fire_at, occurrence, r.id))
+            self._track(r.id, fire_at, r.event_id)
+        if updates:
+            with self.conn_manager.transaction() as tx:
+                tx.executemany("UPDATE reminders SET fire_at=?, occurrence=? WHERE id=?", updates)
+        return shown
+
+    # ---- change bus ----------------------------------------------------------
+
+    def _on_change(self, change):
+        if change.kind != RESET and self.user_id is not None and change.user_id != self.user_id:
+            return
+        with self._lock:
+            if change.kind == RESET:
+                self._refresh_all()
+            elif change.kind == DELETE:
+                # The rows went with the event (ON DELETE CASCADE); forget their heap entries
+                event_id = change.old.id
+                for reminder_id in [rid for rid, (_, eid) in self._pending.items() if eid == event_id]:
+                    del self._pending[reminder_id]
+            else:
+                cur = self.conn_manager.cursor(row_factory=Reminder.row_factory)
+                cur.execute(REMINDER_SELECT + " FROM reminders WHERE event_id=?", (change.event.id,))
+                rows = cur.fetchall()
+                if not rows:
+                    return
+                self._reschedule_rows(rows, datetime.now())
+        self._notify()
+
+    def _refresh_all(self):
+        """After a bulk change (import, sync, ...): recompute every reminder, then re-read the heap."""
+        sql, params = REMINDER_SELECT + " FROM reminders", []
+        if self.user_id is not None:
+            sql += " WHERE user_id=?"
+            params.append(self.user_id)
+        cur = self.conn_manager.cursor(row_factory=Reminder.row_factory)
+        rows = cur.execute(sql, params).fetchall()
+        self._reset()
+        if rows:
+            self._reschedule_rows(rows, datetime.now())
+        self._reset()   # the heap refills from the table on the next peek
+
+    def _notify(self):
+        if self.on_reschedule is not None:
+            try:
+                self.on_reschedule()
+            except Exception as e:
+                print("ReminderScheduler: on_reschedule failed:", e)
@@ -0,0 +1,135 @@
+# response_cache.py
+"""
+Persistent cache of model replies, stored in the `response_cache` table.
+
+Key = normalized user text + hash of the last few history turns + the user's
+events version stamp (bumped by triggers on every calendar write) + today's date
+(the prompt is date-relative) + whether a suggestion is pending. A calendar
+change therefore invalidates every cached answer for that user without any
+explicit purge. Entries expire after a TTL and the least recently used ones are
+evicted once the table grows past `max_entries`.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import date
+
+CACHE_TTL_SECONDS = int(os.getenv("CALENDAI_CACHE_TTL", 6 * 3600))
+CACHE_MAX_ENTRIES = int(os.getenv("CALENDAI_CACHE_MAX_ENTRIES", 1000))
+CACHE_HISTORY_TURNS = 2       # how much preceding conversation makes two questions "the same"
+PROMPT_VERSION = "v4"         # bump when the system prompt / tools change
+
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_text(text: str) -> str:
+    """Case/whitespace/trailing-punctuation insensitive form of a user message."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = " ".join(text.split())
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+class ResponseCache:
+    def __init__(self, db, ttl_seconds: int = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES,
+                 history_turns: int = CACHE_HISTORY_TURNS):
+        self.conn_manager = db.conn_manager
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.history_turns = history_turns
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def make_key(self, user_text: str, history: list[dict], events_version: int,
+                 *, user_id=None, has_pending: bool = False, today: date | None = None) -> str:
+        recent = [(m.get("role"), normalize_text(m.get("content") or ""))
+                  for m in history[-self.history_turns:]] if self.history_turns else []
+        material = json.dumps({
+            "v": PROMPT_VERSION,
+            "text": normalize_text(user_text),
+            "history": recent,
+            "user": user_id,
+            "events": events_version,
+            "pending": bool(has_pending),
+            "day": (today or date.today()).isoformat(),
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[str, dict | None] | None:
+        """(ai_text, event) for a fresh entry, else None."""
+        now = time.time()
+        row = self.conn_manager.execute(
+            "SELECT response, expires_at FROM response_cache WHERE key=?", (key,)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        if row[1] < now:
+            with self.conn_manager.transaction() as cur:
+                cur.execute("DELETE FROM response_cache WHERE key=?", (key,))
+            self._count("misses")
+            self._count("expired")
+            return None
+
+        with self.conn_manager.transaction() as cur:
+            cur.execute("UPDATE response_cache SET last_access=?, hits=hits+1 WHERE key=?", (now, key))
+        self._count("hits")
+        payload = json.loads(row[0])
+        return payload["text"], payload.get("event")
+
+    def put(self, key: str, ai_text: str, event: dict | None):
+        now = time.time()
+        response = json.dumps({"text": ai_text, "event": event}, ensure_ascii=False)
+        with self.conn_manager.transaction() as cur:
+            cur.execute("""
+                INSERT INTO response_cache (key, response, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    response = excluded.response,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at,
+                    last_access = excluded.last_access
+            """, (key, response, now, now + self.ttl_seconds, now))
+            self._evict(cur, now)
+
+    def _evict(self, cur, now: float):
+        cur.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+        self._count("expired", cur.rowcount)
+        size = cur.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        overflow = size - self.max_entries
+        if overflow > 0:
+            # Least recently used first (idx_response_cache_lru)
+            cur.execute("""
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache ORDER BY last_access ASC LIMIT ?
+                )
+            """, (overflow,))
+            self._count("evictions", cur.rowcount)
+
+    def clear(self):
+        with self.conn_manager.transaction() as cur:
+            cur.execute("DELETE FROM response_cache")
+
+    def _count(self, name: str, n: int = 1):
+        if n > 0:
+            with self._lock:
+                setattr(self, name, getattr(self, name) + n)
+
+    def stats(self) -> dict:
+        """Counters for monitoring (since this process started) + current table size."""
+        size = self.conn_manager.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "size": size,
+        }
@@ -0,0 +1,312 @@
+# sync/engine.py
+"""
+Two-way, incremental calendar sync between CalendarDB and a SyncProvider.
+
+Each sync exchanges deltas only:
+  1. local changes since sync_state.local_seq, read from the event_changes log
+     (latest entry per event; see DB/migrations.py _m010_change_tracking)
+  2. remote changes since sync_state.remote_token, from provider.pull
+  3. items changed on both sides are resolved together, as one batch, by the
+     engine's policy (newest edit wins by default)
+  4. remote winners are written locally in one transaction; local winners are
+     pushed in batches of `batch_size`
+  5. links (event <-> remote item, with the version both sides agree on) and the
+     state are saved, and views get one RESET if anything local changed
+
+Every step is O(changes): links and rows are looked up by the changed ids only,
+never by scanning the calendar. Applying remote changes writes to events and so
+adds entries to the log; those rows' links record the resulting version, which
+is how the next sync recognises them as its own writes and doesn't echo them.
+
+Not synced: occurrence exceptions (cancelled/moved instances of a series).
+"""
+from DB.changes import EventChange, RESET
+from DB.records import parse_date
+from DB.sqlite import CalendarDB
+from sync.providers import OutgoingChange, event_fields
+
+NEWEST_WINS = "newest"   # compare updated_at; ties go to the remote side
+LOCAL_WINS = "local"
+REMOTE_WINS = "remote"
+POLICIES = (NEWEST_WINS, LOCAL_WINS, REMOTE_WINS)
+
+LOOKUP_CHUNK = 500   # ids per IN (...) query
+
+
+class SyncReport:
+    __slots__ = ("pulled", "pushed", "applied", "deleted_local", "conflicts", "local_wins",
+                 "remote_wins", "rejected", "skipped", "token")
+
+    def __init__(self):
+        self.pulled = self.pushed = self.applied = self.deleted_local = 0
+        self.conflicts = self.local_wins = self.remote_wins = self.rejected = self.skipped = 0
+        self.token = None
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "SyncReport(" + ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items()) + ")"
+
+
+class _Link:
+    __slots__ = ("event_id", "remote_id", "etag", "synced_version")
+
+    def __init__(self, event_id, remote_id, etag, synced_version):
+        self.event_id = event_id
+        self.remote_id = remote_id
+        self.etag = etag
+        self.synced_version = synced_version
+
+
+class _LocalChange:
+    __slots__ = ("seq", "event_id", "event", "version", "updated_at", "link")
+
+    def __init__(self, seq, event_id, event, version, updated_at, link):
+        self.seq = seq
+        self.event_id = event_id
+        self.event = event          # None = deleted
+        self.version = version
+        self.updated_at = updated_at or ""
+        self.link = link
+
+
+def resolve_conflicts(pairs, policy: str = NEWEST_WINS):
+    """
+    Split (local, remote) pairs changed on both sides into (local winners, remote
+    winners). One pass over the batch; nothing is fetched per pair.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {POLICIES}, not {policy!r}")
+    local_won, remote_won = [], []
+    for local, remote in pairs:
+        if policy == LOCAL_WINS or (policy == NEWEST_WINS and local.updated_at > remote.updated_at):
+            local_won.append((local, remote))
+        else:
+            remote_won.append((local, remote))
+    return local_won, remote_won
+
+
+class SyncEngine:
+    """Syncs one user's calendar with one provider. Not thread-safe: run one sync at a time."""
+
+    def __init__(self, db, provider, user_id, policy: str = NEWEST_WINS, batch_size: int = 500):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, not {policy!r}")
+        self.db = db
+        self.provider = provider
+        self.user_id = user_id
+        self.policy = policy
+        self.batch_size = batch_size
+        self.conn_manager = db.conn_manager
+
+    # ---- state / links ------------------------------------------------------
+
+    def _load_state(self) -> tuple[int, str | None]:
+        row = self.conn_manager.execute(
+            "SELECT local_seq, remote_token FROM sync_state WHERE provider=? AND user_id=?",
+            (self.provider.name, self.user_id)).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def _save_state(self, cur, local_seq, token):
+        cur.execute("""
+            INSERT INTO sync_state (provider, user_id, local_seq, remote_token, last_synced)
+            VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+            ON CONFLICT(provider, user_id) DO UPDATE SET
+                local_seq = excluded.local_seq, remote_token = excluded.remote_token,
+                last_synced = excluded.last_synced
+        """, (self.provider.name, self.user_id, local_seq, token))
+
+    def _links(self, column: str, values) -> dict:
+        """Links whose `column` (event_id or remote_id) is in `values`, keyed by it."""
+        out = {}
+        values = list(values)
+        for i in range(0, len(values), LOOKUP_CHUNK):
+            chunk = values[i:i + LOOKUP_CHUNK]
+            rows = self.conn_manager.execute(
+                f"SELECT event_id, remote_id, etag, synced_version FROM sync_links "
+                f"WHERE provider=? AND user_id=? AND {column} IN ({','.join('?' * len(chunk))})",
+                [self.provider.name, self.user_id, *chunk])
+            for row in rows:
+                link = _Link(*row)
+                out[getattr(link, column)] = link
+        return out
+
+    # ---- sync ---------------------------------------------------------------
+
+    def sync(self) -> SyncReport:
+        report = SyncReport()
+        local_seq, token = self._load_state()
+        head = self.db.latest_change_seq(self.user_id)
+
+        local = self._local_changes(local_seq, head, report)
+        remote, next_token = self.provider.pull(token)
+        report.pulled = len(remote)
+        report.token = next_token
+
+        # Latest state per remote item; drop echoes of our own pushes
+        remote_by_id = {}
+        for r in remote:
+            remote_by_id[r.remote_id] = r
+        remote_links = self._links("remote_id", remote_by_id)
+        incoming, pairs = [], []
+        for r in remote_by_id.values():
+            link = remote_links.get(r.remote_id)
+            if link is not None and link.etag == r.etag:
+                continue
+            mine = local.get(link.event_id) if link is not None else None
+            if mine is not None:
+                pairs.append((mine, r))
+            else:
+                incoming.append((r, link))
+
+        report.conflicts = len(pairs)
+        local_won, remote_won = resolve_conflicts(pairs, self.policy)
+        report.local_wins, report.remote_wins = len(local_won), len(remote_won)
+        for mine, r in local_won:
+            mine.link.etag = r.etag   # push over the remote version we just saw
+        for mine, r in remote_won:
+            del local[mine.event_id]
+            incoming.append((r, mine.link))
+
+        adopted = self._apply_remote(incoming, report)
+        for event_id in adopted:
+            # Created on both sides: the remote item is now linked, don't push a duplicate
+            if event_id in local and local[event_id].link is None:
+                del local[event_id]
+        rejected_seqs = self._push(list(local.values()), report)
+
+        # A rejected push is retried next time: keep its log entry ahead of local_seq
+        new_local_seq = min([head] + [s - 1 for s in rejected_seqs])
+        with self.conn_manager.transaction() as cur:
+            self._save_state(cur, new_local_seq, next_token)
+        if report.applied or report.deleted_local:
+            self.db.bus.publish(EventChange(RESET, user_id=self.user_id))
+        return report
+
+    def _local_changes(self, after_seq, head, report) -> dict:
+        """Local edits since the last sync, minus our own writes of remote changes."""
+        log = self.db.get_changes_since(self.user_id, after_seq, head)
+        links = self._links("event_id", [event_id for _seq, event_id, _op, _at in log])
+        rows = self.db.get_events_with_versions(
+            [event_id for _seq, event_id, op, _at in log if op == "upsert"])
+        out = {}
+        for seq, event_id, op, changed_at in log:
+            link = links.get(event_id)
+            row = rows.get(event_id) if op == "upsert" else None
+            if row is None:
+                if link is None:
+                    continue   # created and deleted between syncs: the provider never saw it
+                out[event_id] = _LocalChange(seq, event_id, None, None, changed_at, link)
+                continue
+            event, version, updated_at = row
+            if link is not None and link.synced_version == version:
+                report.skipped += 1   # a remote change we applied ourselves
+                continue
+            out[event_id] = _LocalChange(seq, event_id, event, version, updated_at, link)
+        return out
+
+    def _apply_remote(self, incoming, report) -> set:
+        """
+        Write remote changes locally in one transaction and record their links.
+        Returns the ids of local events newly linked to a remote item.
+        """
+        adopted = set()
+        if not incoming:
+            return adopted
+        provider, user_id = self.provider.name, self.user_id
+        with self.conn_manager.transaction() as cur:
+            for r, link in incoming:
+                if r.deleted:
+                    if link is not None:
+                        cur.execute("DELETE FROM events WHERE id=? AND user_id=?", (link.event_id, user_id))
+                        cur.execute("DELETE FROM sync_links WHERE provider=? AND event_id=?",
+                                    (provider, link.event_id))
+                        report.deleted_local += 1
+                    continue
+                values = _row_values(r.fields)
+                if values is None:
+                    report.skipped += 1
+                    continue
+                event_id = None
+                if link is not None:
+                    cur.execute("""
+                        UPDATE OR IGNORE events SET title=?, description=?, start_date=?, end_date=?,
+                            start_time=?, end_time=?, rrule=?, series_end=?, location=?
+                        WHERE id=? AND user_id=?
+                    """, (*values, link.event_id, user_id))
+                    if cur.rowcount:
+                        event_id = link.event_id
+                if event_id is None:
+                    # New here (or its row is gone): insert, or adopt an identical local event
+                    event_id = cur.execute("""
+                        INSERT INTO events (title, description, start_date, end_date, start_time, end_time,
+                                            rrule, series_end, location, user_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(user_id, title, start_date, start_time, end_date, end_time)
+                        DO UPDATE SET description = excluded.description, location = excluded.location,
+                                      rrule = excluded.rrule, series_end = excluded.series_end
+                        RETURNING id
+                    """, (*values, user_id)).fetchone()[0]
+                version = cur.execute("SELECT version FROM events WHERE id=?", (event_id,)).fetchone()[0]
+                if link is not None and link.event_id != event_id:
+                    cur.execute("DELETE FROM sync_links WHERE provider=? AND event_id=?", (provider, link.event_id))
+                cur.execute("""
+                    INSERT INTO sync_links (provider, event_id, user_id, remote_id, etag, synced_version)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(provider, event_id) DO UPDATE SET
+                        remote_id = excluded.remote_id, etag = excluded.etag,
+                        synced_version = excluded.synced_version
+                """, (provider, event_id, user_id, r.remote_id, r.etag, version))
+                if link is None or link.event_id != event_id:
+                    adopted.add(event_id)
+                report.applied += 1
+        return adopted
+
+    def _push(self, changes: list[_LocalChange], report) -> list[int]:
+        """Push local winners in batches; returns the log seqs of rejected changes."""
+        rejected = []
+        provider, user_id = self.provider.name, self.user_id
+        for i in range(0, len(changes), self.batch_size):
+            batch = changes[i:i + self.batch_size]
+            outgoing = [OutgoingChange(c.event_id,
+                                       c.link.remote_id if c.link else None,
+                                       c.link.etag if c.link else None,
+                                       c.updated_at,
+                                       None if c.event is None else event_fields(c.event))
+                        for c in batch]
+            results = {res.event_id: res for res in self.provider.push(outgoing)}
+            with self.conn_manager.transaction() as cur:
+                for c in batch:
+                    res = results.get(c.event_id)
+                    if res is None or not res.ok:
+                        rejected.append(c.seq)
+                        report.rejected += 1
+                        continue
+                    report.pushed += 1
+                    if c.event is None:
+                        cur.execute("DELETE FROM sync_links WHERE provider=? AND event_id=?", (provider, c.event_id))
+                        continue
+                    cur.execute("""
+                        INSERT INTO sync_links (provider, event_id, user_id, remote_id, etag, synced_version)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(provider, event_id) DO UPDATE SET
+                            remote_id = excluded.remote_id, etag = excluded.etag,
+                            synced_version = excluded.synced_version
+                    """, (provider, c.event_id, user_id, res.remote_id, res.etag, c.version))
+        return rejected
+
+
+def _row_values(fields: dict):
+    """Column values (title, ..., location) for a remote item, or None if it has no usable start date."""
+    start = parse_date(fields.get("start_date"))
+    if start is None:
+        return None
+    end = max(parse_date(fields.get("end_date")) or start, start)
+    try:
+        rrule, series_end = CalendarDB._series_fields(fields.get("rrule"), start, end)
+    except ValueError:
+        rrule, series_end = None, None
+    return ((fields.get("title") or "").strip(), (fields.get("description") or "").strip(),
+            start.isoformat(), end.isoformat(), fields.get("start_time") or "", fields.get("end_time") or "",
+            rrule, series_end, (fields.get("location") or "").strip())
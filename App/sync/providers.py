@@ -0,0 +1,139 @@
+# sync/providers.py
+"""
+What a calendar provider has to implement for SyncEngine, and a registry so
+new ones (Google, Outlook, ...) plug in by name.
+
+A provider exchanges deltas only:
+  - pull(token) returns the remote changes after `token` (None = everything)
+    plus the token to pass next time. Tokens are opaque to the engine.
+  - push(changes) applies a batch of local changes and returns one PushResult
+    per change. A change carries the etag the engine last saw for the item; a
+    provider whose copy has moved on since rejects it (ok=False) instead of
+    overwriting, and the engine picks it up again on the next sync.
+
+Event fields travel as plain dicts with the keys in EVENT_FIELDS (dates
+'YYYY-MM-DD', times 'HH:MM' or '').
+"""
+from utils.calendar_files import IMPORT_FIELDS
+
+EVENT_FIELDS = IMPORT_FIELDS
+
+
+class RemoteChange:
+    """One item changed on the provider since the last pull; fields None = deleted."""
+    __slots__ = ("remote_id", "etag", "updated_at", "fields")
+
+    def __init__(self, remote_id, etag=None, updated_at="", fields=None):
+        self.remote_id = str(remote_id)
+        self.etag = etag
+        self.updated_at = updated_at or ""
+        self.fields = fields
+
+    @property
+    def deleted(self) -> bool:
+        return self.fields is None
+
+    def to_dict(self) -> dict:
+        return {"remote_id": self.remote_id, "etag": self.etag, "updated_at": self.updated_at,
+                "fields": self.fields}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RemoteChange":
+        return cls(d["remote_id"], d.get("etag"), d.get("updated_at"), d.get("fields"))
+
+    def __repr__(self):
+        return f"RemoteChange({self.remote_id!r}, etag={self.etag!r}, deleted={self.deleted})"
+
+
+class OutgoingChange:
+    """
+    One local change to push. remote_id None = create; fields None = delete.
+    `base_etag` is the remote version the local edit was made against.
+    """
+    __slots__ = ("event_id", "remote_id", "base_etag", "updated_at", "fields")
+
+    def __init__(self, event_id, remote_id=None, base_etag=None, updated_at="", fields=None):
+        self.event_id = event_id
+        self.remote_id = remote_id
+        self.base_etag = base_etag
+        self.updated_at = updated_at or ""
+        self.fields = fields
+
+    @property
+    def deleted(self) -> bool:
+        return self.fields is None
+
+    def to_dict(self) -> dict:
+        return {"event_id": self.event_id, "remote_id": self.remote_id, "base_etag": self.base_etag,
+                "updated_at": self.updated_at, "fields": self.fields}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "OutgoingChange":
+        return cls(d["event_id"], d.get("remote_id"), d.get("base_etag"), d.get("updated_at"), d.get("fields"))
+
+
+class PushResult:
+    """Outcome of one pushed change: the item's remote id and new etag, or ok=False on conflict."""
+    __slots__ = ("event_id", "remote_id", "etag", "ok")
+
+    def __init__(self, event_id, remote_id=None, etag=None, ok=True):
+        self.event_id = event_id
+        self.remote_id = None if remote_id is None else str(remote_id)
+        self.etag = etag
+        self.ok = ok
+
+    def to_dict(self) -> dict:
+        return {"event_id": self.event_id, "remote_id": self.remote_id, "etag": self.etag, "ok": self.ok}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PushResult":
+        return cls(d["event_id"], d.get("remote_id"), d.get("etag"), d.get("ok", True))
+
+
+class SyncProvider:
+    """Base class for providers; `name` keys the sync state and links in the DB."""
+    name = "provider"
+
+    def pull(self, token: str | None) -> tuple[list[RemoteChange], str]:
+        raise NotImplementedError
+
+    def push(self, changes: list[OutgoingChange]) -> list[PushResult]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def event_fields(e) -> dict:
+    """EVENT_FIELDS dict for an Event record."""
+    return {
+        "title": e.title,
+        "description": e.description,
+        "location": e.location,
+        "start_date": e.start_date.isoformat() if e.start_date else "",
+        "end_date": e.end_date.isoformat() if e.end_date else "",
+        "start_time": e.start_time_text,
+        "end_time": e.end_time_text,
+        "rrule": e.rrule,
+    }
+
+
+_registry: dict = {}
+
+
+def register_provider(name: str, factory):
+    """Make a provider available to make_provider(name, ...)."""
+    _registry[name] = factory
+
+
+def make_provider(name: str, **kwargs) -> SyncProvider:
+    import sync.standin   # noqa: F401 -- registers the built-in stand-ins
+    factory = _registry.get(name)
+    if factory is None:
+        raise ValueError(f"unknown sync provider {name!r} (known: {', '.join(sorted(_registry))})")
+    return factory(**kwargs)
+
+
+def available_providers() -> list[str]:
+    import sync.standin   # noqa: F401
+    return sorted(_registry)
@@ -0,0 +1,284 @@
+# sync/standin.py
+"""
+Local stand-ins for a remote calendar, for tests, benchmarks and offline use.
+
+    store = LocalCalendarStore()                    # the "remote" calendar
+    MemoryProvider(store)                           # talks to it in-process
+    FileProvider("remote.json")                     # same, persisted to a JSON file
+    server = StandInServer(store).start()           # same, over HTTP
+    HttpProvider(server.base_url)
+
+The store keeps its own change log, so pulls are O(changes) like a real
+provider's sync token API (e.g. Google's nextSyncToken). Etags are the store's
+change sequence numbers; a push made against an old etag is rejected.
+`put`/`update`/`delete` simulate edits made on the remote side.
+"""
+import bisect
+import http.client
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote
+
+from sync.providers import (SyncProvider, RemoteChange, OutgoingChange, PushResult,
+                            register_provider)
+
+
+def utc_now() -> str:
+    """Same format as the change log's changed_at ('2025-01-31T12:00:00.000Z')."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class LocalCalendarStore:
+    """A remote calendar in memory (optionally saved to `path` as JSON after each write)."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self.seq = 0
+        self.items: dict[str, dict] = {}   # remote id -> {"etag", "updated_at", "fields" (None = deleted)}
+        self._log_seqs: list[int] = []     # change log, ascending
+        self._log_ids: list[str] = []
+        self._next_id = 1
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for item in self.items.values() if item["fields"] is not None)
+
+    # ---- remote-side edits ------------------------------------------------------
+
+    def put(self, fields: dict, updated_at: str | None = None) -> str:
+        """Create an item; returns its remote id."""
+        with self._lock:
+            remote_id = self._new_id()
+            self._write(remote_id, dict(fields), updated_at)
+            self._save()
+            return remote_id
+
+    def update(self, remote_id: str, updated_at: str | None = None, **fields):
+        with self._lock:
+            current = self.items[remote_id]["fields"]
+            self._write(remote_id, {**current, **fields}, updated_at)
+            self._save()
+
+    def delete(self, remote_id: str, updated_at: str | None = None):
+        with self._lock:
+            self._write(remote_id, None, updated_at)
+            self._save()
+
+    def get(self, remote_id: str) -> dict | None:
+        with self._lock:
+            item = self.items.get(remote_id)
+            return None if item is None else item["fields"]
+
+    # ---- provider API -----------------------------------------------------------
+
+    def changes_since(self, token: str | None) -> tuple[list[RemoteChange], str]:
+        with self._lock:
+            after = int(token or 0)
+            start = bisect.bisect_right(self._log_seqs, after)
+            changed = dict.fromkeys(self._log_ids[start:])   # latest state per item, in log order
+            out = [RemoteChange(rid, self.items[rid]["etag"], self.items[rid]["updated_at"],
+                                self.items[rid]["fields"]) for rid in changed]
+            return out, str(self.seq)
+
+    def apply(self, changes: list[OutgoingChange]) -> list[PushResult]:
+        results = []
+        with self._lock:
+            for c in changes:
+                if c.remote_id is None:
+                    if c.deleted:
+                        results.append(PushResult(c.event_id, ok=True))
+                        continue
+                    remote_id = self._new_id()
+                else:
+                    remote_id = str(c.remote_id)
+                    item = self.items.get(remote_id)
+                    if item is not None and item["etag"] != c.base_etag:
+                        results.append(PushResult(c.event_id, remote_id, item["etag"], ok=False))
+                        continue
+                    if item is None and c.deleted:
+                        results.append(PushResult(c.event_id, remote_id, None, ok=True))
+                        continue
+                etag = self._write(remote_id, None if c.deleted else dict(c.fields), c.updated_at or None)
+                results.append(PushResult(c.event_id, remote_id, etag))
+            self._save()
+        return results
+
+    # ---- internals --------------------------------------------------------------
+
+    def _new_id(self) -> str:
+        remote_id = f"r{self._next_id}"
+        self._next_id += 1
+        return remote_id
+
+    def _write(self, remote_id, fields, updated_at=None) -> str:
+        self.seq += 1
+        etag = str(self.seq)
+        self.items[remote_id] = {"etag": etag, "updated_at": updated_at or utc_now(), "fields": fields}
+        self._log_seqs.append(self.seq)
+        self._log_ids.append(remote_id)
+        return etag
+
+    def _save(self):
+        if not self.path:
+            return
+        # Only each item's latest log entry matters
+        latest = {rid: int(item["etag"]) for rid, item in self.items.items()}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"seq": self.seq, "next_id": self._next_id, "items": self.items,
+                       "log": sorted((s, rid) for rid, s in latest.items())}, fh)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        self.seq = data["seq"]
+        self._next_id = data["next_id"]
+        self.items = data["items"]
+        self._log_seqs = [s for s, _ in data["log"]]
+        self._log_ids = [rid for _, rid in data["log"]]
+
+
+class MemoryProvider(SyncProvider):
+    name = "memory"
+
+    def __init__(self, store: LocalCalendarStore | None = None, name: str | None = None):
+        self.store = store if store is not None else LocalCalendarStore()
+        if name:
+            self.name = name
+
+    def pull(self, token):
+        return self.store.changes_since(token)
+
+    def push(self, changes):
+        return self.store.apply(changes)
+
+
+class FileProvider(MemoryProvider):
+    """A remote calendar kept in a JSON file, e.g. on a shared/synced folder."""
+    name = "file"
+
+    def __init__(self, path: str, name: str | None = None):
+        super().__init__(LocalCalendarStore(path), name)
+
+
+# ---- HTTP ---------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # headers and body go out as separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/changes":
+            return self._reply({"error": "not found"}, 404)
+        token = parse_qs(url.query).get("token", [None])[0]
+        changes, next_token = self.server.store.changes_since(token)
+        self._reply({"changes": [c.to_dict() for c in changes], "token": next_token})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if urlsplit(self.path).path != "/changes":
+            self.rfile.read(length)
+            return self._reply({"error": "not found"}, 404)
+        data = json.loads(self.rfile.read(length) or b"{}")
+        results = self.server.store.apply([OutgoingChange.from_dict(d) for d in data.get("changes", [])])
+        self._reply({"results": [r.to_dict() for r in results]})
+
+
+class StandInServer:
+    """Serves a LocalCalendarStore over HTTP: GET /changes?token=..., POST /changes."""
+
+    def __init__(self, store: LocalCalendarStore | None = None, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = store if store is not None else LocalCalendarStore()
+        self._thread = None
+
+    @property
+    def store(self) -> LocalCalendarStore:
+        return self.httpd.store
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class HttpProvider(SyncProvider):
+    """Client for StandInServer's protocol over one keep-alive connection."""
+    name = "http"
+
+    def __init__(self, base_url: str, timeout: float = 30.0, name: str | None = None):
+        url = urlsplit(base_url)
+        self._host, self._port = url.hostname, url.port
+        self._prefix = url.path.rstrip("/")
+        self._timeout = timeout
+        self._conn = None
+        if name:
+            self.name = name
+
+    def _request(self, method, path, payload=None) -> dict:
+        body = None if payload is None else json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in (0, 1):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+            try:
+                self._conn.request(method, self._prefix + path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.close()
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"sync server: HTTP {response.status} {data[:200]!r}")
+            return json.loads(data)
+
+    def pull(self, token):
+        path = "/changes" + ("" if token is None else "?token=" + quote(str(token)))
+        data = self._request("GET", path)
+        return [RemoteChange.from_dict(d) for d in data["changes"]], data["token"]
+
+    def push(self, changes):
+        data = self._request("POST", "/changes", {"changes": [c.to_dict() for c in changes]})
+        return [PushResult.from_dict(d) for d in data["results"]]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+register_provider("memory", MemoryProvider)
+register_provider("file", FileProvider)
+register_provider("http", HttpProvider)
@@ -0,0 +1,153 @@
+import PyQt6.QtCore as qtc
+import PyQt6.QtGui as qtg
+
+from datetime import time
+
+COLUMNS = ("When", "End", "Title", "Time", "Location", "Description")
+NO_TIME = time(0, 0)   # missing times sort as 00:00
+
+
+class TaskRow:
+    """
+    One table row: display strings and sort keys computed once when the event is
+    loaded, so filtering and sorting never re-format anything.
+    """
+    __slots__ = ("event", "cells", "sort_keys")
+
+    def __init__(self, e):
+        self.event = e
+        sd, ed = e.start_date, e.end_date
+        st, et = e.start_time_text, e.end_time_text
+        title = ("↻ " if e.is_recurring else "") + e.display_title
+        self.cells = (
+            sd.isoformat(),
+            ed.isoformat() if ed != sd else "",
+            title,
+            f"{st or '00:00'}–{et or '00:00'}" if (st or et) else "",
+            e.location,
+            e.description,
+        )
+        start = (sd, e.start_time or NO_TIME, e.id or 0)
+        self.sort_keys = (
+            start,
+            (ed, start),
+            (e.display_title.casefold(), start),
+            (e.start_time or NO_TIME, start),
+            (e.location.casefold(), start),
+            (e.description.casefold(), start),
+        )
+
+
+class TaskTableModel(qtc.QAbstractTableModel):
+    """
+    Events as table rows. Sorting happens here on the precomputed keys (one
+    list.sort per header click) rather than through per-comparison data() calls.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows: list[TaskRow] = []
+        self._sort = (0, qtc.Qt.SortOrder.AscendingOrder)
+        self._bold = qtg.QFont()
+        self._bold.setBold(True)
+
+    def rowCount(self, parent=qtc.QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=qtc.QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=qtc.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == qtc.Qt.ItemDataRole.DisplayRole:
+            return self.rows[index.row()].cells[index.column()]
+        if role == qtc.Qt.ItemDataRole.FontRole and index.column() == 0:
+            return self._bold
+        return None
+
+    def headerData(self, section, orientation, role=qtc.Qt.ItemDataRole.DisplayRole):
+        if role == qtc.Qt.ItemDataRole.DisplayRole and orientation == qtc.Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def sort(self, column, order=qtc.Qt.SortOrder.AscendingOrder):
+        if not 0 <= column < len(COLUMNS):
+            return
+        self._sort = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        self._sort_rows()
+        self.layoutChanged.emit()
+
+    def _sort_rows(self):
+        column, order = self._sort
+        self.rows.sort(key=lambda r: r.sort_keys[column],
+                       reverse=order == qtc.Qt.SortOrder.DescendingOrder)
+
+    def set_events(self, events):
+        """Replace every row (a fresh DB load)."""
+        self.beginResetModel()
+        self.rows = [TaskRow(e) for e in events if e.start_date is not None]
+        self._sort_rows()
+        self.endResetModel()
+
+    def remove_event(self, event_id):
+        """Drop the rows of one event; contiguous runs are removed together."""
+        row = len(self.rows) - 1
+        while row >= 0:
+            if self.rows[row].event.id != event_id:
+                row -= 1
+                continue
+            last = row
+            while row > 0 and self.rows[row - 1].event.id == event_id:
+                row -= 1
+            self.beginRemoveRows(qtc.QModelIndex(), row, last)
+            del self.rows[row:last + 1]
+            self.endRemoveRows()
+            row -= 1
+
+    def add_event(self, e):
+        """Insert one event at its place in the current sort order."""
+        if e.start_date is None:
+            return
+        new = TaskRow(e)
+        column, order = self._sort
+        key = new.sort_keys[column]
+        descending = order == qtc.Qt.SortOrder.DescendingOrder
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = self.rows[mid].sort_keys[column]
+            if (other > key) if descending else (other <= key):
+                lo = mid + 1
+            else:
+                hi = mid
+        self.beginInsertRows(qtc.QModelIndex(), lo, lo)
+        self.rows.insert(lo, new)
+        self.endInsertRows()
+
+
+class TaskFilterProxy(qtc.QSortFilterProxyModel):
+    """
+    Shows the rows whose event matched the current search. Matching itself is done
+    by the FTS index (CalendarDB.search_event_ids); per row this is one set lookup.
+    Sorting is passed through to the source model.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._matches: set | None = None   # event ids; None = no search, show everything
+
+    def set_matches(self, event_ids: set | None):
+        if event_ids == self._matches:
+            return
+        self._matches = event_ids
+        self.invalidateRowsFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._matches is None:
+            return True
+        return self.sourceModel().rows[source_row].event.id in self._matches
+
+    def sort(self, column, order=qtc.Qt.SortOrder.AscendingOrder):
+        self.sourceModel().sort(column, order)
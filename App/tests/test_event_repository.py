@@ -0,0 +1,50 @@
+# tests/test_event_repository.py
+"""
+EventRepository stays in step with the DB across recurring-series exception edits.
+
+    python -m pytest tests          (or: python tests/test_event_repository.py)
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.sqlite import CalendarDB
+from event_repository import EventRepository
+
+FIRST_DAY = date(2025, 1, 6)
+
+
+def test_cancel_then_restore_occurrence():
+    """Restoring the last cancelled occurrence must bring it back in the repository too."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CalendarDB(os.path.join(tmp, "test.db"))
+        db.add_user("test", "x", "test@example.com")
+        user_id = db.get_user_id("test")
+        db.add_event(user_id, "Lunch", "", FIRST_DAY.isoformat(), FIRST_DAY.isoformat(), "12:00", "13:00")
+        series_id = db.add_event(user_id, "Standup", "", FIRST_DAY.isoformat(), FIRST_DAY.isoformat(),
+                                 "08:00", "08:15", rrule="FREQ=DAILY")
+        repo = EventRepository(db, user_id)
+        day = FIRST_DAY + timedelta(days=3)
+
+        def standups(rows):
+            return [(e.start_date, e.start_time_text) for e in rows if e.id == series_id]
+
+        try:
+            for step, write, expected in (("cancel", db.cancel_occurrence, 0),
+                                          ("restore", db.restore_occurrence, 1)):
+                repo.events_between(day, day)   # cached before the write, so the change must invalidate it
+                write(series_id, day)
+                got, want = standups(repo.events_between(day, day)), standups(db.get_agenda(user_id, day, day))
+                assert got == want, f"after {step}: repository {got} != DB {want}"
+                assert len(got) == expected, f"after {step}: {got}"
+        finally:
+            repo.close()
+            db.close()
+
+
+if __name__ == "__main__":
+    test_cancel_then_restore_occurrence()
+    print("ok")
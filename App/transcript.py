@@ -0,0 +1,190 @@
+import PyQt6.QtCore as qtc
+import PyQt6.QtGui as qtg
+import PyQt6.QtWidgets as qtw
+
+MessageRole = qtc.Qt.ItemDataRole.UserRole + 1
+
+BUBBLE_PADDING = 10   # text inset inside a bubble
+BUBBLE_MARGIN = 5     # space around a bubble
+MAX_BUBBLE_RATIO = 0.7
+TEXT_FLAGS = qtc.Qt.TextFlag.TextWordWrap.value | qtc.Qt.AlignmentFlag.AlignLeft.value
+
+
+class TranscriptModel(qtc.QAbstractListModel):
+    """
+    Chat transcript rows (Message records, oldest first). Holds only what has been
+    paged in; older pages are prepended on demand.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+
+    def rowCount(self, parent=qtc.QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=qtc.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        msg = self.items[index.row()]
+        if role == qtc.Qt.ItemDataRole.DisplayRole:
+            return msg.content
+        if role == MessageRole:
+            return msg
+        return None
+
+    def append_message(self, msg):
+        row = len(self.items)
+        self.beginInsertRows(qtc.QModelIndex(), row, row)
+        self.items.append(msg)
+        self.endInsertRows()
+
+    def prepend_messages(self, msgs: list):
+        if not msgs:
+            return
+        self.beginInsertRows(qtc.QModelIndex(), 0, len(msgs) - 1)
+        self.items[:0] = msgs
+        self.endInsertRows()
+
+    def reset_messages(self, msgs: list):
+        """Replace the whole transcript (e.g. when switching conversations)."""
+        self.beginResetModel()
+        self.items = list(msgs)
+        self.endResetModel()
+
+    def update_message(self, msg):
+        """Tell the view a message's text changed (e.g. while streaming)."""
+        # Streaming always updates the newest rows, so search from the end
+        for row in range(len(self.items) - 1, -1, -1):
+            if self.items[row] is msg:
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+                return
+
+    def oldest_id(self):
+        return next((m.id for m in self.items if m.id is not None), None)
+
+
+class BubbleDelegate(qtw.QStyledItemDelegate):
+    """
+    Paints one chat bubble per row. Only rows in the viewport are painted, and
+    measured text sizes are cached per (message id, width) until the text changes.
+    Messages not saved yet (id None, e.g. while streaming) are measured each time.
+    """
+
+    def __init__(self, view: qtw.QListView, user_color: str, ai_color: str):
+        super().__init__(view)
+        self.view = view
+        self.user_color = qtg.QColor(user_color)
+        self.ai_color = qtg.QColor(ai_color)
+        self.text_color = qtg.QColor("white")
+        self._sizes: dict[tuple[int, int], tuple[int, qtc.QSize]] = {}  # (msg.id, width) -> (text length, size)
+        self._width = None   # entries for older widths are dropped once the width changes
+
+    def _max_text_width(self, row_width: int) -> int:
+        return max(50, int(row_width * MAX_BUBBLE_RATIO) - 2 * BUBBLE_PADDING)
+
+    def _text_size(self, msg, fm: qtg.QFontMetrics, row_width: int) -> qtc.QSize:
+        text = msg.content or ""
+        key = (msg.id, row_width)
+        cached = self._sizes.get(key) if msg.id is not None else None
+        if cached is not None and cached[0] == len(text):
+            return cached[1]
+        bounds = qtc.QRect(0, 0, self._max_text_width(row_width), 1_000_000)
+        size = fm.boundingRect(bounds, TEXT_FLAGS, text).size()
+        if msg.id is not None:
+            if row_width != self._width:
+                # paint and sizeHint can see slightly different widths; keep the last two
+                keep = {row_width, self._width}
+                self._sizes = {k: v for k, v in self._sizes.items() if k[1] in keep}
+                self._width = row_width
+            self._sizes[key] = (len(text), size)
+        return size
+
+    def forget(self, msg):
+        if msg.id is not None:
+            for key in [k for k in self._sizes if k[0] == msg.id]:
+                del self._sizes[key]
+
+    def forget_all(self):
+        self._sizes.clear()
+
+    def sizeHint(self, option, index):
+        msg = index.data(MessageRole)
+        row_width = self.view.viewport().width()
+        text = self._text_size(msg, option.fontMetrics, row_width)
+        return qtc.QSize(row_width, text.height() + 2 * (BUBBLE_PADDING + BUBBLE_MARGIN))
+
+    def paint(self, painter, option, index):
+        msg = index.data(MessageRole)
+        rect = option.rect
+        text = self._text_size(msg, option.fontMetrics, rect.width())
+        width = text.width() + 2 * BUBBLE_PADDING
+        height = text.height() + 2 * BUBBLE_PADDING
+        is_user = msg.role == "user"
+        x = rect.right() - BUBBLE_MARGIN - width if is_user else rect.left() + BUBBLE_MARGIN
+        bubble = qtc.QRect(x, rect.top() + BUBBLE_MARGIN, width, height)
+
+        painter.save()
+        painter.setRenderHint(qtg.QPainter.RenderHint.Antialiasing)
+        painter.setPen(qtc.Qt.PenStyle.NoPen)
+        painter.setBrush(self.user_color if is_user else self.ai_color)
+        painter.drawRoundedRect(bubble, 8, 8)
+        painter.setPen(self.text_color)
+        painter.setFont(option.font)
+        painter.drawText(bubble.adjusted(BUBBLE_PADDING, BUBBLE_PADDING, -BUBBLE_PADDING, -BUBBLE_PADDING),
+                         TEXT_FLAGS, msg.content or "")
+        painter.restore()
+
+
+class TranscriptView(qtw.QListView):
+    """
+    QListView set up for a chat log. Emits `nearTop` when the user scrolls to the
+    top so the owner can page in older messages.
+    """
+    nearTop = qtc.pyqtSignal()
+
+    def __init__(self, user_color: str, ai_color: str, parent=None):
+        super().__init__(parent)
+        self.transcript_model = TranscriptModel(self)
+        self.setModel(self.transcript_model)
+        self.bubble_delegate = BubbleDelegate(self, user_color, ai_color)
+        self.setItemDelegate(self.bubble_delegate)
+        # Cached sizes must not outlive their rows
+        self.transcript_model.modelReset.connect(self.bubble_delegate.forget_all)
+        self.transcript_model.rowsAboutToBeRemoved.connect(self._forget_rows)
+
+        self.setSelectionMode(qtw.QAbstractItemView.SelectionMode.NoSelection)
+        self.setVerticalScrollMode(qtw.QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(qtc.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setResizeMode(qtw.QListView.ResizeMode.Adjust)   # re-measure on width change
+        self.setUniformItemSizes(False)
+        self.setFocusPolicy(qtc.Qt.FocusPolicy.NoFocus)
+
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll)
+
+    def _forget_rows(self, parent, first, last):
+        for msg in self.transcript_model.items[first:last + 1]:
+            self.bubble_delegate.forget(msg)
+
+    def _on_scroll(self, value):
+        if value <= self.verticalScrollBar().minimum() and self.transcript_model.rowCount() > 0:
+            self.nearTop.emit()
+
+    def refresh_message(self, msg):
+        """Repaint + re-measure one message whose text changed."""
+        self.bubble_delegate.forget(msg)
+        self.transcript_model.update_message(msg)
+        self.scheduleDelayedItemsLayout()
+
+    def reset_messages(self, msgs: list):
+        self.transcript_model.reset_messages(msgs)
+        self.scrollToBottom()
+
+    def prepend_keeping_position(self, msgs: list):
+        """Insert older messages above without making the visible ones jump."""
+        bar = self.verticalScrollBar()
+        old_max, old_value = bar.maximum(), bar.value()
+        self.transcript_model.prepend_messages(msgs)
+        self.doItemsLayout()
+        bar.setValue(bar.maximum() - old_max + old_value)
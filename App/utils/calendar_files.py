@@ -0,0 +1,292 @@
+# utils/calendar_files.py
+"""
+iCalendar (.ics) and CSV import/export, streamed in both directions.
+
+Parsers are generators over the lines/rows of an open file and yield one dict
+per event (keys: IMPORT_FIELDS), so a 100k-event file is never held in memory;
+CalendarDB.import_events consumes them in batched transactions. Writers take
+any iterable of Event records (e.g. CalendarDB.iter_events) and write each one
+as it arrives.
+
+iCalendar support is what calendars actually exchange for plain events:
+VEVENT with SUMMARY, DESCRIPTION, LOCATION, DTSTART/DTEND (dates, floating or
+UTC date-times; UTC is converted to local time) and RRULE. Lines are unfolded
+and text values unescaped per RFC 5545. Other components (VTODO, VTIMEZONE,
+VALARM) and properties are skipped.
+"""
+import csv
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from DB.records import parse_date, parse_time
+
+IMPORT_FIELDS = ("title", "description", "location", "start_date", "end_date", "start_time", "end_time", "rrule")
+CSV_FIELDS = IMPORT_FIELDS
+# Extra CSV header spellings accepted on import (lower-cased)
+CSV_ALIASES = {
+    "summary": "title", "subject": "title", "name": "title",
+    "date": "start_date", "start": "start_date", "end": "end_date",
+    "notes": "description",
+}
+ICS_LINE_OCTETS = 75   # RFC 5545 folds longer content lines
+PRODID = "-//CalendAI//EN"
+
+
+class CalendarFileError(ValueError):
+    """The file is not in a format we can read."""
+
+
+def detect_format(path: str) -> str:
+    """'ics' or 'csv', from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".ics", ".ical", ".ifb"):
+        return "ics"
+    if ext == ".csv":
+        return "csv"
+    raise CalendarFileError(f"unsupported calendar file {path!r} (expected .ics or .csv)")
+
+
+# ---- iCalendar --------------------------------------------------------------
+
+def _unfold(lines):
+    """Join RFC 5545 folded lines (continuations start with a space or tab)."""
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _split_property(line: str):
+    """'DTSTART;VALUE=DATE:20250101' -> ('DTSTART', {'VALUE': 'DATE'}, '20250101')."""
+    head, sep, value = line.partition(":")
+    if not sep:
+        return None, {}, ""
+    name, *params = head.split(";")
+    out = {}
+    for p in params:
+        k, _, v = p.partition("=")
+        out[k.upper()] = v.strip('"')
+    return name.upper(), out, value
+
+
+def _unescape(text: str) -> str:
+    out, i = [], 0
+    while i < len(text):
+        c = text[i]
+        if c == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out)
+
+
+def _escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _parse_ics_datetime(value: str, params: dict):
+    """(date, time | None) for a DTSTART/DTEND value; time None = all-day."""
+    value = value.strip()
+    if params.get("VALUE", "").upper() == "DATE" or len(value) == 8:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8])), None
+    dt = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return dt.date(), dt.time().replace(second=0)
+
+
+def _event_from_ics(props: dict) -> dict | None:
+    if "DTSTART" not in props:
+        return None
+    try:
+        start_date, start_time = _parse_ics_datetime(*props["DTSTART"])
+        end_date, end_time = _parse_ics_datetime(*props["DTEND"]) if "DTEND" in props else (start_date, None)
+    except ValueError:
+        return None
+    if start_time is None:
+        end_time = None
+        # DTEND is exclusive for all-day events
+        if "DTEND" in props and end_date > start_date:
+            end_date -= timedelta(days=1)
+    elif end_time is not None and end_time <= start_time and end_date == start_date + timedelta(days=1):
+        end_date = start_date   # past midnight: stored like the app stores it (end time before start)
+    if end_date < start_date:
+        end_date = start_date
+
+    def text(key):
+        return _unescape(props[key][0]).strip() if key in props else ""
+
+    return {
+        "title": text("SUMMARY"),
+        "description": text("DESCRIPTION"),
+        "location": text("LOCATION"),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "start_time": start_time.strftime("%H:%M") if start_time else "",
+        "end_time": end_time.strftime("%H:%M") if end_time else "",
+        "rrule": props["RRULE"][0].strip() if "RRULE" in props else None,
+    }
+
+
+def iter_ics(lines):
+    """Yield one event dict per VEVENT in an iterable of .ics lines (e.g. an open file)."""
+    props, depth = None, 0
+    for line in _unfold(lines):
+        name, params, value = _split_property(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and props is None:
+                props, depth = {}, 0
+            elif props is not None:
+                depth += 1   # VALARM etc. nested in the event
+            continue
+        if name == "END" and props is not None:
+            if depth:
+                depth -= 1
+            elif value.upper() == "VEVENT":
+                event = _event_from_ics(props)
+                props = None
+                if event is not None:
+                    yield event
+            continue
+        if props is not None and not depth and name:
+            props[name] = (value, params)
+
+
+def _fold(line: str):
+    """Split a content line into <= 75-octet pieces (continuations start with a space)."""
+    data = line.encode("utf-8")
+    if len(data) <= ICS_LINE_OCTETS:
+        yield line
+        return
+    limit, first = ICS_LINE_OCTETS, True
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:   # don't split a UTF-8 sequence
+            cut -= 1
+        yield ("" if first else " ") + data[:cut].decode("utf-8")
+        data = data[cut:]
+        limit, first = ICS_LINE_OCTETS - 1, False
+
+
+def _ics_lines(e, stamp: str):
+    yield "BEGIN:VEVENT"
+    yield f"UID:{e.id}@calendai"
+    yield f"DTSTAMP:{stamp}"
+    if e.start_time is None:
+        yield f"DTSTART;VALUE=DATE:{e.start_date:%Y%m%d}"
+        yield f"DTEND;VALUE=DATE:{e.end_date + timedelta(days=1):%Y%m%d}"
+    else:
+        start = datetime.combine(e.start_date, e.start_time)
+        yield f"DTSTART:{start:%Y%m%dT%H%M%S}"
+        if e.end_time is not None:   # no DTEND = no end time, which is how it imports back
+            end = datetime.combine(e.end_date, e.end_time)
+            if end < start:
+                end += timedelta(days=1)   # runs past midnight
+            yield f"DTEND:{end:%Y%m%dT%H%M%S}"
+    yield f"SUMMARY:{_escape(e.title)}"
+    if e.description:
+        yield f"DESCRIPTION:{_escape(e.description)}"
+    if e.location:
+        yield f"LOCATION:{_escape(e.location)}"
+    if e.rrule:
+        yield f"RRULE:{e.rrule}"
+    yield "END:VEVENT"
+
+
+def write_ics(events, fh) -> int:
+    """Write Event records to an open text file as a VCALENDAR. Returns the number written."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    fh.write(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\n")
+    n = 0
+    for e in events:
+        if e.start_date is None:
+            continue
+        fh.write("".join(piece + "\r\n" for line in _ics_lines(e, stamp) for piece in _fold(line)))
+        n += 1
+    fh.write("END:VCALENDAR\r\n")
+    return n
+
+
+# ---- CSV --------------------------------------------------------------------
+
+def iter_csv(fh):
+    """Yield one event dict per row of a CSV file with a header (see CSV_FIELDS/CSV_ALIASES)."""
+    reader = csv.reader(fh)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = []
+    for name in header:
+        key = name.strip().lower().replace(" ", "_")
+        columns.append(CSV_ALIASES.get(key, key))
+    if "start_date" not in columns:
+        raise CalendarFileError("CSV needs a start_date (or date/start) column")
+    for row in reader:
+        values = dict(zip(columns, row))
+        start = parse_date(values.get("start_date"))
+        if start is None:
+            continue
+        start_time, end_time = parse_time(values.get("start_time")), parse_time(values.get("end_time"))
+        yield {
+            "title": (values.get("title") or "").strip(),
+            "description": (values.get("description") or "").strip(),
+            "location": (values.get("location") or "").strip(),
+            "start_date": start.isoformat(),
+            "end_date": (parse_date(values.get("end_date")) or start).isoformat(),
+            "start_time": start_time.strftime("%H:%M") if start_time else "",
+            "end_time": end_time.strftime("%H:%M") if end_time else "",
+            "rrule": (values.get("rrule") or "").strip() or None,
+        }
+
+
+def write_csv(events, fh) -> int:
+    """Write Event records to an open text file (newline='') as CSV. Returns the number written."""
+    writer = csv.writer(fh)
+    writer.writerow(CSV_FIELDS)
+    n = 0
+    for e in events:
+        if e.start_date is None:
+            continue
+        writer.writerow((e.title, e.description, e.location, e.start_date.isoformat(), e.end_date.isoformat(),
+                         e.start_time_text, e.end_time_text, e.rrule or ""))
+        n += 1
+    return n
+
+
+# ---- files ------------------------------------------------------------------
+
+def iter_file(fh, fmt: str):
+    if fmt == "ics":
+        return iter_ics(fh)
+    if fmt == "csv":
+        return iter_csv(fh)
+    raise CalendarFileError(f"unknown format {fmt!r}")
+
+
+def import_file(db, user_id, path: str, fmt: str | None = None, batch_size: int | None = None):
+    """Stream a .ics/.csv file into the user's calendar. Returns (inserted, skipped)."""
+    fmt = fmt or detect_format(path)
+    kwargs = {} if batch_size is None else {"batch_size": batch_size}
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        return db.import_events(user_id, iter_file(fh, fmt), **kwargs)
+
+
+def export_file(db, user_id, path: str, fmt: str | None = None) -> int:
+    """Stream the user's events (series once, with their RRULE) to a .ics/.csv file."""
+    fmt = fmt or detect_format(path)
+    writer = {"ics": write_ics, "csv": write_csv}.get(fmt)
+    if writer is None:
+        raise CalendarFileError(f"unknown format {fmt!r}")
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        return writer(db.iter_events(user_id), fh)
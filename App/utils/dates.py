@@ -1,5 +1,5 @@
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
 WEEKDAYS = {
@@ -7,33 +7,36 @@ WEEKDAYS = {
     "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
 }
 
+_WD = "monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+
 def _next_weekday(start: datetime, weekday: int, include_today=False) -> datetime:
     days_ahead = (weekday - start.weekday()) % 7
     if days_ahead == 0 and not include_today:
         days_ahead = 7
     return start + timedelta(days=days_ahead)
 
-def resolve_relative_dates(user_text: str, tz: str = "Europe/Stockholm") -> dict | None:
+def find_relative_date(text: str, now: datetime) -> tuple[date, tuple[int, int]] | None:
     """
-    Returns a dict with start_date/end_date strings if it can confidently resolve,
-    else None (caller keeps model’s dates).
+    Find the first date expression in (lower-cased) text.
+    Returns (date, (start, end) span of the match) or None.
     """
-    text = user_text.lower()
-    now = datetime.now(ZoneInfo(tz))
+    # day after tomorrow (before "tomorrow" so it isn't half-matched)
+    m = re.search(r"\b(the\s+)?day after tomorrow\b", text)
+    if m:
+        return (now + timedelta(days=2)).date(), m.span()
 
     # tomorrow
-    if re.search(r"\btomorrow\b", text):
-        d = now + timedelta(days=1)
-        iso = d.strftime("%Y-%m-%d")
-        return {"start_date": iso, "end_date": iso}
+    m = re.search(r"\btomorrow\b", text)
+    if m:
+        return (now + timedelta(days=1)).date(), m.span()
 
-    # today
-    if re.search(r"\btoday\b", text):
-        iso = now.strftime("%Y-%m-%d")
-        return {"start_date": iso, "end_date": iso}
+    # today / tonight
+    m = re.search(r"\b(today|tonight)\b", text)
+    if m:
+        return now.date(), m.span()
 
     # this/next + weekday
-    m = re.search(r"\b(this|next)\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", text)
+    m = re.search(rf"\b(this|next)\s+({_WD})\b", text)
     if m:
         when, wd = m.groups()
         target = WEEKDAYS[wd]
@@ -44,7 +47,41 @@ def resolve_relative_dates(user_text: str, tz: str = "Europe/Stockholm") -> dict
                 d = d + timedelta(days=7)
         else:  # next
             d = _next_weekday(now, target, include_today=False)
-        iso = d.strftime("%Y-%m-%d")
-        return {"start_date": iso, "end_date": iso}
+        return d.date(), m.span()
+
+    # ISO date
+    m = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", text)
+    if m:
+        try:
+            return date(*map(int, m.groups())), m.span()
+        except ValueError:
+            return None
+
+    # in N days / in a week
+    m = re.search(r"\bin\s+(\d{1,3}|a|one)\s+(day|days|week|weeks)\b", text)
+    if m:
+        n = 1 if m.group(1) in ("a", "one") else int(m.group(1))
+        days = n * 7 if m.group(2).startswith("week") else n
+        return (now + timedelta(days=days)).date(), m.span()
+
+    # (on) weekday -> the next one, today included
+    m = re.search(rf"\b(on\s+)?({_WD})\b", text)
+    if m:
+        d = _next_weekday(now, WEEKDAYS[m.group(2)], include_today=True)
+        return d.date(), m.span()
 
     return None
+
+def resolve_relative_dates(user_text: str, tz: str = "Europe/Stockholm", now: datetime | None = None) -> dict | None:
+    """
+    Returns a dict with start_date/end_date strings if it can confidently resolve,
+    else None (caller keeps model’s dates).
+    """
+    text = user_text.lower()
+    now = now or datetime.now(ZoneInfo(tz))
+
+    found = find_relative_date(text, now)
+    if found is None:
+        return None
+    iso = found[0].strftime("%Y-%m-%d")
+    return {"start_date": iso, "end_date": iso}
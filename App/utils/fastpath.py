@@ -0,0 +1,249 @@
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from utils.dates import find_relative_date
+
+# Below this the request goes to the model as usual
+FASTPATH_MIN_CONFIDENCE = 0.9
+DEFAULT_DURATION_MIN = 60
+
+_T = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+
+TIME_RANGE_RE = re.compile(
+    rf"\b(?:(?:from|between|at|kl\.?)\s+)?{_T}\s*(?:-|–|to|until|and)\s*{_T}\b")
+TIME_AT_RE = re.compile(rf"(?:\b(?:at|kl\.?)\s*|@\s*){_T}\b")
+TIME_CLOCK_RE = re.compile(r"\b(\d{1,2})[:.](\d{2})\s*(am|pm)?\b|\b(\d{1,2})\s*(am|pm)\b")
+NOON_RE = re.compile(r"\b(at\s+)?noon\b")
+DURATION_RE = re.compile(r"\bfor\s+(\d+(?:\.\d+)?|an|one|a|half an)\s*(hours?|hrs?|h|minutes?|mins?|m)\b")
+
+QUESTION_RE = re.compile(
+    r"\?|^\s*(what|when|where|which|who|how|do|does|did|am|is|are|should|will|why)\b")
+AMBIGUOUS_RE = re.compile(
+    r"\b(maybe|perhaps|or|sometime|around|ish|probably|not sure|cancel|delete|remove|move|"
+    r"reschedule|change|every|each|weekly|daily|monthly|unless|if)\b")
+
+LEAD_IN_RE = re.compile(
+    r"^\s*(?:(?:please|pls|hey|ok|okay)[,\s]+)*"
+    r"(?:(?:can|could|would|will) you\s+)?(?:please\s+)?"
+    r"(?:add|schedule|book|create|put|set up|plan|make|log|note|"
+    r"remind me (?:to|about|of)|remember|i have|i've got|i got|i need to|i want to|"
+    r"i'm going to|im going to|i am going to|going to)\b\s*"
+    r"(?:(?:a|an|the|my)\s+)?"
+    r"(?:(?:event|entry|appointment)\s+(?:called|named|titled|for)\s+)?",
+    re.I)
+# Declines and acknowledgements ("thanks, tomorrow at 14 works") are replies, not requests
+NEGATION_RE = re.compile(
+    r"\b(?:don'?t|do not|doesn'?t|didn'?t|won'?t|not|never|no|nope|instead of|"
+    r"thanks|thank you|thx|works for me|that works|sounds good)\b|\bworks\W*$", re.I)
+# A previous assistant turn like this means the message answers it; let the model read both
+ASSISTANT_ASKED_RE = re.compile(
+    r"\?|\b(?:please confirm|i can add|how about|would you like|shall i|should i|do you want)\b", re.I)
+# "... then gym", "; lunch on friday", "and add gym": a second event in the same message
+SECOND_CLAUSE_RE = re.compile(
+    r";|\b(?:then|also|plus|afterwards|after that)\b|"
+    r"\b(?:and|,)\s+(?:add|schedule|book|create|put|set up|plan|remind me)\b", re.I)
+REMIND_RE = re.compile(r"\bremind me\b", re.I)   # "remind me to ..." also sets a reminder at the start
+TRAILING_CALENDAR_RE = re.compile(r"\s+(?:to|in|on|into)\s+(?:my|the)\s+(?:calendar|agenda|schedule)\b", re.I)
+EDGE_WORDS_RE = re.compile(r"^(?:on|at|from|for|to|in|and|with|by|,|-)\s+|\s+(?:on|at|from|for|to|in|and|with|by|,|-)$", re.I)
+
+
+def _to_minutes(h: str, m: str | None, ampm: str | None) -> tuple[int | None, bool]:
+    """(minutes since midnight, ambiguous?) -- None when it isn't a valid time."""
+    hour, minute = int(h), int(m) if m else 0
+    if minute > 59:
+        return None, False
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None, False
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+        return hour * 60 + minute, False
+    if hour > 23:
+        return None, False
+    # "at 7" could be 07:00 or 19:00; "at 14" / "7:30" / "07" are taken literally
+    ambiguous = m is None and 1 <= hour <= 11 and len(h) == 1
+    return hour * 60 + minute, ambiguous
+
+
+def _find_times(text: str):
+    """Returns (start_min, end_min|None, ambiguous, [spans])."""
+    m = TIME_RANGE_RE.search(text)
+    if m:
+        h1, m1, ap1, h2, m2, ap2 = m.groups()
+        # "2-4pm": the am/pm on the end applies to the start as well
+        start, amb1 = _to_minutes(h1, m1, ap1 or ap2)
+        end, amb2 = _to_minutes(h2, m2, ap2 or ap1)
+        prefixed = re.match(r"(from|between|at|kl)", m.group(0)) is not None
+        if start is not None and end is not None and (prefixed or m1 or m2 or ap1 or ap2):
+            return start, end, amb1 or amb2, [m.span()]
+
+    m = NOON_RE.search(text)
+    if m:
+        return 12 * 60, None, False, [m.span()]
+
+    m = TIME_AT_RE.search(text)
+    if m:
+        start, amb = _to_minutes(*m.groups())
+        if start is not None:
+            return start, None, amb, [m.span()]
+
+    m = TIME_CLOCK_RE.search(text)
+    if m:
+        if m.group(1):
+            start, amb = _to_minutes(m.group(1), m.group(2), m.group(3))
+        else:
+            start, amb = _to_minutes(m.group(4), None, m.group(5))
+        if start is not None:
+            return start, None, amb, [m.span()]
+
+    return None, None, False, []
+
+
+def _blank(text: str, spans: list[tuple[int, int]]) -> str:
+    """`text` with the spans replaced by spaces, so offsets stay valid."""
+    for start, end in spans:
+        text = text[:start] + " " * (end - start) + text[end:]
+    return text
+
+
+def _find_duration(text: str):
+    m = DURATION_RE.search(text)
+    if not m:
+        return None, None
+    amount, unit = m.groups()
+    if amount in ("an", "one", "a"):
+        value = 1.0
+    elif amount == "half an":
+        value = 0.5
+    else:
+        value = float(amount)
+    minutes = value * 60 if unit.startswith("h") else value
+    return int(minutes), m.span()
+
+
+def _merge_spans(spans: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _extract_title(original: str, spans: list[tuple[int, int]]) -> str:
+    # Cut out the date/time phrases (right to left so spans stay valid; a time match
+    # can run into the blanked date phrase, so overlapping spans are merged first)
+    title = original
+    for start, end in reversed(_merge_spans(spans)):
+        title = title[:start] + " " + title[end:]
+    title = TRAILING_CALENDAR_RE.sub(" ", title)
+    title = " ".join(title.split())
+    title = LEAD_IN_RE.sub("", title)
+    title = title.strip(" .,!;:")
+    while True:
+        stripped = EDGE_WORDS_RE.sub("", title).strip(" .,!;:")
+        if stripped == title:
+            break
+        title = stripped
+    return title[:1].upper() + title[1:]
+
+
+def parse_schedule_request(text: str, now: datetime | None = None,
+                           tz: str = "Europe/Stockholm") -> tuple[dict | None, float]:
+    """
+    Rule-based parse of a scheduling request such as "add dentist tomorrow at 14:00".
+    Returns (create_calendar_event payload or None, confidence 0..1). Only an explicit
+    request (a lead-in verb or "... in my calendar") for a single event is confident
+    enough to skip the model.
+    """
+    now = now or datetime.now(ZoneInfo(tz))
+    original = " ".join((text or "").split())
+    lower = original.lower()
+    if len(lower) != len(original):  # rare unicode case-folding length change: work on lower only
+        original = lower
+
+    found = find_relative_date(lower, now)
+    if found is None:
+        return None, 0.0
+    day, date_span = found
+
+    # Blank out the date phrase so e.g. "2025-10-18" can't be read as a "10-18" time range
+    without_date = _blank(lower, [date_span])
+    start_min, end_min, ambiguous, time_spans = _find_times(without_date)
+    if start_min is None:
+        return None, 0.3  # all-day or unspecified time: let the model ask
+    # Another date or time left over means more than one event ("dentist at 14 and gym at 18")
+    rest = _blank(without_date, time_spans)
+    several = (find_relative_date(rest, now) is not None or _find_times(rest)[0] is not None
+               or SECOND_CLAUSE_RE.search(lower) is not None)
+
+    spans = [date_span] + time_spans
+    if end_min is None:
+        duration, duration_span = _find_duration(lower)
+        if duration_span:
+            spans.append(duration_span)
+        end_min = start_min + (duration or DEFAULT_DURATION_MIN)
+
+    title = _extract_title(original, spans)
+    if not title:
+        return None, 0.2
+
+    start_dt = datetime(day.year, day.month, day.day) + timedelta(minutes=start_min)
+    if end_min <= start_min:
+        end_min += 24 * 60  # "22:00-01:00" runs past midnight
+    end_dt = datetime(day.year, day.month, day.day) + timedelta(minutes=end_min)
+
+    payload = {
+        "title": title,
+        "description": "",
+        "start_date": start_dt.strftime("%Y-%m-%d"),
+        "end_date": end_dt.strftime("%Y-%m-%d"),
+        "start_time": start_dt.strftime("%H:%M"),
+        "end_time": end_dt.strftime("%H:%M"),
+    }
+    if REMIND_RE.search(lower):
+        payload["reminder_minutes"] = 0
+
+    confidence = 0.95
+    if not (LEAD_IN_RE.match(original) or TRAILING_CALENDAR_RE.search(original)):
+        confidence = min(confidence, 0.6)   # "dentist tomorrow at 14" may be a statement or a reply
+    if NEGATION_RE.search(lower):
+        confidence = min(confidence, 0.2)
+    if QUESTION_RE.search(lower):
+        confidence = min(confidence, 0.3)
+    if AMBIGUOUS_RE.search(lower):
+        confidence = min(confidence, 0.4)
+    if ambiguous:
+        confidence = min(confidence, 0.6)
+    if several:
+        confidence = min(confidence, 0.4)
+    if len(title.split()) > 6:
+        confidence = min(confidence, 0.6)  # probably swallowed extra instructions
+    if start_dt.date() < now.date():
+        confidence = min(confidence, 0.5)
+    return payload, confidence
+
+
+def try_fast_path(text: str, now: datetime | None = None, previous_reply: str | None = None) -> dict | None:
+    """
+    The payload when the local parse is confident enough to skip the model, else None.
+    `previous_reply` is the assistant turn just before `text`; if it asked something
+    or proposed an event, the message is an answer and goes to the model.
+    """
+    if previous_reply and ASSISTANT_ASKED_RE.search(previous_reply):
+        return None
+    payload, confidence = parse_schedule_request(text, now=now)
+    if payload is not None and confidence >= FASTPATH_MIN_CONFIDENCE:
+        return payload
+    return None
+
+
+def describe_event(payload: dict) -> str:
+    """Assistant text shown alongside a fast-path suggestion."""
+    when = f"{payload['start_date']} {payload['start_time']}–{payload['end_time']}"
+    if payload["end_date"] != payload["start_date"]:
+        when = f"{payload['start_date']} {payload['start_time']} – {payload['end_date']} {payload['end_time']}"
+    if payload.get("reminder_minutes") is not None:
+        when += ", with a reminder"
+    return f"I can add “{payload['title']}” on {when}. Please confirm below."
@@ -0,0 +1,99 @@
+"""
+Free-time finder: a sweep line over busy intervals.
+
+`busy` must be sorted by start (EventRepository hands it over that way). One
+pass merges it into disjoint blocks, a second pass walks the per-day working
+windows and the merged blocks together, so the whole search is O(n + days).
+"""
+from datetime import datetime, time, timedelta
+
+DEFAULT_WORKING_HOURS = (time(9, 0), time(17, 0))
+WEEKDAYS_ONLY = frozenset(range(5))   # Monday..Friday
+
+
+def merge_busy(busy) -> list[tuple[datetime, datetime]]:
+    """Union of (start, end) intervals sorted by start, as disjoint sorted blocks."""
+    merged = []
+    for start, end in busy:
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def working_windows(range_start: datetime, range_end: datetime, working_hours=DEFAULT_WORKING_HOURS,
+                    weekdays=None):
+    """Yield each day's [work start, work end) inside [range_start, range_end)."""
+    work_start, work_end = working_hours
+    day = range_start.date()
+    while datetime.combine(day, time()) < range_end:
+        if weekdays is None or day.weekday() in weekdays:
+            ws = max(datetime.combine(day, work_start), range_start)
+            we = min(datetime.combine(day, work_end), range_end)
+            if ws < we:
+                yield ws, we
+        day += timedelta(days=1)
+
+
+def _align_up(moment: datetime, minutes: int | None) -> datetime:
+    if not minutes:
+        return moment
+    base = moment.replace(second=0, microsecond=0)
+    if base < moment:
+        base += timedelta(minutes=1)
+    over = (base.hour * 60 + base.minute) % minutes
+    return base + timedelta(minutes=minutes - over) if over else base
+
+
+def find_free_slots(busy, range_start: datetime, range_end: datetime, duration: timedelta,
+                    working_hours=DEFAULT_WORKING_HOURS, weekdays=None, limit: int | None = None,
+                    align_minutes: int | None = None) -> list[tuple[datetime, datetime]]:
+    """
+    Free gaps of at least `duration` inside the working hours of [range_start, range_end).
+    Returns (start, end) pairs, earliest first; each pair is the whole gap, so the
+    caller can place the meeting anywhere in it. `align_minutes` rounds gap starts
+    up (e.g. 15 -> :00/:15/:30/:45).
+    """
+    blocks = merge_busy(busy)
+    slots = []
+    i, n = 0, len(blocks)
+    for ws, we in working_windows(range_start, range_end, working_hours, weekdays):
+        # Blocks are disjoint and sorted, so ones ending before this window never matter again
+        while i < n and blocks[i][1] <= ws:
+            i += 1
+        cursor = ws
+        j = i
+        while j < n and blocks[j][0] < we:
+            gap_start = _align_up(cursor, align_minutes)
+            if blocks[j][0] - gap_start >= duration:
+                slots.append((gap_start, blocks[j][0]))
+                if limit is not None and len(slots) >= limit:
+                    return slots
+            cursor = max(cursor, blocks[j][1])
+            if cursor >= we:
+                break
+            j += 1
+        gap_start = _align_up(cursor, align_minutes)
+        if cursor < we and we - gap_start >= duration:
+            slots.append((gap_start, we))
+            if limit is not None and len(slots) >= limit:
+                return slots
+    return slots
+
+
+def describe_slots(slots) -> list[dict]:
+    """JSON-friendly form used as the find_free_slots tool result."""
+    out = []
+    for start, end in slots:
+        out.append({
+            "date": start.date().isoformat(),
+            "weekday": start.strftime("%A"),
+            "start": start.strftime("%H:%M"),
+            "end": end.strftime("%H:%M") if end.date() == start.date() else end.strftime("%Y-%m-%d %H:%M"),
+            "free_minutes": int((end - start).total_seconds() // 60),
+        })
+    return out
@@ -0,0 +1,193 @@
+"""
+Interval tree for "what overlaps this window" queries.
+
+A treap ordered by (start, key) where every node also stores the largest `end`
+in its subtree. Overlap queries skip whole subtrees that end before the window
+or start after it, so they cost O(log n + k) expected for k hits. Inserts and
+removals are O(log n) expected; `build` makes a tree from sorted input in O(n).
+
+Intervals are half-open [start, end): an all-day event on 2025-10-15 is
+(date(2025, 10, 15), date(2025, 10, 16)). Bounds only need to be comparable.
+"""
+import random
+
+
+class _Node:
+    __slots__ = ("start", "end", "key", "value", "prio", "left", "right", "max_end")
+
+    def __init__(self, start, end, key, value, prio):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.prio = prio
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+def _update(node):
+    m = node.end
+    if node.left is not None and node.left.max_end > m:
+        m = node.left.max_end
+    if node.right is not None and node.right.max_end > m:
+        m = node.right.max_end
+    node.max_end = m
+
+
+def _merge(a, b):
+    """Join two treaps where every key in a sorts before every key in b."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        _update(a)
+        return a
+    b.left = _merge(a, b.left)
+    _update(b)
+    return b
+
+
+def _split(node, order):
+    """(nodes sorting before `order`, the rest)."""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < order:
+        left, right = _split(node.right, order)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, order)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+class IntervalTree:
+    """
+    Keyed intervals: each key (e.g. an event id) appears at most once, so callers can
+    remove/replace by key. Keys must be comparable with each other (ties on start).
+    """
+
+    def __init__(self, seed=None):
+        self._root = None
+        self._nodes = {}   # key -> node
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def get(self, key):
+        node = self._nodes.get(key)
+        return None if node is None else (node.start, node.end, node.value)
+
+    @classmethod
+    def build(cls, items, seed=None) -> "IntervalTree":
+        """
+        Bulk-load (start, end, key, value) tuples already sorted by (start, key) in O(n)
+        (Cartesian-tree construction with a stack instead of n inserts).
+        """
+        tree = cls(seed)
+        stack = []
+        prev = None
+        for start, end, key, value in items:
+            if key in tree._nodes:
+                raise ValueError(f"duplicate key {key!r}")
+            if prev is not None and (start, key) < prev:
+                raise ValueError("build() needs items sorted by (start, key)")
+            prev = (start, key)
+            node = _Node(start, end, key, value, tree._random.random())
+            tree._nodes[key] = node
+            last = None
+            while stack and stack[-1].prio < node.prio:
+                last = stack.pop()
+                _update(last)   # its subtree is final once it leaves the right spine
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        for node in reversed(stack):
+            _update(node)
+        tree._root = stack[0] if stack else None
+        return tree
+
+    def insert(self, start, end, key, value=None):
+        """Add an interval, replacing any existing one with the same key."""
+        if key in self._nodes:
+            self.remove(key)
+        node = _Node(start, end, key, value, self._random.random())
+        self._nodes[key] = node
+        left, right = _split(self._root, (start, key))
+        self._root = _merge(_merge(left, node), right)
+
+    def remove(self, key) -> bool:
+        node = self._nodes.pop(key, None)
+        if node is None:
+            return False
+        order = (node.start, node.key)
+        left, rest = _split(self._root, order)
+        # `rest` starts with the node itself; drop it
+        self._root = _merge(left, self._remove_min(rest))
+        return True
+
+    @staticmethod
+    def _remove_min(node):
+        if node.left is None:
+            return node.right
+        parent, path = node, [node]
+        while parent.left.left is not None:
+            parent = parent.left
+            path.append(parent)
+        parent.left = parent.left.right
+        for n in reversed(path):
+            _update(n)
+        return node
+
+    def clear(self):
+        self._root = None
+        self._nodes.clear()
+
+    def overlap(self, start, end) -> list:
+        """Values of every interval overlapping [start, end), ordered by (start, key)."""
+        return [node.value for node in self._overlap_nodes(start, end)]
+
+    def overlap_spans(self, start, end) -> list:
+        """(start, end, value) of every interval overlapping [start, end), ordered by (start, key)."""
+        return [(node.start, node.end, node.value) for node in self._overlap_nodes(start, end)]
+
+    def _overlap_nodes(self, start, end):
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            # Walk left as long as the subtree can still reach into the window
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start >= end:
+                return   # this and everything after it starts too late
+            if node.end > start:
+                yield node
+            node = node.right
+
+    def overlaps_any(self, start, end) -> bool:
+        return next(self._overlap_nodes(start, end), None) is not None
+
+    def values(self) -> list:
+        """Every value, ordered by (start, key)."""
+        out, stack, node = [], [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            out.append(node.value)
+            node = node.right
+        return out
@@ -0,0 +1,276 @@
+"""
+Recurring events: a small RFC 5545 RRULE subset, expanded lazily per window.
+
+A series is stored once (events.rrule); nothing here ever builds the full,
+possibly infinite, list of occurrences. `occurrence_dates` jumps straight to the
+first period that can reach the requested window (skip-ahead instead of walking
+from the series start) and is memoized per (rule, start, window), so flipping
+back and forth between calendar pages costs nothing after the first visit.
+
+Supported: FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, COUNT, UNTIL and BYDAY
+(weekly rules only). Months/years without the start's day (the 31st, Feb 29)
+are skipped, as RFC 5545 says.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+
+from DB.records import Event
+
+FREQS = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+DAY_CODES = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+MAX_SKIPPED_PERIODS = 100   # e.g. "every 12 months on the 31st of February" never matches
+
+
+class Rule:
+    __slots__ = ("freq", "interval", "count", "until", "byday")
+
+    def __init__(self, freq, interval=1, count=None, until=None, byday=None):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = byday   # sorted tuple of weekday numbers, weekly rules only
+
+    def __repr__(self):
+        return (f"Rule({self.freq}, interval={self.interval}, count={self.count}, "
+                f"until={self.until}, byday={self.byday})")
+
+
+def _parse_until(value: str) -> date:
+    value = value.strip()
+    if len(value) >= 8 and value[:8].isdigit():
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    return date.fromisoformat(value[:10])
+
+
+@lru_cache(maxsize=512)
+def parse_rrule(text: str) -> Rule:
+    """'FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20251231' -> Rule. Raises ValueError if unsupported."""
+    text = (text or "").strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts = {}
+    for part in filter(None, text.split(";")):
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"bad RRULE part {part!r}")
+        parts[key.strip().upper()] = value.strip()
+
+    freq = parts.pop("FREQ", "").upper()
+    if freq not in FREQS:
+        raise ValueError(f"unsupported FREQ {freq!r}")
+    interval = int(parts.pop("INTERVAL", 1))
+    if interval < 1:
+        raise ValueError("INTERVAL must be >= 1")
+    count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+    if count is not None and count < 1:
+        raise ValueError("COUNT must be >= 1")
+    until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+    byday = None
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported for weekly rules")
+        try:
+            byday = tuple(sorted({DAY_CODES[d.strip().upper()] for d in parts.pop("BYDAY").split(",")}))
+        except KeyError as e:
+            raise ValueError(f"bad BYDAY value {e}") from None
+    parts.pop("WKST", None)   # weeks start on Monday here regardless
+    if parts:
+        raise ValueError(f"unsupported RRULE parts: {', '.join(parts)}")
+    return Rule(freq, interval, count, until, byday)
+
+
+def is_valid_rrule(text) -> bool:
+    try:
+        parse_rrule(text)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def _iter_from(rule: Rule, dtstart: date, start: date):
+    """
+    Occurrence dates in order, beginning with the first period that can contain
+    `start` (earlier dates of that period may still come out; callers filter).
+    Ignores COUNT/UNTIL.
+    """
+    n = rule.interval
+    if rule.freq == "DAILY":
+        k = max(0, -(-(start - dtstart).days // n))   # ceil
+        d = dtstart + timedelta(days=k * n)
+        step = timedelta(days=n)
+        while True:
+            yield d
+            d += step
+
+    elif rule.freq == "WEEKLY":
+        weekdays = rule.byday or (dtstart.weekday(),)
+        week0 = dtstart - timedelta(days=dtstart.weekday())
+        weeks = max(0, (start - week0).days // 7)
+        week = week0 + timedelta(weeks=weeks // n * n)
+        step = timedelta(weeks=n)
+        while True:
+            for wd in weekdays:
+                d = week + timedelta(days=wd)
+                if d >= dtstart:
+                    yield d
+            week += step
+
+    else:
+        per_year = rule.freq == "YEARLY"
+        if per_year:
+            k = max(0, start.year - dtstart.year) // n * n
+        else:
+            k = max(0, (start.year - dtstart.year) * 12 + start.month - dtstart.month) // n * n
+        misses = 0
+        while misses < MAX_SKIPPED_PERIODS:
+            if per_year:
+                y, m = dtstart.year + k, dtstart.month
+            else:
+                y, m = divmod(dtstart.month - 1 + k, 12)
+                y, m = dtstart.year + y, m + 1
+            if y > 9999:
+                return
+            try:
+                yield date(y, m, dtstart.day)
+                misses = 0
+            except ValueError:
+                misses += 1   # no such day in this month/year
+            k += n
+
+
+@lru_cache(maxsize=1024)
+def last_occurrence(rrule: str, dtstart: date) -> date | None:
+    """Start date of the final occurrence, or None for a series that never ends."""
+    rule = parse_rrule(rrule)
+    last = rule.until
+    if rule.count is not None:
+        for i, d in enumerate(_iter_from(rule, dtstart, dtstart)):
+            if last is not None and d > last:
+                break
+            if i == rule.count - 1:
+                last = d
+                break
+    return last
+
+
+@lru_cache(maxsize=4096)
+def occurrence_dates(rrule: str, dtstart: date, span_days: int, window_start: date, window_end: date) -> tuple:
+    """
+    Start dates of the occurrences overlapping [window_start, window_end] (inclusive),
+    where each occurrence lasts `span_days` extra days. Memoized per window.
+    """
+    rule = parse_rrule(rrule)
+    last = last_occurrence(rrule, dtstart)
+    lo = max(window_start - timedelta(days=span_days), dtstart)   # earlier starts can still reach in
+    out = []
+    for d in _iter_from(rule, dtstart, lo):
+        if d > window_end or (last is not None and d > last):
+            break
+        if d >= lo:
+            out.append(d)
+    return tuple(out)
+
+
+def series_end_date(rrule: str, start_date: date, end_date: date | None = None) -> date | None:
+    """Last date any occurrence covers (stored as events.series_end), None if endless."""
+    last = last_occurrence(rrule, start_date)
+    if last is None:
+        return None
+    return last + ((end_date or start_date) - start_date)
+
+
+def _occurrence(series: Event, original: date, start: date, end: date, ex=None) -> Event:
+    return Event(
+        id=series.id, user_id=series.user_id,
+        title=ex.title if ex is not None and ex.title is not None else series.title,
+        description=ex.description if ex is not None and ex.description is not None else series.description,
+        start_date=start, end_date=end,
+        # A moved instance without its own times keeps the series' times
+        start_time=ex.start_time if ex is not None and ex.start_time is not None else series.start_time,
+        end_time=ex.end_time if ex is not None and ex.end_time is not None else series.end_time,
+        rrule=series.rrule, location=series.location, recurrence_id=original,
+    )
+
+
+def expand(series: Event, exceptions: dict | None, window_start: date | None, window_end: date) -> list[Event]:
+    """
+    Occurrences of one series overlapping [window_start, window_end] (None = from
+    the series start), with cancelled instances dropped and moved ones at their new
+    dates -- including instances moved *into* the window from outside it.
+    """
+    if series.start_date is None or series.rrule is None:
+        return []
+    span = max(0, (series.end_date - series.start_date).days)
+    ws = window_start or series.start_date
+    exceptions = exceptions or {}
+    out = []
+    try:
+        dates = occurrence_dates(series.rrule, series.start_date, span, ws, window_end)
+    except ValueError as e:
+        print(f"recurrence: ignoring bad rule on event {series.id}: {e}")
+        return []
+    for d in dates:
+        if d in exceptions:
+            continue   # cancelled or moved; moved ones are added below
+        out.append(_occurrence(series, d, d, d + timedelta(days=span)))
+    for ex in exceptions.values():
+        if ex.cancelled or ex.start_date is None:
+            continue
+        if ex.start_date <= window_end and ex.end_date >= ws:
+            out.append(_occurrence(series, ex.original_date, ex.start_date, ex.end_date, ex))
+    return out
+
+
+def occurrence_sort_key(e: Event):
+    return (e.start_date, e.start_time_text, e.id or 0)
+
+
+class RecurrenceSet:
+    """
+    The recurring series of one user (user_id None = all users) plus their
+    exceptions, kept in memory and expanded on demand for whatever window a view
+    asks for. `apply_change` refreshes just the series a DB change touched.
+    """
+
+    def __init__(self, db, user_id=None):
+        self.db = db
+        self.user_id = user_id
+        self.series: dict[int, Event] = {}
+        self.exceptions: dict[int, dict] = {}   # series id -> {original date: OccurrenceException}
+
+    def load(self):
+        self.series = {e.id: e for e in self.db.get_recurring_events(self.user_id)}
+        self.exceptions = self.db.get_event_exceptions(list(self.series))
+
+    def __len__(self):
+        return len(self.series)
+
+    def occurrences(self, window_start: date, window_end: date) -> list[Event]:
+        out = []
+        for series in self.series.values():
+            if series.start_date is None or series.start_date > window_end:
+                continue
+            end = series_end_date(series.rrule, series.start_date, series.end_date) if series.rrule else None
+            if end is not None and end < window_start:
+                continue
+            out += expand(series, self.exceptions.get(series.id), window_start, window_end)
+        out.sort(key=occurrence_sort_key)
+        return out
+
+    def apply_change(self, change) -> bool:
+        """Re-read the series a change touched. Returns False if no series was involved."""
+        touched = [e for e in change.events() if e.is_recurring]
+        if not touched:
+            return False
+        for e in touched:
+            current = self.db.get_event(e.id)
+            if current is not None and current.is_recurring and \
+                    (self.user_id is None or current.user_id == self.user_id):
+                self.series[e.id] = current
+                # {} once the last exception is gone, so restored instances come back
+                self.exceptions[e.id] = self.db.get_event_exceptions([e.id]).get(e.id, {})
+            else:
+                self.series.pop(e.id, None)
+                self.exceptions.pop(e.id, None)
+        return True
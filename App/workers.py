@@ -0,0 +1,65 @@
+import traceback
+
+import PyQt6.QtCore as qtc
+
+
+class WorkerSignals(qtc.QObject):
+    """
+    Signals a Worker emits. They are created on the UI thread, so connected slots
+    run on the UI thread (queued connection) even though the worker emits them
+    from a pool thread.
+    """
+    progress = qtc.pyqtSignal(object)
+    result = qtc.pyqtSignal(object)
+    error = qtc.pyqtSignal(str)
+    cancelled = qtc.pyqtSignal(object)   # what fn returned; None if it raised
+    finished = qtc.pyqtSignal()
+
+
+class Worker(qtc.QRunnable):
+    """
+    Run `fn(*args, worker=self, **kwargs)` on a QThreadPool thread.
+
+    The function must not touch widgets. It can send intermediate values with
+    `worker.report(value)` and should check `worker.is_cancelled` between slow
+    steps. If the worker was cancelled by the time `fn` returns, `cancelled` is
+    emitted instead of `result`, with the same value (so `fn` can say what it had
+    already done). `finished` is always emitted last.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        # A plain bool flip is atomic under the GIL; the worker polls it
+        self._cancelled = True
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def report(self, value):
+        if not self._cancelled:
+            self.signals.progress.emit(value)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, worker=self, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            if self._cancelled:
+                self.signals.cancelled.emit(None)
+            else:
+                self.signals.error.emit(str(e))
+        else:
+            if self._cancelled:
+                self.signals.cancelled.emit(result)
+            else:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()